@@ -6,11 +6,13 @@ import configparser
 import sys
 from datetime import datetime, timedelta
 import time
+import queue
 import pytz
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from OffsetStorage import FileOffsetStorage
-from dbConnection import OracleConnection
+from dbConnection import OracleConnection, SQLiteConnection
 
 
 base_dir = os.path.dirname(__file__)
@@ -22,6 +24,11 @@ QUERY_DIR = os.path.join(base_dir, 'query')
 PLAIN_POLICY = 'PLAIN'
 SQUASH_POLICY = 'SQUASH'
 
+# DB backends:
+#   name -> (connection class, connection parameter in the backend section)
+BACKENDS = {'oracle': (OracleConnection, 'dsn'),
+            'sqlite': (SQLiteConnection, 'file')}
+
 # Global variables
 # ---
 # Output stream
@@ -65,17 +72,27 @@ def main():
     # Offset delay initialization
     init_offset_delay(config)
 
-    conn = OracleConnection(config['__dsn'])
-    if not conn.establish():
-        sys.stderr.write("(ERROR) Failed to connect to Oracle. Exiting.\n")
-        sys.exit(3)
-
-    if not conn.save_queries(config['queries']):
-        sys.stderr.write("(ERROR) Queries seem to be misconfigured."
-                         " Exiting.\n")
-        sys.exit(1)
-
-    process(conn, offset_storage, config)
+    conns = []
+    connection_class = BACKENDS[config['backend']][0]
+    for i in range(config['workers']):
+        conn = connection_class(config['__dsn'],
+                                arraysize=config['arraysize'],
+                                prefetchrows=config['prefetchrows'])
+        if not conn.establish():
+            sys.stderr.write("(ERROR) Failed to connect to the DB (%s)."
+                             " Exiting.\n" % config['backend'])
+            sys.exit(3)
+
+        if not conn.save_queries(config['queries']):
+            sys.stderr.write("(ERROR) Queries seem to be misconfigured."
+                             " Exiting.\n")
+            sys.exit(1)
+        conns.append(conn)
+
+    if len(conns) > 1:
+        process_parallel(conns, offset_storage, config)
+    else:
+        process(conns[0], offset_storage, config)
 
 
 def log_config(config):
@@ -118,7 +135,16 @@ def read_config(config_file):
     try:
         config.read(config_file)
         # Required parameters (with no defaults)
-        result['__dsn'] = config.get('oracle', 'dsn')
+        backend = config_get(config, 'database', 'backend', 'oracle')
+        if backend not in BACKENDS:
+            raise configparser.Error("'database.backend': unknown backend:"
+                                     " '%s' (expected: %s)"
+                                     % (backend,
+                                        ', '.join(sorted(BACKENDS))))
+        result['backend'] = backend
+        result['__dsn'] = config.get(backend, BACKENDS[backend][1])
+        if backend == 'sqlite':
+            result['__dsn'] = config_path(result['__dsn'], result)
         step = config.get('timestamps', 'step')
         result['step_seconds'] = interval_seconds(step)
         if result['step_seconds'] == 0:
@@ -170,6 +196,49 @@ def read_config(config_file):
                                                    'offset_file', '.offset'),
                                         result)
     result['mode'] = config_get(config, 'process', 'mode', 'SQUASH')
+    try:
+        result['workers'] = int(config_get(config, 'process', 'workers',
+                                           '1'))
+    except ValueError:
+        result['workers'] = 0
+    if result['workers'] < 1:
+        sys.stderr.write("Failed to read config file (%s): 'process.workers':"
+                         " positive integer expected\n" % config_file)
+        return None
+    try:
+        result['target_rows'] = int(config_get(config, 'timestamps',
+                                               'target_rows', '0'))
+        result['target_seconds'] = float(config_get(config, 'timestamps',
+                                                    'target_seconds', '0'))
+        result['min_step'] = interval_seconds(config_get(config,
+                                                         'timestamps',
+                                                         'min_step', '1m'))
+        result['max_step'] = interval_seconds(config_get(config,
+                                                         'timestamps',
+                                                         'max_step', '30d'))
+        if result['target_rows'] < 0 or result['target_seconds'] < 0:
+            raise ValueError("target values can not be negative")
+        if not 0 < result['min_step'] <= result['max_step']:
+            raise ValueError("'min_step' and 'max_step' must be positive,"
+                             " 'min_step' not greater than 'max_step'")
+    except ValueError as e:
+        sys.stderr.write("Failed to read config file (%s): 'timestamps':"
+                         " %s\n" % (config_file, e))
+        return None
+    try:
+        result['arraysize'] = int(config_get(config, 'database',
+                                             'arraysize', '1000'))
+        prefetchrows = config_get(config, 'database', 'prefetchrows')
+        result['prefetchrows'] = None
+        if prefetchrows:
+            result['prefetchrows'] = int(prefetchrows)
+        if result['arraysize'] < 1 or (result['prefetchrows'] or 0) < 0:
+            raise ValueError("'arraysize' must be positive, 'prefetchrows'"
+                             " can not be negative")
+    except ValueError as e:
+        sys.stderr.write("Failed to read config file (%s): 'database':"
+                         " %s\n" % (config_file, e))
+        return None
 
     return result
 
@@ -372,15 +441,15 @@ def plain(conn, queries, start_date, end_date):
     :param queries: names of queries to execute
     :param start_date: start date
     :param end_date: end date
-    :type conn: OracleConnection
+    :type conn: dbConnection.dbConnection
     :type queries: list
     :type start_date: datetime.datetime
     :type end_date: datetime.datetime
     """
     if not conn.execute_saved(queries[0], start_date=start_date,
                               end_date=end_date):
-        raise StopIteration
-    tasks = conn.results(queries[0], 1000, True)
+        return
+    tasks = conn.results(queries[0], rows_as_dict=True)
     for task in tasks:
         yield task
 
@@ -389,12 +458,14 @@ def squash(conn, queries, start_date, end_date):
     """ Execute queries 'tasks' and 'datesets' and squash the results.
 
     The only acceptable value for `queries` is ['tasks', 'datasets'].
+    Results of both queries must be ordered by 'taskid' (see
+    ``join_results()``).
 
     :param conn: open connection to Oracle
     :param queries: names of queries to execute
     :param start_date: start date
     :param end_date: end date
-    :type conn: OracleConnection
+    :type conn: dbConnection.dbConnection
     :type queries: list
     :type start_date: datetime.datetime
     :type end_date: datetime.datetime
@@ -404,8 +475,8 @@ def squash(conn, queries, start_date, end_date):
             or not conn.execute_saved(queries[1], start_date=start_date,
                                       end_date=end_date):
         raise StopIteration
-    tasks = conn.results(queries[0], 1000, True)
-    datasets = conn.results(queries[1], 1000, True)
+    tasks = conn.results(queries[0], rows_as_dict=True)
+    datasets = conn.results(queries[1], rows_as_dict=True)
     return join_results(tasks, squash_records(datasets))
 
 
@@ -478,50 +549,195 @@ def squash_records(rec):
         yield result
 
 
+def ordered_by_taskid(rec, name):
+    """ Pass records through, checking that they are ordered by 'taskid'.
+
+    :raises ValueError: records are not ordered
+
+    :param rec: records
+    :param name: name of the records source (for error message)
+    :type rec: iterable object
+    :type name: str
+    """
+    last = None
+    for r in rec:
+        tid = r['taskid']
+        if last is not None and tid < last:
+            raise ValueError("Results of query '%s' must be ordered by"
+                             " 'taskid' (got %s after %s)."
+                             % (name, tid, last))
+        last = tid
+        yield r
+
+
 def join_results(tasks, datasets):
-    """ Join results of two queries by 'taskid'.
+    """ Join results of two queries by 'taskid' (sort-merge join).
+
+    Both inputs must be ordered by 'taskid': records are read from them
+    in turn and every record is yielded as soon as the other input passes
+    its 'taskid', so no more than a single record of each input is kept
+    in memory. Records with no pair are yielded as they are.
+
+    :raises ValueError: input records are not ordered by 'taskid'
 
     :param tasks: result of query 'tasks'
-    :param datasets: result of query 'datasets'
+    :param datasets: result of query 'datasets' (squashed)
     :type tasks: iterable object
     :type datasets: iterable object
     """
-    d = defaultdict(dict)
-    buffers = (tasks, datasets)
-    join_buffer = {}
-    req_n = len(buffers)
-    for buf in buffers:
-        for elem in buf:
-            tid = elem['taskid']
-            d[tid].update(elem)
-            n = join_buffer.get(tid, 0) + 1
-            if n == req_n:
-                yield d[tid]
-                del join_buffer[tid]
-                del d[tid]
-            else:
-                join_buffer[tid] = n
-
-    # Flush records stuck in the buffer (not joined)
-    for tid in d:
-        yield d[tid]
+    tasks = ordered_by_taskid(tasks, 'tasks')
+    datasets = ordered_by_taskid(datasets, 'datasets')
+    task = next(tasks, None)
+    ds = next(datasets, None)
+    while task is not None or ds is not None:
+        if ds is None or task is not None and task['taskid'] < ds['taskid']:
+            yield task
+            task = next(tasks, None)
+        elif task is None or ds['taskid'] < task['taskid']:
+            yield ds
+            ds = next(datasets, None)
+        else:
+            task.update(ds)
+            yield task
+            task = next(tasks, None)
+            ds = next(datasets, None)
+
+
+def records(conn, mode, start_date, end_date):
+    """ Extract records for the interval according to the process mode.
 
+    :param conn: open connection to Oracle
+    :param mode: process mode (policy)
+    :param start_date: start date
+    :param end_date: end date
+    :type conn: dbConnection.dbConnection
+    :type mode: str
+    :type start_date: datetime.datetime
+    :type end_date: datetime.datetime
 
-def process(conn, offset_storage, config):
-    """ Run the source connector process: extract data from ext. source.
+    :return: records
+    :rtype: iterable object
+    """
+    sys.stderr.write("(TRACE) %s: Run queries for interval from %s to %s"
+                     " (%s)\n" % (date2str(datetime.now()),
+                                  date2str(start_date), date2str(end_date),
+                                  OFFSET_TZ.zone))
+    if mode == SQUASH_POLICY:
+        return squash(conn, ['tasks', 'datasets'], start_date, end_date)
+    elif mode == PLAIN_POLICY:
+        return plain(conn, ['tasks'], start_date, end_date)
+    raise ValueError("Unknown process mode: '%s'" % mode)
+
+
+class IntervalSizer(object):
+    """ Adaptive interval size.
+
+    After every interval the size (step) is adjusted so that the next one
+    would return about ``target_rows`` records and/or take about
+    ``target_seconds`` to extract (the most restrictive target wins),
+    supposing that the number of records (and time) is proportional to
+    the interval size. Step grows at most ``MAX_GROWTH`` times and shrinks
+    at most ``MAX_SHRINK`` times at once, and stays within
+    [``min_step``, ``max_step``].
+    """
+
+    MAX_GROWTH = 2.0
+    MAX_SHRINK = 10.0
+
+    def __init__(self, step, target_rows=0, target_seconds=0,
+                 min_step=60, max_step=30 * 86400):
+        """ Initialize sizer.
+
+        :param step: initial step (seconds; negative for reverse data load)
+        :type step: int
+        :param target_rows: records per interval (0 -- no target)
+        :type target_rows: int
+        :param target_seconds: seconds per interval (0 -- no target)
+        :type target_seconds: float
+        :param min_step: minimal step size (seconds)
+        :type min_step: int
+        :param max_step: maximal step size (seconds)
+        :type max_step: int
+        """
+        self.sign = -1 if step < 0 else 1
+        self.size = abs(step)
+        self.target_rows = target_rows
+        self.target_seconds = target_seconds
+        self.min_step = min_step
+        self.max_step = max(max_step, min_step)
+
+    @property
+    def step(self):
+        """ Current step (seconds). """
+        return self.sign * self.size
+
+    def update(self, size, rows, seconds):
+        """ Adjust step according to the processed interval.
+
+        :param size: size of the interval (seconds)
+        :type size: int, float
+        :param rows: number of records extracted
+        :type rows: int
+        :param seconds: time spent on the interval
+        :type seconds: float
+        """
+        ratio = 0
+        if self.target_rows:
+            ratio = max(ratio, float(rows) / self.target_rows)
+        if self.target_seconds:
+            ratio = max(ratio, seconds / self.target_seconds)
+        # Size that would meet the targets (if known), but not too far
+        # from the current one
+        new_size = size / ratio if ratio else self.size * self.MAX_GROWTH
+        new_size = min(max(new_size, self.size / self.MAX_SHRINK),
+                       self.size * self.MAX_GROWTH)
+        new_size = int(min(max(new_size, self.min_step), self.max_step))
+        if new_size != self.size:
+            sys.stderr.write("(INFO) Interval size: %ss -> %ss (last"
+                             " interval: %ss, %d records, %.2f sec)\n"
+                             % (self.size, new_size, int(size), rows,
+                                seconds))
+            self.size = new_size
+
+
+def init_sizer(config):
+    """ Create interval sizer, if adaptive interval size is configured.
 
-    :param conn: open connection to Oracle
-    :param offset_storage: offset storage
     :param config: stage configuration
-    :type conn: OracleConnection
-    :type offset_storage: OffsetStorage
     :type config: dict
+
+    :return: interval sizer or None (fixed step)
+    :rtype: IntervalSizer, NoneType
+    """
+    if not config.get('target_rows') and not config.get('target_seconds'):
+        return None
+    return IntervalSizer(config['step_seconds'], config['target_rows'],
+                         config['target_seconds'], config['min_step'],
+                         config['max_step'])
+
+
+def intervals(offset_date, config, sizer=None):
+    """ Split time range, starting from the offset, into intervals.
+
+    Intervals are generated one by one: in case of normal data load
+    without configured final date the range is extended to the current
+    moment (see ``offset_now()``) every time the next interval is
+    requested.
+
+    :param offset_date: current offset
+    :param config: stage configuration
+    :param sizer: adaptive interval size (default: fixed
+                  ``config['step_seconds']``)
+    :type offset_date: datetime.datetime
+    :type config: dict
+    :type sizer: IntervalSizer
+
+    :return: iterable object, yielding (start_date, end_date, new_offset)
+    :rtype: generator
     """
-    mode = config['mode']
     reverse = config['step_seconds'] < 0
     final_date = config['final_date']
     step_seconds = config['step_seconds']
-    offset_date = get_offset(offset_storage)
     if not reverse and not final_date:
         # In case of normal data load 'final_date' may be None:
         # it means we need to adjust it to current timestamp
@@ -531,6 +747,8 @@ def process(conn, offset_storage, config):
                      'r': max(final_date, offset_date)}
     break_loop = False
     while full_interval['l'] <= offset_date <= full_interval['r']:
+        if sizer:
+            step_seconds = sizer.step
         new_offset = offset_date + timedelta(seconds=step_seconds)
         if not full_interval['l'] < new_offset < full_interval['r']:
             # Get outside the configured full interval:
@@ -540,27 +758,130 @@ def process(conn, offset_storage, config):
             break_loop = True
         if new_offset == offset_date:
             break
-        start_date = min(offset_date, new_offset)
-        end_date = max(offset_date, new_offset)
-        sys.stderr.write("(TRACE) %s: Run queries for interval from %s to %s"
-                         " (%s)\n" % (date2str(datetime.now()),
-                                      date2str(start_date), date2str(end_date),
-                                      OFFSET_TZ.zone))
-        if mode == SQUASH_POLICY:
-            records = squash(conn, ['tasks', 'datasets'], start_date,
-                             end_date)
-        elif mode == PLAIN_POLICY:
-            records = plain(conn, ['tasks'], start_date, end_date)
-        for r in records:
-            OUT.write(json.dumps(r) + '\n')
+        yield (min(offset_date, new_offset), max(offset_date, new_offset),
+               new_offset)
         offset_date = new_offset
-        commit_offset(offset_storage, offset_date)
         if not config['final_date']:
             full_interval['r'] = offset_now()
         if break_loop:
             break
 
 
+def write_records(recs):
+    """ Write records to the output stream.
+
+    :return: number of records written
+    :rtype: int
+    """
+    n = 0
+    for r in recs:
+        OUT.write(json.dumps(r) + '\n')
+        n += 1
+    return n
+
+
+def process(conn, offset_storage, config):
+    """ Run the source connector process: extract data from ext. source.
+
+    :param conn: open connection to Oracle
+    :param offset_storage: offset storage
+    :param config: stage configuration
+    :type conn: dbConnection.dbConnection
+    :type offset_storage: OffsetStorage
+    :type config: dict
+    """
+    offset_date = get_offset(offset_storage)
+    sizer = init_sizer(config)
+    for start_date, end_date, new_offset in intervals(offset_date, config,
+                                                      sizer):
+        t1 = time.time()
+        n = write_records(records(conn, config['mode'], start_date,
+                                  end_date))
+        commit_offset(offset_storage, new_offset)
+        if sizer:
+            sizer.update((end_date - start_date).total_seconds(), n,
+                         time.time() - t1)
+
+
+def extract(conns, mode, start_date, end_date):
+    """ Extract records for the interval with a free connection.
+
+    :param conns: pool of open connections
+    :type conns: queue.Queue
+
+    (see ``records()`` for other parameters)
+
+    :return: records and time spent on their extraction
+    :rtype: tuple(list, float)
+    """
+    conn = conns.get()
+    try:
+        t1 = time.time()
+        result = list(records(conn, mode, start_date, end_date))
+        return result, time.time() - t1
+    finally:
+        conns.put(conn)
+
+
+def process_parallel(conns, offset_storage, config):
+    """ Run the source connector process with parallel connections.
+
+    Every connection extracts its own interval. Records are written
+    to the output in the order of intervals, and the offset only advances
+    over intervals that are written along with all the preceding ones:
+    if the process fails, no data are skipped on restart (while some may
+    be extracted again).
+
+    Records of at most ``2 * len(conns)`` intervals are kept in memory.
+    With adaptive interval size, intervals already scheduled keep their
+    size; new sizes apply to the following ones.
+
+    :param conns: open connections to the DB
+    :param offset_storage: offset storage
+    :param config: stage configuration
+    :type conns: list
+    :type offset_storage: OffsetStorage
+    :type config: dict
+    """
+    pool = queue.Queue()
+    for conn in conns:
+        pool.put(conn)
+    max_pending = 2 * len(conns)
+    # Scheduled intervals: (size, new_offset, future), in order of intervals
+    pending = deque()
+    sizer = init_sizer(config)
+
+    def flush_ready(limit):
+        """ Write records of completed intervals in order.
+
+        While more than ``limit`` intervals are pending, wait for the
+        first one to complete.
+        """
+        while pending and (len(pending) > limit or pending[0][2].done()):
+            size, new_offset, future = pending.popleft()
+            recs, seconds = future.result()
+            write_records(recs)
+            commit_offset(offset_storage, new_offset)
+            if sizer:
+                sizer.update(size, len(recs), seconds)
+
+    offset_date = get_offset(offset_storage)
+    executor = ThreadPoolExecutor(len(conns))
+    try:
+        for start_date, end_date, new_offset in intervals(offset_date,
+                                                          config, sizer):
+            pending.append(((end_date - start_date).total_seconds(),
+                            new_offset,
+                            executor.submit(extract, pool, config['mode'],
+                                            start_date, end_date)))
+            flush_ready(max_pending - 1)
+        flush_ready(0)
+    finally:
+        for size, new_offset, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
 def interval_seconds(step):
     """ Convert human-readable interval into seconds.
 
@@ -2,8 +2,12 @@
 Classes representing connection to a database.
 """
 
+import os
 import sys
 import time
+import sqlite3
+from datetime import datetime
+from itertools import repeat
 from collections import defaultdict
 
 try:
@@ -13,7 +17,17 @@ except ImportError:
 
 
 class dbConnection(object):
-    """ Interface class for DB Connection. """
+    """ Interface class for DB Connection.
+
+    Saved queries are kept in ``self.queries`` hash:
+    ``{ qname: { 'query': query_text, ...} }`` (other keys are for
+    backend-specific use).
+
+    Results are fetched in batches of ``arraysize`` rows.
+    """
+
+    # Default number of rows fetched at once
+    arraysize = 1000
 
     def __init__(self, **kwargs):
         """ Initialize the object. """
@@ -28,20 +42,108 @@ class dbConnection(object):
         raise NotImplementedError
 
     def save_queries(self, queries):
-        """ Save queries in hash.
+        """ Save queries.
 
+        :param queries: hash with query parameters:
+                        { qname: { 'file': filename } }
         :type queries: dict
         """
-        raise NotImplementedError
+        if not isinstance(queries, dict):
+            raise TypeError("%s.save_queries(): parameter of type 'dict'"
+                            " is expected; got: '%s'" % (
+                                self.__class__.__name__, type(queries)))
+        succeed = True
+        for qname in queries:
+            if not isinstance(queries[qname], dict):
+                raise TypeError("%s.save_queries(): hash of 'dict' values"
+                                " is expected; got: '%s'" % (
+                                    self.__class__.__name__, type(queries)))
+            if queries[qname].get('file'):
+                if not self.save_query_file(qname, queries[qname]['file'],
+                                            queries[qname].get('params',
+                                                               None)):
+                    sys.stderr.write("(WARN) Failed to save query '%s'\n"
+                                     % qname)
+                    succeed = False
+
+        return succeed
+
+    def save_query_file(self, qname, src_filename, params=None):
+        """ Read query from file and save it in query hash. """
+        try:
+            with open(src_filename) as f:
+                q = f.read().rstrip().rstrip(';')
+            if isinstance(params, dict):
+                q = q % params
+            elif '%(' in q:
+                # Check for '%(' is done because a valid query without
+                # parameters (and their configuration) is possible.
+                sys.stderr.write("(WARN) '%s': query seems to be parametric, "
+                                 "but no query parameters were configured. "
+                                 "This can result in "
+                                 "'ORA-00911' error.\n" % qname)
+            self.queries[qname]['query'] = q
+        except IOError as err:
+            sys.stderr.write("(ERROR) Failed to read query file: %s\n" % err)
+            return False
+        except KeyError as err:
+            sys.stderr.write("(ERROR) Query parameter missing: %s\n" % err)
+            return False
+
+        return True
 
     def execute_saved(self, qname, **params):
         """ Execute query by name with parameters. """
         raise NotImplementedError
 
-    def results(self, qname):
-        """ Generator for iterator over query results. """
+    def fetch_batches(self, qname, arraysize=None):
+        """ Generator for iterator over batches of executed query results.
+
+        Column names (lowercase) are available via ``columns()`` as soon
+        as the first batch is fetched.
+
+        :param qname: query name
+        :type qname: str
+        :param arraysize: number of rows in a batch
+                          (default: ``self.arraysize``)
+        :type arraysize: int
+
+        :return: lists of rows (tuples)
+        :rtype: generator
+        """
         raise NotImplementedError
 
+    def columns(self, qname):
+        """ Get column names of the last executed query.
+
+        :return: lowercase column names
+        :rtype: tuple
+        """
+        return self.queries[qname].get('columns')
+
+    def results(self, qname, arraysize=None, rows_as_dict=False):
+        """ Generator for the iterator over executed query results.
+
+        :param qname: query name
+        :type qname: str
+        :param arraysize: number of rows fetched at once
+                          (default: ``self.arraysize``)
+        :type arraysize: int
+        :param rows_as_dict: return rows as hashes
+                             ({column_name: value}), not tuples
+        :type rows_as_dict: bool
+        """
+        for rows in self.fetch_batches(qname, arraysize):
+            if rows_as_dict:
+                # Same as ``dict(zip(columns, row))`` for every row,
+                # but with the loop run by builtins
+                for row in map(dict, map(zip, repeat(self.columns(qname)),
+                                         rows)):
+                    yield row
+            else:
+                for row in rows:
+                    yield row
+
 
 class OracleConnection(dbConnection):
     """ Class representing connection to Oracle database. """
@@ -50,8 +152,18 @@ class OracleConnection(dbConnection):
     connection = None
     queries = defaultdict(dict)
 
-    def __init__(self, dsn):
-        """ Initialize DB connection with Data Source Name. """
+    def __init__(self, dsn, arraysize=None, prefetchrows=None):
+        """ Initialize DB connection with Data Source Name.
+
+        :param dsn: Data Source Name
+        :type dsn: str
+        :param arraysize: number of rows fetched at once
+        :type arraysize: int
+        :param prefetchrows: number of rows prefetched by Oracle Client
+                             along with query execution (default:
+                             library default)
+        :type prefetchrows: int
+        """
         try:
             cx_Oracle
         except NameError:
@@ -60,6 +172,11 @@ class OracleConnection(dbConnection):
             raise RuntimeError
 
         self.dsn = dsn
+        if arraysize:
+            self.arraysize = arraysize
+        self.prefetchrows = prefetchrows
+        # Every connection has its own cursors
+        self.queries = defaultdict(dict)
 
     def establish(self):
         """ (Re-)establish connection to database. """
@@ -87,57 +204,6 @@ class OracleConnection(dbConnection):
 
         return True
 
-    def save_queries(self, queries):
-        """ Save queries.
-
-        :param queries: hash with query parameters:
-                        { qname: { 'file': filename } }
-        :type queries: dict
-        """
-        if not isinstance(queries, dict):
-            raise TypeError("%s.save_queries(): parameter of type 'dict'"
-                            " is expected; got: '%s'" % (
-                                self.__class__.__name__, type(queries)))
-        succeed = True
-        for qname in queries:
-            if not isinstance(queries[qname], dict):
-                raise TypeError("%s.save_queries(): hash of 'dict' values"
-                                " is expected; got: '%s'" % (
-                                    self.__class__.__name__, type(queries)))
-            if queries[qname].get('file'):
-                if not self.save_query_file(qname, queries[qname]['file'],
-                                            queries[qname].get('params',
-                                                               None)):
-                    sys.stderr.write("(WARN) Failed to save query '%s'\n"
-                                     % qname)
-                    succeed = False
-
-        return succeed
-
-    def save_query_file(self, qname, src_filename, params=None):
-        """ Read query from file and save it in query hash. """
-        try:
-            with open(src_filename) as f:
-                q = f.read().rstrip().rstrip(';')
-            if isinstance(params, dict):
-                q = q % params
-            elif '%(' in q:
-                # Check for '%(' is done because a valid query without
-                # parameters (and their configuration) is possible.
-                sys.stderr.write("(WARN) '%s': query seems to be parametric, "
-                                 "but no query parameters were configured. "
-                                 "This can result in "
-                                 "'ORA-00911' error.\n" % qname)
-            self.queries[qname]['query'] = q
-        except IOError as err:
-            sys.stderr.write("(ERROR) Failed to read query file: %s\n" % err)
-            return False
-        except KeyError as err:
-            sys.stderr.write("(ERROR) Query parameter missing: %s\n" % err)
-            return False
-
-        return True
-
     def query_cursor(self, qname):
         """ Get cursor for given query. """
         if not self.queries.get(qname):
@@ -146,6 +212,15 @@ class OracleConnection(dbConnection):
 
         if not self.queries[qname].get('cursor'):
             c = self.connection.cursor()
+            c.arraysize = self.arraysize
+            if self.prefetchrows is not None:
+                try:
+                    c.prefetchrows = self.prefetchrows
+                except AttributeError:
+                    sys.stderr.write("(WARN) 'prefetchrows' is not supported"
+                                     " by cx_Oracle %s (8.0+ required).\n"
+                                     % cx_Oracle.version)
+                    self.prefetchrows = None
             try:
                 c.prepare(self.queries[qname]['query'])
             except cx_Oracle.DatabaseError as err:
@@ -199,32 +274,128 @@ class OracleConnection(dbConnection):
         self.query_unset_retried(qname)
         return True
 
-    def results(self, qname, arraysize=1000, rows_as_dict=False):
-        """ Generator for the iterator over executed query results. """
+    def fetch_batches(self, qname, arraysize=None):
+        """ Generator for iterator over batches of executed query results.
+
+        (See ``dbConnection.fetch_batches()``.)
+        """
         c = self.query_cursor(qname)
         if not c:
-            raise StopIteration
+            return
 
         rc1 = c.rowcount
-        if rows_as_dict and not self.queries[qname].get('columns') \
-                and c.description:
-            self.queries[qname]['columns'] = \
-                [i[0].lower() for i in c.description]
+        if c.description:
+            self.queries[qname]['columns'] = tuple(i[0].lower()
+                                                   for i in c.description)
+        arraysize = arraysize or self.arraysize
 
         try:
             results = c.fetchmany(arraysize)
         except cx_Oracle.InterfaceError:
             sys.stderr.write("(ERROR) The query '%s' must be executed before"
                              " fetching any results.\n" % qname)
-            raise StopIteration
+            return
 
         while results:
-            for row in results:
-                if rows_as_dict:
-                    yield dict(list(zip(self.queries[qname]['columns'], row)))
-                else:
-                    yield row
+            yield results
             results = c.fetchmany(arraysize)
 
         rc2 = c.rowcount
         sys.stderr.write("(TIMING) (%s) (n_rows): %s\n" % (qname, rc2 - rc1))
+
+
+class SQLiteConnection(dbConnection):
+    """ Class representing connection to SQLite database.
+
+    Allows to run the stage without Oracle: over a local copy of the data
+    or a synthetic imitation of ProdSys (see 'generate_prodsys.py').
+    Queries use same named parameters (':start_date', ':end_date');
+    `datetime` values are passed as strings ('%Y-%m-%d %H:%M:%S').
+    Rows are not prefetched: 'prefetchrows' parameter is accepted for
+    compatibility with ``OracleConnection`` and ignored.
+    """
+
+    DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    dsn = None
+    connection = None
+
+    def __init__(self, dsn, arraysize=None, prefetchrows=None):
+        """ Initialize DB connection with database file name. """
+        self.dsn = dsn
+        if arraysize:
+            self.arraysize = arraysize
+        self.queries = defaultdict(dict)
+
+    def establish(self):
+        """ (Re-)open the database file. """
+        if self.connection:
+            sys.stderr.write("(INFO) Re-establishing connection"
+                             " to the DB.\n")
+            for q in self.queries:
+                self.queries[q].pop('cursor', None)
+            self.connection.close()
+        if not os.path.isfile(self.dsn):
+            # SQLite would silently create an empty database
+            sys.stderr.write("(ERROR) Database file not found: %s\n"
+                             % self.dsn)
+            return False
+        try:
+            sys.stderr.write("(INFO) Establish connection to the DB...\n")
+            # Connection is used by one thread at a time, but (in parallel
+            # mode) not necessarily by the one that opened it
+            self.connection = sqlite3.connect(self.dsn,
+                                              check_same_thread=False)
+            sys.stderr.write("(INFO) Connection established.\n")
+        except sqlite3.Error as err:
+            sys.stderr.write("(ERROR) %s\n" % err)
+            return False
+
+        return True
+
+    def execute_saved(self, qname, **params):
+        """ Execute query by name with parameters. """
+        if not self.queries.get(qname, {}).get('query'):
+            sys.stderr.write("(ERROR) Unknown query name: %s\n" % qname)
+            return False
+
+        for p in params:
+            if isinstance(params[p], datetime):
+                params[p] = params[p].strftime(self.DATE_FORMAT)
+        try:
+            t1 = time.time()
+            c = self.connection.cursor()
+            c.execute(self.queries[qname]['query'], params)
+            t2 = time.time()
+            sys.stderr.write("(TIMING) (%s) (sec): %s\n" % (qname, t2 - t1))
+        except sqlite3.Error as err:
+            sys.stderr.write("(ERROR) Failed to execute query '%s': %s\n"
+                             % (qname, err))
+            return False
+        self.queries[qname]['cursor'] = c
+
+        return True
+
+    def fetch_batches(self, qname, arraysize=None):
+        """ Generator for iterator over batches of executed query results.
+
+        (See ``dbConnection.fetch_batches()``.)
+        """
+        c = self.queries.get(qname, {}).pop('cursor', None)
+        if not c:
+            sys.stderr.write("(ERROR) The query '%s' must be executed before"
+                             " fetching any results.\n" % qname)
+            return
+
+        self.queries[qname]['columns'] = tuple(i[0].lower()
+                                               for i in c.description)
+        arraysize = arraysize or self.arraysize
+        n_rows = 0
+        results = c.fetchmany(arraysize)
+        while results:
+            n_rows += len(results)
+            yield results
+            results = c.fetchmany(arraysize)
+        c.close()
+
+        sys.stderr.write("(TIMING) (%s) (n_rows): %s\n" % (qname, n_rows))
@@ -0,0 +1,217 @@
+#!/bin/env python
+"""
+Synthetic ProdSys data generator.
+
+Creates SQLite database with tasks and their output datasets, imitating
+data queried by the stage from ProdSys ('data4es' queries), to run the
+stage with SQLite backend (queries type 'data4es-sqlite') without access
+to Oracle: for tests and benchmarks.
+
+Tables are simplified: values that the original queries take from other
+tables (request, step, task parameters, chain data) are stored directly
+in 't_production_task'.
+"""
+
+import os
+import sys
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+from dbConnection import SQLiteConnection
+
+
+SCHEMA = (
+    """CREATE TABLE t_production_task (
+         taskid INTEGER PRIMARY KEY, step_id INTEGER, pr_id INTEGER,
+         taskname TEXT, timestamp TEXT, start_time TEXT, endtime TEXT,
+         campaign TEXT, subcampaign TEXT, project TEXT, phys_group TEXT,
+         status TEXT, total_events INTEGER, total_req_events INTEGER,
+         username TEXT, primary_input TEXT, ctag TEXT, output_formats TEXT,
+         nfilestobeused INTEGER, step_name TEXT, description TEXT,
+         energy_gev INTEGER, hashtag_list TEXT, architecture TEXT,
+         core_count TEXT, conditions_tag TEXT, geometry_version TEXT,
+         ticket_id TEXT, trans_home TEXT, trans_path TEXT, trans_uses TEXT,
+         vo TEXT, run_number TEXT, trigger_config TEXT, job_config TEXT,
+         evgen_job_opts TEXT, cloud TEXT, site TEXT, n_events_per_job TEXT,
+         n_files_per_job TEXT, requested_events INTEGER,
+         processed_events INTEGER, chain_data TEXT)""",
+    """CREATE TABLE jedi_datasets (
+         jeditaskid INTEGER, datasetname TEXT, type TEXT)""",
+    "CREATE INDEX t_production_task_ts ON t_production_task (timestamp)",
+    "CREATE INDEX jedi_datasets_tid ON jedi_datasets (jeditaskid)"
+)
+
+FIRST_TASKID = 20000000
+
+PROJECTS = ('mc16_13TeV', 'mc20_13TeV', 'data18_13TeV')
+STEPS = (('Evgen', 'EVNT', 'e'), ('Simul', 'HITS', 's'),
+         ('Reco', 'AOD', 'r'), ('Deriv', 'DAOD_TOPQ1', 'p'))
+PHYS_GROUPS = ('EXOT', 'HIGG', 'SUSY', 'TOPQ', 'SOFT', 'VALI')
+STATUSES = ('done', 'finished', 'running', 'failed', 'aborted')
+FORMATS = ('AOD', 'DAOD_TOPQ1', 'DAOD_EXOT5', 'DAOD_HIGG4D4', 'NTUP_PILEUP',
+           'HIST', 'log')
+
+
+def task(taskid, timestamp, rnd):
+    """ Construct synthetic task record.
+
+    :param taskid: task ID
+    :type taskid: int
+    :param timestamp: task (last update) timestamp
+    :type timestamp: datetime.datetime
+    :param rnd: random numbers generator
+    :type rnd: random.Random
+
+    :return: task record (column name -> value)
+    :rtype: dict
+    """
+    project = rnd.choice(PROJECTS)
+    step_name, fmt, tag = rnd.choice(STEPS)
+    dsid = rnd.randint(300000, 399999)
+    ctag = '%s%d' % (tag, rnd.randint(3000, 9999))
+    tags = 'e%d_s3126_r10201_%s' % (rnd.randint(3000, 9999), ctag)
+    name = '%s.%d.PhPy8EG_A14_ttbar_hdamp258p75' % (project, dsid)
+    start_time = timestamp - timedelta(seconds=rnd.randint(3600, 30 * 86400))
+    req_events = rnd.randint(1, 1000) * 5000
+    parent = taskid - rnd.randint(100000, 9000000)
+    return {
+        'taskid': taskid,
+        'step_id': rnd.randint(2000000, 3000000),
+        'pr_id': rnd.choice((300, 20000 + rnd.randint(0, 20000))),
+        'taskname': '%s.%s.%s' % (name, step_name.lower(), tags),
+        'timestamp': timestamp.strftime(SQLiteConnection.DATE_FORMAT),
+        'start_time': start_time.strftime(SQLiteConnection.DATE_FORMAT),
+        'endtime': rnd.choice((None, timestamp.strftime(
+            SQLiteConnection.DATE_FORMAT))),
+        'campaign': project,
+        'subcampaign': rnd.choice((None, 'MC16a', 'MC16d', 'MC16e')),
+        'project': project,
+        'phys_group': rnd.choice(PHYS_GROUPS),
+        'status': rnd.choice(STATUSES),
+        'total_events': rnd.randint(0, req_events),
+        'total_req_events': req_events,
+        'username': rnd.choice(('atlas-dpd-production', 'mborodin')),
+        'primary_input': '%s.merge.AOD.%s_tid%d_00' % (name, tags, parent),
+        'ctag': ctag,
+        'output_formats': fmt,
+        'nfilestobeused': rnd.randint(1, 500),
+        'step_name': step_name,
+        'description': '%s %s %s sample' % (fmt, project, step_name),
+        'energy_gev': 13000,
+        'hashtag_list': rnd.choice((None, 'MC16a, ttbar', 'TOPQ, r10201')),
+        'architecture': 'x86_64-slc6-gcc62-opt',
+        'core_count': rnd.choice(('1', '8')),
+        'conditions_tag': rnd.choice((None, 'OFLCOND-MC16-SDR-16')),
+        'geometry_version': rnd.choice((None, 'ATLAS-R2-2016-01-00-01')),
+        'ticket_id': 'ATLPSTASKS-%d' % rnd.randint(1000000, 2000000),
+        'trans_home': 'AthDerivation-21.2.%d.0' % rnd.randint(10, 99),
+        'trans_path': 'Reco_tf.py',
+        'trans_uses': 'Atlas-21.2.%d' % rnd.randint(1, 9),
+        'vo': 'atlas',
+        'run_number': str(dsid),
+        'trigger_config': None,
+        'job_config': None,
+        'evgen_job_opts': None,
+        'cloud': 'WORLD',
+        'site': None,
+        'n_events_per_job': rnd.choice((None, '1000', '5000')),
+        'n_files_per_job': rnd.choice((None, '1', '10')),
+        'requested_events': req_events,
+        'processed_events': rnd.randint(0, req_events),
+        'chain_data': '%d,%d' % (parent, taskid)
+    }
+
+
+def datasets(rec, rnd):
+    """ Construct output dataset records for a task.
+
+    :return: list of (taskid, datasetname, type) tuples
+    :rtype: list
+    """
+    name = rec['taskname'].split('.')
+    result = []
+    for fmt in rnd.sample(FORMATS, rnd.randint(1, 4)):
+        dsname = '.'.join(name[:3] + ['deriv', fmt] + name[4:])
+        result.append((rec['taskid'], '%s_tid%d_00' % (dsname, rec['taskid']),
+                       'output'))
+    return result
+
+
+def generate(fname, initial_date, days, tasks, seed=1):
+    """ Create database with tasks evenly spread over the time range.
+
+    Tasks timestamps are within (initial_date, initial_date + days].
+
+    :param fname: database file name (must not exist)
+    :type fname: str
+    :param initial_date: start of the time range
+    :type initial_date: datetime.datetime
+    :param days: length of the time range
+    :type days: int
+    :param tasks: number of tasks
+    :type tasks: int
+    :param seed: random numbers generator seed
+    :type seed: int
+    """
+    if os.path.exists(fname):
+        raise ValueError("File already exists: %s" % fname)
+    rnd = random.Random(seed)
+    span = days * 86400
+    db = sqlite3.connect(fname)
+    try:
+        for statement in SCHEMA:
+            db.execute(statement)
+        insert = None
+        for i in range(tasks):
+            ts = initial_date + timedelta(seconds=rnd.randint(1, span))
+            rec = task(FIRST_TASKID + i, ts, rnd)
+            if not insert:
+                columns = sorted(rec)
+                insert = "INSERT INTO t_production_task (%s) VALUES (%s)" \
+                         % (', '.join(columns), ', '.join('?' * len(columns)))
+            db.execute(insert, [rec[c] for c in columns])
+            db.executemany("INSERT INTO jedi_datasets VALUES (?, ?, ?)",
+                           datasets(rec, rnd))
+        db.commit()
+    finally:
+        db.close()
+
+
+def parsingArguments():
+    """ Parse command line arguments.
+
+    :return: parsed arguments
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Synthetic ProdSys data"
+                                     " generator (SQLite).")
+    parser.add_argument('db', help="Database file to create", type=str)
+    parser.add_argument('--initial', help="Start of the time range"
+                        " (default: %(default)s)", type=str,
+                        default='01-03-2020 00:00:00')
+    parser.add_argument('--days', help="Length of the time range"
+                        " (default: %(default)s)", type=int, default=10)
+    parser.add_argument('--tasks', help="Number of tasks"
+                        " (default: %(default)s)", type=int, default=20000)
+    parser.add_argument('--seed', help="Random numbers generator seed"
+                        " (default: %(default)s)", type=int, default=1)
+    return parser.parse_args()
+
+
+def main():
+    """ Generate database. """
+    args = parsingArguments()
+    try:
+        initial = datetime.strptime(args.initial, "%d-%m-%Y %H:%M:%S")
+        generate(args.db, initial, args.days, args.tasks, args.seed)
+    except (ValueError, sqlite3.Error) as err:
+        sys.stderr.write("(ERROR) %s\n" % err)
+        sys.exit(1)
+    sys.stderr.write("(INFO) Database created: %s (%d tasks)\n"
+                     % (args.db, args.tasks))
+
+
+if __name__ == '__main__':
+    main()
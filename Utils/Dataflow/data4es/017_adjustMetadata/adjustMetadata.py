@@ -402,20 +402,34 @@ def process(stage, message):
     # 10. Remove not needed fields
     data.pop('output', None)
 
-    out_message = JSONMessage(data)
+    out_message = JSONMessage(data, owned=True)
     stage.output(out_message)
     return True
 
 
-def main(args):
-    """ Program body. """
+def init_stage(args):
+    """ Create and configure the stage.
+
+    :param args: command line arguments
+    :type args: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
+    """
     stage = ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     stage.process = process
 
     stage.configure(args)
+    return stage
+
+
+def main(args):
+    """ Program body. """
+    stage = init_stage(args)
     error_code = stage.run()
 
     if error_code == 0:
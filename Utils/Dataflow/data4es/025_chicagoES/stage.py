@@ -30,19 +30,11 @@ except Exception as err:
     sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
     sys.exit(1)
 
-try:
-    import elasticsearch
-    from elasticsearch.exceptions import (ElasticsearchException,
-                                          ConnectionTimeout)
-except ImportError as err:
-    sys.stderr.write("(ERROR) Failed to import elasticsearch module: %s\n"
-                     % err)
-finally:
-    try:
-        ElasticsearchException
-    except NameError:
-        ElasticsearchException = None
-
+# Elasticsearch modules (imported on first use, see `import_es()`)
+elasticsearch = None
+# Placeholders (matching no exception) till the module is imported
+ElasticsearchException = ()
+ConnectionTimeout = ()
 
 chicago_es = None
 
@@ -66,6 +58,30 @@ INDICES = {'jobs': {'prefix': 'jobs_archive_',
            }
 
 
+def import_es():
+    """ Import elasticsearch module.
+
+    The module is heavy and not needed to print usage or in 'skip' mode,
+    so it is imported only before the client initialization.
+
+    :return: True if the module is imported, False otherwise
+    :rtype: bool
+    """
+    global elasticsearch, ElasticsearchException, ConnectionTimeout
+    if elasticsearch:
+        return True
+    try:
+        import elasticsearch
+        from elasticsearch.exceptions import (ElasticsearchException,
+                                              ConnectionTimeout)
+    except ImportError as err:
+        sys.stderr.write("(ERROR) Failed to import elasticsearch module: %s\n"
+                         % err)
+        elasticsearch = None
+        return False
+    return True
+
+
 def init_es_client(cfg=None):
     """ Initialize connection to Chicago ES.
 
@@ -77,13 +93,12 @@ def init_es_client(cfg=None):
     if cfg:
         if cfg.get('user') and cfg.get('passwd'):
             http_auth = (cfg['user'], cfg['passwd'])
-    try:
-        chicago_es = elasticsearch.Elasticsearch(chicago_hosts,
-                                                 http_auth=http_auth)
-    except NameError:
+    if not import_es():
         sys.stderr.write("(FATAL) Failed to initialize Elasticsearch client: "
                          "module not loaded.\n")
         raise DataflowException("Module not found: 'elasticsearch'")
+    chicago_es = elasticsearch.Elasticsearch(chicago_hosts,
+                                             http_auth=http_auth)
 
 
 def get_es_client():
@@ -93,6 +108,29 @@ def get_es_client():
     return chicago_es
 
 
+def es_search(**kwargs):
+    """ Search in Chicago ES.
+
+    :param kwargs: search parameters (see ``Elasticsearch.search()``)
+    :type kwargs: dict
+
+    :returns: ES response
+    :rtype: dict
+    """
+    return get_es_client().search(**kwargs)
+
+
+def es_search_key(**kwargs):
+    """ Construct cache key for ES search (ignoring request timeout). """
+    kwargs.pop('request_timeout', None)
+    return json.dumps(kwargs, sort_keys=True)
+
+
+def no_hits(response):
+    """ Check if nothing was found by ES search. """
+    return not response['hits']['total']['value']
+
+
 def task_metadata(task_data, fields=[], retry=3):
     """ Get additional metadata for given task.
 
@@ -133,7 +171,7 @@ def task_metadata(task_data, fields=[], retry=3):
         '_source': fields
     }
     try:
-        r = chicago_es.search(**kwargs)
+        r = es_search(**kwargs)
     except ElasticsearchException as err:
         sys.stderr.write("(ERROR) ES search error (id=%r): %s\n"
                          % (taskid, err))
@@ -304,7 +342,7 @@ def agg_metadata(task_data, agg_names, retry=3, es_args=None):
         return {}
 
     try:
-        r = chicago_es.search(**es_args)
+        r = es_search(**es_args)
     except ElasticsearchException as err:
         sys.stderr.write("(ERROR) ES search error (id=%r): %s\n"
                          % (taskid, err))
@@ -365,7 +403,7 @@ def process(stage, message):
                 total += val
             fname = AGG_FIELDS[f]
             data[fname] = total
-    out_message = Message(messageType.JSON)(data)
+    out_message = Message(messageType.JSON)(data, owned=True)
     stage.output(out_message)
     return True
 
@@ -376,9 +414,11 @@ def main(args):
     :param args: command line arguments
     :type args: list
     """
+    global es_search
     stage = ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     stage.set_default_arguments(config=os.path.join(base_dir, os.pardir,
                                                     'config', '025.cfg'),
@@ -392,6 +432,9 @@ def main(args):
         stage.configure(args)
         if not stage.ARGS.skip_process:
             init_es_client(stage.CONFIG['ChicagoES'])
+        # ES lookups are cached if the stage is run with `--cache`
+        es_search = stage.cached(es_search, 'chicago_es.search',
+                                 key=es_search_key, negative=no_hits)
         stage.run()
     except (DataflowException, RuntimeError) as err:
         if str(err):
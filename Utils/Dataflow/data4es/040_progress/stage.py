@@ -119,23 +119,36 @@ def process(stage, message):
         stage.output_error("Invalid input message: %s" % data,
                            sys.exc_info())
     else:
-        out_message = JSONMessage(out_data)
+        out_message = JSONMessage(out_data, owned=True)
         stage.output(out_message)
     finally:
         stage.output(message)
     return True
 
 
-def main(args):
-    """ Program body. """
+def init_stage(args):
+    """ Create and configure the stage.
+
+    :param args: command line arguments
+    :type args: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
+    """
     stage = ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     stage.process = process
 
     stage.configure(args)
+    return stage
+
 
+def main(args):
+    """ Program body. """
+    stage = init_stage(args)
     exit_code = stage.run()
 
     if exit_code == 0:
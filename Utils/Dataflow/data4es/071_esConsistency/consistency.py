@@ -14,8 +14,6 @@ import traceback
 
 from datetime import datetime
 
-import elasticsearch
-
 
 def log(msg, prefix='DEBUG'):
     ''' Add prefix and current time to message and write it to stderr. '''
@@ -38,6 +36,9 @@ except Exception as err:
     sys.exit(1)
 
 
+# Elasticsearch module (imported in `es_connect()`: not needed for usage)
+elasticsearch = None
+
 es = None
 
 
@@ -95,7 +96,13 @@ def es_connect(cfg):
         log('No ES port specified', 'ERROR')
         return False
 
-    global es
+    global es, elasticsearch
+    try:
+        import elasticsearch
+    except ImportError as err:
+        log('Failed to import elasticsearch module: %s' % err, 'ERROR')
+        return False
+
     s = '%s:%s' % (cfg['ES_HOST'], cfg['ES_PORT'])
     if cfg['ES_USER'] and cfg['ES_PASSWORD']:
         s = '%s://%s:%s@%s/%s/' % (cfg['ES_PROTO'],
@@ -15,31 +15,6 @@ import traceback
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 
-try:
-    if not os.environ.get("VIRTUAL_ENV", None):
-        user_rucio_dir = os.path.expanduser("~/.rucio")
-        if os.path.exists(user_rucio_dir):
-            os.environ["VIRTUAL_ENV"] = os.path.join(user_rucio_dir)
-        else:
-            os.environ["VIRTUAL_ENV"] = os.path.join(base_dir, ".rucio")
-        sys.stderr.write("(TRACE) Set VIRTUAL_ENV: %s\n"
-                         % os.environ["VIRTUAL_ENV"])
-    import rucio.client
-    from rucio.common.exception import (RucioException,
-                                        DataIdentifierNotFound)
-except ImportError as err:
-    sys.stderr.write("(ERROR) Failed to import Rucio module: %s\n" % err)
-except Exception as err:
-    # rucio.client tries to read Rucio config file, and if it is not found,
-    # throws plain Exception
-    sys.stderr.write("(ERROR) %s.\n" % err.message)
-finally:
-    try:
-        RucioException
-    except NameError:
-        RucioException = None
-        DataIdentifierNotFound = None
-
 try:
     dkb_dir = os.path.join(base_dir, os.pardir)
     sys.path.append(dkb_dir)
@@ -52,6 +27,12 @@ except Exception as err:
     sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
     sys.exit(1)
 
+# Rucio modules (imported on first use, see `import_rucio()`)
+rucio = None
+# Placeholders (matching no exception) till the modules are imported
+RucioException = ()
+DataIdentifierNotFound = ()
+
 rucio_client = None
 
 OUTPUT = 'o'
@@ -71,11 +52,19 @@ SRC_FIELD = {
 }
 
 
-def main(argv):
-    """ Program body. """
+def init_stage(argv):
+    """ Create and configure the stage.
+
+    :param argv: command line arguments
+    :type argv: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
+    """
     stage = pyDKB.dataflow.stage.ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     global log
     log = stage.log
@@ -83,6 +72,16 @@ def main(argv):
     stage.configure(argv)
     stage.process = process
     stage.skip_process = skip_process
+
+    # Rucio lookups are cached if the stage is run with `--cache`
+    global get_metadata
+    get_metadata = stage.cached(get_metadata, 'rucio.get_metadata')
+    return stage
+
+
+def main(argv):
+    """ Program body. """
+    stage = init_stage(argv)
     exit_code = stage.run()
 
     if exit_code == 0:
@@ -91,15 +90,52 @@ def main(argv):
     sys.exit(exit_code)
 
 
+def import_rucio():
+    """ Import Rucio modules.
+
+    The modules are heavy and not needed to print usage or in 'skip'
+    mode, so they are imported only before the client initialization.
+
+    :return: True if the modules are imported, False otherwise
+    :rtype: bool
+    """
+    global rucio, RucioException, DataIdentifierNotFound
+    if rucio:
+        return True
+    try:
+        if not os.environ.get("VIRTUAL_ENV", None):
+            user_rucio_dir = os.path.expanduser("~/.rucio")
+            if os.path.exists(user_rucio_dir):
+                os.environ["VIRTUAL_ENV"] = os.path.join(user_rucio_dir)
+            else:
+                os.environ["VIRTUAL_ENV"] = os.path.join(base_dir, ".rucio")
+            sys.stderr.write("(TRACE) Set VIRTUAL_ENV: %s\n"
+                             % os.environ["VIRTUAL_ENV"])
+        import rucio.client
+        from rucio.common.exception import (RucioException,
+                                            DataIdentifierNotFound)
+    except ImportError as err:
+        sys.stderr.write("(ERROR) Failed to import Rucio module: %s\n" % err)
+    except Exception as err:
+        # rucio.client tries to read Rucio config file, and if it is not
+        # found, throws plain Exception
+        sys.stderr.write("(ERROR) %s.\n" % err)
+    else:
+        return True
+    rucio = None
+    RucioException = DataIdentifierNotFound = ()
+    return False
+
+
 def init_rucio_client():
     """ Initialize global variable `rucio_client`. """
     global rucio_client
-    try:
-        rucio_client = rucio.client.Client()
-    except NameError:
+    if not import_rucio():
         sys.stderr.write("(FATAL) Failed to initialize Rucio client: "
                          "module not loaded.\n")
         raise DataflowException("Module not found or misconfigured: 'rucio'")
+    try:
+        rucio_client = rucio.client.Client()
     except IOError as err:
         # When Client fails to read the certificate files for some reason,
         # it does not handle the IOError in any way, so we have to read
@@ -143,7 +179,7 @@ def skip_process(stage, message):
     """
     data = message.content()
     output_datasets = []
-    output = data.pop('output', [])
+    output = data.get('output', [])
     if not output:
         # It could be `None`, not missed
         output = []
@@ -152,8 +188,9 @@ def skip_process(stage, message):
     for ds in output:
         output_datasets.append({'name': ds})
     if output_datasets:
+        del data['output']
         data['output_datasets'] = output_datasets
-        out_msg = stage.output_message_class()(data)
+        out_msg = stage.output_message_class()(data, owned=True)
         out_msg.incomplete(True)
     else:
         out_msg = message
@@ -206,7 +243,7 @@ def process(stage, message):
             if not ds.pop('_status', True):
                 incompl = True
 
-    msg = stage.output_message_class()(data)
+    msg = stage.output_message_class()(data, owned=True)
     msg.incomplete(incompl)
 
     stage.output(msg)
@@ -284,14 +321,14 @@ def get_ds_info(dataset, mfields):
     :rtype: dict
     """
     ds_dict = {}
-    try:
-        mdata = get_metadata(dataset, list(mfields.keys()))
-        adjust_metadata(mdata)
-        for mkey in mdata:
-            if mkey in mfields:
-                ds_dict[mfields[mkey]] = mdata[mkey]
-    except DataIdentifierNotFound as err:
+    mdata = get_metadata(dataset, list(mfields.keys()))
+    if mdata is None:
         ds_dict[mfields['deleted']] = True
+        return ds_dict
+    adjust_metadata(mdata)
+    for mkey in mdata:
+        if mkey in mfields:
+            ds_dict[mfields[mkey]] = mdata[mkey]
     return ds_dict
 
 
@@ -302,14 +339,16 @@ def get_metadata(dsn, attributes=None):
     :param attributes: attribute name OR
                        list of names of searchable attributes
                        (None = all attributes)
-    :return: dataset metadata
-    :rtype:  dict
+    :return: dataset metadata (None if dataset is not found)
+    :rtype:  dict, NoneType
     """
     rucio_client = get_rucio_client()
     scope = pyDKB.atlas.misc.dataset_scope(dsn)
     dataset = pyDKB.atlas.misc.normalize_dataset_name(dsn)
     try:
         metadata = rucio_client.get_metadata(scope=scope, name=dataset)
+    except DataIdentifierNotFound:
+        return None
     except ValueError as err:
         raise RucioException(err)
     if attributes is None:
@@ -20,14 +20,28 @@ except Exception as err:
     sys.exit(1)
 
 
-def main(argv):
-    """ Program body. """
+def init_stage(argv):
+    """ Create and configure the stage.
+
+    :param argv: command line arguments
+    :type argv: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
+    """
     stage = pyDKB.dataflow.stage.ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     stage.configure(argv)
     stage.process = process
+    return stage
+
+
+def main(argv):
+    """ Program body. """
+    stage = init_stage(argv)
     exit_code = stage.run()
 
     if exit_code == 0:
@@ -43,7 +57,8 @@ def process(stage, message):
     datasets = msg.get('output_dataset', [])
     for ds in datasets:
         ds['data_format'] = atlas.misc.dataset_data_format(ds.get('name'))
-    stage.output(pyDKB.dataflow.communication.messages.JSONMessage(msg))
+    stage.output(pyDKB.dataflow.communication.messages.JSONMessage(
+        msg, owned=True))
 
     return True
 
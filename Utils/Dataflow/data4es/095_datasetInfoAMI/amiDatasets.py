@@ -3,14 +3,6 @@ import json
 import re
 import sys
 import os
-try:
-    import pyAMI.client
-    import pyAMI_atlas.api as AtlasAPI
-    import pyAMI.config
-    from pyAMI.exception import Error as AMIError
-    from pyAMI.httpclient import http_client
-except ImportError:
-    sys.stderr.write("(ERROR) Unable to find pyAMI client.\n")
 
 base_dir = os.path.abspath(os.path.dirname(__file__))
 
@@ -26,6 +18,13 @@ except Exception as err:
     sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
     sys.exit(1)
 
+# pyAMI modules (imported on first use, see `import_ami()`)
+pyAMI = None
+AtlasAPI = None
+http_client = None
+# Placeholder (matching no exception) till the modules are imported
+AMIError = ()
+
 ami_client = None
 
 # Field names in terms of AMI and ES schemes.
@@ -42,27 +41,47 @@ FILTER = ['AOD', 'EVNT', 'HITS']
 SCOPES = ('mc15', 'mc16', 'mc23')
 
 
-def main(argv):
-    """ Main program body.
+def init_stage(argv):
+    """ Create and configure the stage (and AMI client).
 
     :param argv: command line arguments
     :type argv: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
     """
     stage = pyDKB.dataflow.stage.ProcessorStage()
     stage.set_input_message_type(messageType.JSON)
     stage.set_output_message_type(messageType.JSON)
+    stage.set_messages_owned()
 
     stage.set_default_arguments(config=os.path.join(base_dir, os.pardir,
-                                                    'config', '095.cfg'))
+                                                    'config', '095.cfg'),
+                                ignore_on_skip=True)
 
     stage.configure(argv)
     stage.process = process
 
-    if stage.CONFIG['ami'].get('userkey', '') \
+    # AMI lookups are cached if the stage is run with `--cache`
+    global get_phys_params
+    get_phys_params = stage.cached(get_phys_params, 'ami.phys_params')
+
+    # AMI client is not needed in 'skip' mode
+    if not stage.ARGS.skip_process \
+            and stage.CONFIG['ami'].get('userkey', '') \
             and stage.CONFIG['ami'].get('usercert', ''):
         init_ami_client(stage.CONFIG['ami']['userkey'],
                         stage.CONFIG['ami']['usercert'])
+    return stage
 
+
+def main(argv):
+    """ Main program body.
+
+    :param argv: command line arguments
+    :type argv: list
+    """
+    stage = init_stage(argv)
     exit_code = stage.run()
 
     if exit_code == 0:
@@ -71,6 +90,32 @@ def main(argv):
     sys.exit(exit_code)
 
 
+def import_ami():
+    """ Import pyAMI modules.
+
+    The modules are heavy and not needed to print usage or in 'skip'
+    mode, so they are imported only before the client initialization.
+
+    :return: True if the modules are imported, False otherwise
+    :rtype: bool
+    """
+    global pyAMI, AtlasAPI, AMIError, http_client
+    if pyAMI:
+        return True
+    try:
+        import pyAMI.client
+        import pyAMI_atlas.api as AtlasAPI
+        import pyAMI.config
+        from pyAMI.exception import Error as AMIError
+        from pyAMI.httpclient import http_client
+    except ImportError:
+        sys.stderr.write("(ERROR) Unable to find pyAMI client.\n")
+        pyAMI = AtlasAPI = http_client = None
+        AMIError = ()
+        return False
+    return True
+
+
 def init_ami_client(userkey='', usercert=''):
     """ Establish a connection to AMI.
 
@@ -89,14 +134,14 @@ def init_ami_client(userkey='', usercert=''):
                                - test command failed
     """
     global ami_client
+    if not import_ami():
+        sys.stderr.write("(FATAL) Failed to initialise AMI client:"
+                         " pyAMI module is not loaded.\n")
+        raise DataflowException("Module not found: 'pyAMI'")
     try:
         ami_client = pyAMI.client.Client(['atlas-replica', 'atlas'],
                                          key_file=userkey, cert_file=usercert)
         AtlasAPI.init()
-    except NameError:
-        sys.stderr.write("(FATAL) Failed to initialise AMI client:"
-                         " pyAMI module is not loaded.\n")
-        raise DataflowException("Module not found: 'pyAMI'")
     except Exception as err:
         sys.stderr.write(
             "(ERROR) Could not establish pyAMI session."
@@ -168,7 +213,8 @@ def process(stage, message):
                 #   any exception produced by it indicates a problem
                 #   with the stage code that demands a full stop.
                 change_key_names(ds)
-    stage.output(pyDKB.dataflow.communication.messages.JSONMessage(data))
+    stage.output(pyDKB.dataflow.communication.messages.JSONMessage(
+        data, owned=True))
 
     return True
 
@@ -188,6 +234,35 @@ def amiPhysValues(data):
     scope = pyDKB.atlas.misc.dataset_scope(container)
     if not scope.startswith(SCOPES):
         return True
+    rows = get_phys_params(container, scope)
+    if rows is None:
+        sys.stderr.write("(WARN) No values found in AMI for dataset '%s'\n"
+                         % data['name'])
+        return False
+    for row in rows:
+        p_name, p_val = None, None
+        for field in row['field']:
+            if field['@name'] == 'paramName':
+                p_name = field['$']
+            elif field['@name'] == 'paramValue':
+                p_val = field['$']
+            if p_name and p_val:
+                data[p_name] = p_val
+                break
+    return True
+
+
+def get_phys_params(container, scope):
+    """ Get physics parameters of a container from AMI.
+
+    :param container: container name
+    :type container: str
+    :param scope: container scope
+    :type scope: str
+
+    :return: rows of AMI response (None if no values found)
+    :rtype: list, NoneType
+    """
     ami_client = get_ami_client()
     exec_params = {'command': ['GetPhysicsParamsForDataset',
                                '--logicalDatasetName=%s' % container,
@@ -203,20 +278,8 @@ def amiPhysValues(data):
     except Exception:
         raise Exception("Unexpected AMI response: %s" % json_str)
     if not rowset:
-        sys.stderr.write("(WARN) No values found in AMI for dataset '%s'\n"
-                         % data['name'])
-        return False
-    for row in rowset[0]['row']:
-        p_name, p_val = None, None
-        for field in row['field']:
-            if field['@name'] == 'paramName':
-                p_name = field['$']
-            elif field['@name'] == 'paramValue':
-                p_val = field['$']
-            if p_name and p_val:
-                data[p_name] = p_val
-                break
-    return True
+        return None
+    return rowset[0]['row']
 
 
 def change_key_names(data):
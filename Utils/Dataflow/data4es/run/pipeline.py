@@ -0,0 +1,22 @@
+#!/bin/env python
+"""
+Run 'data4es' processing stages as a single process.
+
+Thin wrapper around :py:mod:`pyDKB.dataflow.pipeline`.
+"""
+
+import os
+import sys
+
+base_dir = os.path.abspath(os.path.dirname(__file__))
+
+try:
+    sys.path.append(os.path.join(base_dir, os.pardir))
+    from pyDKB.dataflow import pipeline
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    pipeline.main(sys.argv[1:])
@@ -2,8 +2,10 @@
 pyDKB.common.LoggableObject
 """
 
+import sys
+
 from .types import logLevel
-from .misc import log
+from .misc import log_from
 
 
 class LoggableObject(object):
@@ -18,4 +20,4 @@ class LoggableObject(object):
         :param level: log level of the message
         :type level: ``pyDKB.common.types.logLevel`` member
         """
-        log(message, level, cls.__name__)
+        log_from(sys._getframe(1), message, level, cls.__name__)
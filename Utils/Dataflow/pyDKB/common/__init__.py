@@ -5,6 +5,7 @@ Common modules.
 from .exceptions import *
 from . import hdfs
 from . import json_utils as json
+from . import json_codec
 from .custom_readline import custom_readline
 from .Type import Type
 from .LoggableObject import LoggableObject
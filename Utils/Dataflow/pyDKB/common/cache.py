@@ -0,0 +1,321 @@
+"""
+pyDKB.common.cache
+
+Persistent cache for lookups in external metadata services.
+
+Results of requests (e.g. Rucio or AMI metadata of a dataset) are kept in
+an SQLite database file, so that they survive between stage runs and
+can be shared by several stages (every cached function has its own
+namespace within the file). Features:
+
+* every entry expires after a TTL;
+* "negative" results (e.g. "dataset not found") are cached as well, but
+  with their own (usually shorter) TTL;
+* number of entries is limited: least recently used ones are evicted
+  when the limit is exceeded;
+* hit/miss statistics are collected.
+
+Values are stored as JSON, so only JSON-serializable results can be
+cached (and cached values are returned as decoded from JSON: tuples
+become lists, etc).
+
+Usage::
+
+  cache = Cache('lookups.db')
+  get_metadata = cache.cached(get_metadata, 'rucio.get_metadata')
+
+Cache failures (e.g. locked or corrupted database) never break the
+wrapped calls: they are logged and the request is made as if the value
+were not cached.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+import functools
+
+from . import CacheException
+from .misc import log, logLevel
+
+# Default TTL of entries (seconds)
+TTL = 7 * 24 * 3600
+
+# Default TTL of negative entries (seconds)
+NEGATIVE_TTL = 24 * 3600
+
+# Default max number of entries (0 -- unlimited)
+MAX_ENTRIES = 100000
+
+# Number of writes between checks of the number of entries
+EVICT_INTERVAL = 1000
+
+# Time to wait for a database lock held by another process (seconds)
+LOCK_TIMEOUT = 30
+
+# Statistics counters
+STATS = ('hits', 'negative_hits', 'misses', 'expired', 'stored',
+         'evicted', 'errors')
+
+SCHEMA = ("""CREATE TABLE IF NOT EXISTS cache (
+                 namespace TEXT NOT NULL,
+                 key TEXT NOT NULL,
+                 value TEXT NOT NULL,
+                 negative INTEGER NOT NULL,
+                 expires REAL NOT NULL,
+                 accessed REAL NOT NULL,
+                 PRIMARY KEY (namespace, key))""",
+          "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+# Marker for "no value in the cache"
+MISSING = object()
+
+
+def is_none(value):
+    """ Check if value is None (default check for negative results). """
+    return value is None
+
+
+def default_key(*args, **kwargs):
+    """ Construct cache key from function arguments. """
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+class Cache(object):
+    """ Persistent key/value cache with TTL and LRU eviction.
+
+    All methods are thread-safe; the database file can be used by
+    several processes at the same time.
+    """
+
+    def __init__(self, fname, ttl=TTL, negative_ttl=NEGATIVE_TTL,
+                 max_entries=MAX_ENTRIES):
+        """ Open (or create) cache database.
+
+        :raises CacheException: failed to open database
+
+        :param fname: database file name
+        :type fname: str
+        :param ttl: TTL of entries (seconds)
+        :type ttl: float
+        :param negative_ttl: TTL of negative entries (seconds)
+        :type negative_ttl: float
+        :param max_entries: max number of entries (0 -- unlimited)
+        :type max_entries: int
+        """
+        self.fname = fname
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.statistics = dict((name, 0) for name in STATS)
+        self._writes = 0
+        self._lock = threading.Lock()
+        try:
+            self._db = sqlite3.connect(fname, timeout=LOCK_TIMEOUT,
+                                       isolation_level=None,
+                                       check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                self._db.execute(statement)
+        except sqlite3.Error as err:
+            raise CacheException("Failed to open cache database (%s): %s"
+                                 % (fname, err))
+
+    def _failed(self, action, err):
+        """ Log cache failure. """
+        self.statistics['errors'] += 1
+        log("Cache %s failed (%s): %s" % (action, self.fname, err),
+            logLevel.WARN, self.__class__.__name__)
+
+    def lookup(self, namespace, key):
+        """ Get entry from the cache.
+
+        :param namespace: namespace name
+        :type namespace: str
+        :param key: key
+        :type key: str
+
+        :return: value (``MISSING`` if not found or expired) and flag
+                 "value is negative"
+        :rtype: tuple
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    'SELECT value, negative, expires FROM cache'
+                    ' WHERE namespace = ? AND key = ?',
+                    (namespace, key)).fetchone()
+                if row and row[2] < now:
+                    self._db.execute('DELETE FROM cache WHERE namespace = ?'
+                                     ' AND key = ?', (namespace, key))
+                    self.statistics['expired'] += 1
+                    row = None
+                elif row:
+                    self._db.execute('UPDATE cache SET accessed = ?'
+                                     ' WHERE namespace = ? AND key = ?',
+                                     (now, namespace, key))
+            except sqlite3.Error as err:
+                self._failed('lookup', err)
+                row = None
+            if not row:
+                self.statistics['misses'] += 1
+                return MISSING, False
+            self.statistics['negative_hits' if row[1] else 'hits'] += 1
+        return json.loads(row[0]), bool(row[1])
+
+    def get(self, namespace, key, default=None):
+        """ Get value from the cache.
+
+        :return: cached value or ``default`` (if not found or expired)
+        """
+        value, negative = self.lookup(namespace, key)
+        if value is MISSING:
+            return default
+        return value
+
+    def set(self, namespace, key, value, negative=False, ttl=None):
+        """ Put value to the cache.
+
+        :param namespace: namespace name
+        :type namespace: str
+        :param key: key
+        :type key: str
+        :param value: value (JSON-serializable)
+        :type value: object
+        :param negative: if the value is a negative result
+        :type negative: bool
+        :param ttl: TTL (default: ``ttl`` or ``negative_ttl`` of the
+                    cache)
+        :type ttl: float
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError) as err:
+            self._failed('store', err)
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute('INSERT OR REPLACE INTO cache VALUES'
+                                 ' (?, ?, ?, ?, ?, ?)',
+                                 (namespace, key, data, int(bool(negative)),
+                                  now + ttl, now))
+                self.statistics['stored'] += 1
+                self._writes += 1
+                if self._writes >= EVICT_INTERVAL:
+                    self._evict()
+            except sqlite3.Error as err:
+                self._failed('store', err)
+
+    def delete(self, namespace, key):
+        """ Remove entry from the cache. """
+        with self._lock:
+            try:
+                self._db.execute('DELETE FROM cache WHERE namespace = ?'
+                                 ' AND key = ?', (namespace, key))
+            except sqlite3.Error as err:
+                self._failed('delete', err)
+
+    def clear(self, namespace=None):
+        """ Remove all entries (of the namespace) from the cache. """
+        with self._lock:
+            try:
+                if namespace is None:
+                    self._db.execute('DELETE FROM cache')
+                else:
+                    self._db.execute('DELETE FROM cache WHERE'
+                                     ' namespace = ?', (namespace, ))
+            except sqlite3.Error as err:
+                self._failed('clear', err)
+
+    def _evict(self):
+        """ Remove expired entries and (LRU) ones exceeding the limit.
+
+        Must be called with the lock acquired.
+        """
+        self._writes = 0
+        cur = self._db.execute('DELETE FROM cache WHERE expires < ?',
+                               (time.time(), ))
+        self.statistics['expired'] += max(cur.rowcount, 0)
+        if not self.max_entries:
+            return
+        n = self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if n <= self.max_entries:
+            return
+        cur = self._db.execute('DELETE FROM cache WHERE rowid IN'
+                               ' (SELECT rowid FROM cache'
+                               ' ORDER BY accessed LIMIT ?)',
+                               (n - self.max_entries, ))
+        self.statistics['evicted'] += max(cur.rowcount, 0)
+
+    def evict(self):
+        """ Remove expired and least recently used entries now. """
+        with self._lock:
+            try:
+                self._evict()
+            except sqlite3.Error as err:
+                self._failed('eviction', err)
+
+    def cached(self, func, namespace=None, key=default_key,
+               negative=is_none):
+        """ Wrap function with the cache.
+
+        Result of the function is looked up in the cache before the call
+        and stored after. Exceptions are not cached.
+
+        :param func: function to wrap
+        :type func: function
+        :param namespace: namespace for the results (default: function
+                          name)
+        :type namespace: str
+        :param key: function to construct key from the call arguments
+        :type key: function
+        :param negative: function to check if result is a negative one
+                         (default: ``is_none()``)
+        :type negative: function
+
+        :return: wrapped function
+        :rtype: function
+        """
+        if namespace is None:
+            namespace = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs)
+            value, is_negative = self.lookup(namespace, k)
+            if value is MISSING:
+                value = func(*args, **kwargs)
+                self.set(namespace, k, value, negative(value))
+            return value
+        return wrapper
+
+    def stats(self):
+        """ Get hit/miss statistics.
+
+        :return: counters (see ``STATS``) and hit ratio
+        :rtype: dict
+        """
+        with self._lock:
+            result = dict(self.statistics)
+        lookups = result['hits'] + result['negative_hits'] + result['misses']
+        result['hit_ratio'] = (float(result['hits'] + result['negative_hits'])
+                               / lookups) if lookups else 0.0
+        return result
+
+    def close(self):
+        """ Evict exceeding entries and close the database. """
+        with self._lock:
+            if self._db is None:
+                return
+            try:
+                if self._writes:
+                    self._evict()
+                self._db.close()
+            except sqlite3.Error as err:
+                self._failed('close', err)
+            self._db = None
@@ -0,0 +1,228 @@
+"""
+pyDKB.common.compression
+
+Transparent compression of text (e.g. NDJSON) files.
+
+Supported methods:
+
+* ``gzip`` (``*.gz`` files) -- standard library;
+* ``zstd`` (``*.zst`` files) -- requires ``zstandard`` module.
+
+Data are (de)compressed on the fly while being read or written, so memory
+consumption does not depend on the file size. Compressed files are not
+seekable; messages are read from them with ``CompressedFile.messages()``.
+
+Usage::
+
+  with open_file('tasks.json.gz') as f:
+      for line in f:
+          ...
+  with open_file('tasks.json.zst', 'w') as f:
+      f.write(data)
+"""
+
+import io
+import gzip
+import importlib
+
+from . import CompressionException
+
+# Supported methods: file name suffix
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+METHODS = tuple(sorted(SUFFIXES))
+
+# Default compression levels (tuned for speed rather than ratio)
+LEVELS = {'gzip': 6, 'zstd': 3}
+
+# Size of decompressed data to read at once (characters)
+CHUNK_SIZE = 64 * 1024
+
+
+def _zstandard():
+    """ Import ``zstandard`` module (needed for zstd only). """
+    try:
+        return importlib.import_module('zstandard')
+    except ImportError:
+        raise CompressionException("Module 'zstandard' is required for"
+                                   " zstd compression.")
+
+
+def check(method):
+    """ Check if compression method is supported.
+
+    :raises CompressionException: unknown method or required module
+                                  is not installed
+    """
+    if method not in SUFFIXES:
+        raise CompressionException("Unknown compression method: '%s'"
+                                   " (expected one of: %s)"
+                                   % (method, ', '.join(METHODS)))
+    if method == 'zstd':
+        _zstandard()
+
+
+def detect(fname):
+    """ Detect compression method by file name suffix.
+
+    :param fname: file name
+    :type fname: str
+
+    :return: method name or None (not compressed)
+    :rtype: str, NoneType
+    """
+    lname = fname.lower()
+    for method, suffix in SUFFIXES.items():
+        if lname.endswith(suffix):
+            return method
+    return None
+
+
+def suffix(method):
+    """ Get file name suffix for the compression method ('' for None). """
+    return SUFFIXES[method] if method else ''
+
+
+def strip_suffix(fname):
+    """ Remove compression suffix (if any) from file name. """
+    method = detect(fname)
+    if method:
+        fname = fname[:-len(SUFFIXES[method])]
+    return fname
+
+
+class CompressedFile(io.TextIOWrapper):
+    """ Text file, compressed or decompressed on the fly.
+
+    Closing the file finalizes the compressed data and closes the
+    underlying (binary) file object.
+    """
+
+    def __init__(self, fileobj, method, mode='r', level=None):
+        """ Initialize file object.
+
+        :raises CompressionException: unknown method or required module
+                                      is not installed
+
+        :param fileobj: underlying file object (binary one or text one
+                        with binary ``buffer``)
+        :type fileobj: file
+        :param method: compression method (see ``METHODS``)
+        :type method: str
+        :param mode: 'r' (decompress) or 'w' (compress)
+        :type mode: str
+        :param level: compression level (default: see ``LEVELS``)
+        :type level: int
+        """
+        check(method)
+        if mode not in ('r', 'w'):
+            raise ValueError("CompressedFile expects mode 'r' or 'w'"
+                             " (got '%s')" % mode)
+        if level is None:
+            level = LEVELS[method]
+        raw = getattr(fileobj, 'buffer', fileobj)
+        if method == 'gzip':
+            binary = gzip.GzipFile(fileobj=raw, mode=mode + 'b',
+                                   compresslevel=level)
+        elif mode == 'r':
+            zstd = _zstandard()
+            binary = zstd.open(raw, 'rb', closefd=False)
+        else:
+            zstd = _zstandard()
+            binary = zstd.open(raw, 'wb', closefd=False,
+                               cctx=zstd.ZstdCompressor(level=level))
+        self._fileobj = fileobj
+        self.method = method
+        super(CompressedFile, self).__init__(binary, encoding='utf-8')
+        self.mode = mode
+
+    def seekable(self):
+        """ Compressed files are read and written sequentially only. """
+        return False
+
+    def close(self):
+        """ Finalize compressed data and close the file. """
+        if self.closed:
+            return
+        try:
+            super(CompressedFile, self).close()
+        finally:
+            self._fileobj.close()
+
+    def messages(self, newline, size=CHUNK_SIZE):
+        """ Read messages separated with ``newline``.
+
+        Works as :py:func:`pyDKB.common.custom_readline` (including the
+        check ``send(True)``), which can not be used for compressed data
+        as it reads the file descriptor directly.
+
+        :param newline: message separator ('' -- whole file is a single
+                        message)
+        :type newline: str
+        :param size: size of data to read at once (characters)
+        :type size: int
+
+        :return: iterable object
+        :rtype: generator
+        """
+        n = len(newline)
+        buf = ''
+        pos = 0
+        eof = False
+        while True:
+            idx = buf.find(newline, pos) if n else -1
+            while idx < 0 and not eof:
+                chunk = self.read(size)
+                if not chunk:
+                    eof = True
+                    break
+                # Separator may be split between chunks
+                start = max(len(buf) - pos - n + 1, 0)
+                buf = buf[pos:] + chunk
+                pos = 0
+                if n:
+                    idx = buf.find(newline, start)
+            if idx >= 0:
+                end = idx + n
+            elif pos < len(buf):
+                end = len(buf)
+            else:
+                return
+            msg = buf[pos:end]
+            pos = end
+            check = yield msg
+            while check:
+                if pos == len(buf) and not eof:
+                    buf, pos = self.read(size), 0
+                    eof = not buf
+                if pos == len(buf):
+                    return
+                check = yield True
+
+
+def open_file(fname, mode='r', method=None, level=None):
+    """ Open (compressed) text file.
+
+    :param fname: file name
+    :type fname: str
+    :param mode: 'r' (read) or 'w' (write)
+    :type mode: str
+    :param method: compression method (default: detected by the file name
+                   suffix, see ``detect()``)
+    :type method: str
+    :param level: compression level (for writing)
+    :type level: int
+
+    :return: open file object
+    :rtype: file, CompressedFile
+    """
+    if method is None:
+        method = detect(fname)
+    if not method:
+        return open(fname, mode)
+    fileobj = open(fname, mode + 'b')
+    try:
+        return CompressedFile(fileobj, method, mode, level)
+    except BaseException:
+        fileobj.close()
+        raise
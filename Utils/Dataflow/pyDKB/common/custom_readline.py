@@ -1,13 +1,15 @@
 """
 Implementation of "readline"-like functionality for custom separator.
 
-.. todo:: make import of ``fcntl`` (or of this module) optional
+.. todo:: make import of ``select`` (or of this module) optional
   to avoid errors when library is used under Windows.
 """
 
 import select
 import os
-import fcntl
+
+# Max number of bytes to read from the file descriptor at once
+CHUNK_SIZE = 65536
 
 
 def custom_readline(f, newline):
@@ -22,9 +24,23 @@ def custom_readline(f, newline):
 
     To check if iteration is not over without reading next value, one may
     `send(True)` to the generator: it will return `True` if there is another
-    message to yield or raise `StopIteration` if nothing left.
+    message to yield (or the stream is still open and may provide one)
+    or raise `StopIteration` if nothing left. This check never blocks.
+
+    Data are read directly from the file descriptor into a byte buffer,
+    which is scanned for separators only once: every message is found
+    and yielded in time proportional to its length, no matter how many
+    messages come in one chunk. ``next()`` blocks until the next message
+    (or end of data) is available.
 
-    :param f: readable file object
+    Data already buffered by the file object (if ``f`` is a buffered
+    binary file or a text file over one) are taken first. Text decoded
+    by ``f`` in advance can not be taken back: ``f`` must not be read
+    as text before (e.g. with ``f.readline()``).
+
+    :param f: readable file object (with ``fileno()`` method); text is
+              decoded according to its ``encoding`` and ``errors``
+              attributes (if any)
     :type f: file
     :param newline: delimeter to be used instead of ``\\n``
     :type newline: str
@@ -40,34 +56,65 @@ def custom_readline(f, newline):
 
     .. [1] https://github.com/PanDAWMS/dkb/pull/129
     """
+    fd = f.fileno()
+    # Buffered reader (if any) to take data already buffered by ``f`` from
+    reader = getattr(f, 'buffer', f)
+    if not hasattr(reader, 'peek'):
+        reader = None
+    encoding = getattr(f, 'encoding', None) or 'utf-8'
+    errors = getattr(f, 'errors', None) or 'strict'
+    sep = newline.encode(encoding)
     poller = select.poll()
-    poller.register(f, select.POLLIN)
-    flags = fcntl.fcntl(f.fileno(), fcntl.F_GETFL)
-    fcntl.fcntl(f.fileno(), fcntl.F_SETFL, flags | os.O_NONBLOCK)
-    buf = ""
+    poller.register(fd, select.POLLIN)
+    buf = bytearray()
+    # Start of the first not yet yielded message
+    start = 0
+    # Position to continue search for separator from
+    scan = 0
+    eof = False
     # Flag variable to say send() from next()
     send_not_next = None
     while True:
-        if poller.poll(500):
-            chunk = f.read()
-            if not chunk:
-                if buf:
-                    while send_not_next:
-                        # If we are here, the source is not empty for sure:
-                        # we have another message to yield
-                        send_not_next = yield True
-                    yield buf
-                break
-            buf += chunk
-        if send_not_next:
-            # We keep on reading the stream, so it is not closed yet
-            # and (in theory) may provide another message sooner or later
-            send_not_next = yield True
-        while newline in buf:
-            pos = buf.index(newline) + len(newline)
+        end = buf.find(sep, scan)
+        if end >= 0:
+            end += len(sep)
+            msg = buf[start:end].decode(encoding, errors)
+            start = scan = end
             while send_not_next:
                 # If we are here, the source is not empty for sure:
                 # we have another message to yield
                 send_not_next = yield True
-            send_not_next = yield buf[:pos]
-            buf = buf[pos:]
+            send_not_next = yield msg
+            continue
+        # No separator in the buffer: next search should start
+        # where the separator could begin
+        scan = max(start, len(buf) - len(sep) + 1)
+        if eof:
+            if start < len(buf):
+                while send_not_next:
+                    send_not_next = yield True
+                yield buf[start:].decode(encoding, errors)
+            break
+        if send_not_next and not poller.poll(0):
+            # Nothing to read right now, but the stream is not closed yet
+            # and (in theory) may provide another message sooner or later
+            send_not_next = yield True
+            continue
+        if reader:
+            # First read: data buffered by the file object (or, if there are
+            # none, the first data available in the file)
+            chunk = reader.read1(len(reader.peek(1)))
+            reader = None
+        else:
+            if not send_not_next:
+                poller.poll()
+            chunk = os.read(fd, CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            continue
+        if start:
+            # Drop already yielded messages (once per chunk)
+            del buf[:start]
+            scan -= start
+            start = 0
+        buf += chunk
@@ -2,9 +2,19 @@
 Definition of common modules exceptions
 """
 
-__all__ = ["HDFSException"]
+__all__ = ["HDFSException", "CacheException", "CompressionException"]
 
 
 class HDFSException(RuntimeError):
     """ Base Exception for HDFS module. """
     pass
+
+
+class CacheException(RuntimeError):
+    """ Base Exception for cache module. """
+    pass
+
+
+class CompressionException(RuntimeError):
+    """ Base Exception for compression module. """
+    pass
@@ -1,13 +1,43 @@
 """
 Utils to interact with HDFS.
+
+HDFS operations are performed by one of the backends:
+
+* ``cli``     -- ``hadoop fs`` command line client (default). Every
+                 operation starts a new process (and JVM), which makes
+                 operations with many small files rather expensive;
+* ``webhdfs`` -- WebHDFS REST API client. Connections to the NameNode
+                 and DataNodes are kept alive and reused between the
+                 operations; batched operations (``putfiles()``,
+                 ``getfiles()``) transfer files in parallel over a pool
+                 of connections.
+
+Backend is selected at import time according to the environment variables
+``DKB_HDFS_BACKEND`` (backend name), ``DKB_WEBHDFS_URL`` (WebHDFS
+NameNode URL, e.g. ``http://namenode:9870``) and ``DKB_HDFS_USER`` (HDFS
+user name); it can be changed with ``set_backend()``.
 """
 
+import io
 import sys
+import json
+import shutil
+import socket
+import getpass
 import subprocess
 import select
 import os
 import posixpath as path
 import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import (urlsplit, urlencode, quote)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 from . import HDFSException
 from .misc import (log, logLevel)
@@ -15,6 +45,20 @@ from .misc import (log, logLevel)
 DEVNULL = open(os.path.devnull, "w")
 DKB_HOME = "/user/DKB/"
 
+# Default size of read-ahead buffer for streamed HDFS files (bytes)
+READAHEAD = 1024 * 1024
+
+# Linux-specific fcntl command to change pipe capacity
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+
+# Environment variables to choose and configure backend
+ENV_BACKEND = 'DKB_HDFS_BACKEND'
+ENV_URL = 'DKB_WEBHDFS_URL'
+ENV_USER = 'DKB_HDFS_USER'
+
+# Current backend
+_backend = None
+
 
 def check_stderr(proc, timeout=None, max_lines=1):
     """ Wait till the end of the subprocess and send its STDERR to STDERR.
@@ -40,36 +84,622 @@ def check_stderr(proc, timeout=None, max_lines=1):
     return proc.poll()
 
 
+class PipeFile(io.TextIOWrapper):
+    """ HDFS file, streamed through a pipe without a local copy.
+
+    Data are read from the pipe as soon as they are available. Read-ahead
+    is bounded: the writer (filling the pipe with the file content)
+    is blocked when the pipe (and the read buffer) of ``readahead`` bytes
+    is full.
+
+    If the whole file was read, but the writer failed (e.g. the file does
+    not exist or connection was lost), the error is raised by ``close()``
+    (as ``HDFSException``). If the file is closed before all its data were
+    read, the writer is stopped silently.
+    """
+
+    def __init__(self, pipe, fname, readahead=READAHEAD):
+        """ Initialize file object.
+
+        :param pipe: read end of the pipe
+        :type pipe: io.FileIO
+        :param fname: HDFS file name
+        :type fname: str
+        :param readahead: max number of bytes to read in advance
+        :type readahead: int
+        """
+        self.hdfs_name = fname
+        if fcntl:
+            try:
+                fcntl.fcntl(pipe.fileno(), F_SETPIPE_SZ, readahead // 2)
+            except (OSError, IOError):
+                # Not supported: default pipe capacity is used
+                pass
+        bufsize = max(readahead // 2, io.DEFAULT_BUFFER_SIZE)
+        super(PipeFile, self).__init__(io.BufferedReader(pipe, bufsize))
+        self.mode = 'r'
+
+    def _at_eof(self):
+        """ Check (without blocking) if the pipe is read till the end. """
+        fd = self.buffer.raw.fileno()
+        ready, _, _ = select.select((fd, ), (), (), 0)
+        return bool(ready) and not os.read(fd, 1)
+
+    def _finish(self, eof):
+        """ Stop (or wait for) the writer after the pipe is closed.
+
+        :param eof: if the pipe was read till the end
+        :type eof: bool
+
+        :return: error message (if the writer failed)
+        :rtype: str, NoneType
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """ Close the file and finish the writer.
+
+        :raises HDFSException: file was read till the end, but
+                               the writer failed
+        """
+        if self.closed:
+            return
+        eof = self._at_eof()
+        super(PipeFile, self).close()
+        err = self._finish(eof)
+        if eof and err:
+            raise HDFSException("Failed to get file from HDFS: %s\n"
+                                "Error message: %s" % (self.hdfs_name, err))
+
+
+class StreamFile(PipeFile):
+    """ HDFS file, streamed from ``hadoop fs -cat``. """
+
+    def __init__(self, fname, readahead=READAHEAD):
+        """ Start ``hadoop fs -cat`` process.
+
+        :raises HDFSException: failed to start the process
+
+        :param fname: HDFS file name
+        :type fname: str
+        :param readahead: max number of bytes to read in advance
+        :type readahead: int
+        """
+        self._cmd = ["hadoop", "fs", "-cat", fname]
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._proc = subprocess.Popen(self._cmd,
+                                          stdin=DEVNULL,
+                                          stderr=self._stderr,
+                                          stdout=subprocess.PIPE,
+                                          bufsize=0)
+        except OSError as err:
+            self._stderr.close()
+            raise HDFSException("Failed to get file from HDFS: %s\n"
+                                "Error message: %s\n" % (fname, err))
+        super(StreamFile, self).__init__(self._proc.stdout, fname, readahead)
+
+    def _finish(self, eof):
+        """ Finish ``hadoop`` process. """
+        if not eof and self._proc.poll() is None:
+            self._proc.terminate()
+        code = self._proc.wait()
+        self._stderr.seek(0)
+        err = self._stderr.read().decode('utf-8', 'replace').strip()
+        self._stderr.close()
+        if code:
+            return ("Command '%s' returned non-zero exit status %d.\n%s"
+                    % (' '.join(self._cmd), code, err))
+        return None
+
+
+class WebHDFSFile(PipeFile):
+    """ HDFS file, streamed from WebHDFS.
+
+    File content is written to the pipe by a background thread.
+    """
+
+    def __init__(self, client, fname, readahead=READAHEAD):
+        """ Start reading the file.
+
+        :param client: WebHDFS client
+        :type client: WebHDFSBackend
+        :param fname: HDFS file name
+        :type fname: str
+        :param readahead: max number of bytes to read in advance
+        :type readahead: int
+        """
+        r, w = os.pipe()
+        self._error = None
+        self._writer = threading.Thread(target=self._copy,
+                                        args=(client, fname, w))
+        self._writer.daemon = True
+        super(WebHDFSFile, self).__init__(io.FileIO(r, 'r'), fname,
+                                          readahead)
+        self._writer.start()
+
+    def _copy(self, client, fname, fd):
+        """ Write file content to the pipe. """
+        try:
+            with io.FileIO(fd, 'w') as pipe:
+                client.read(fname, pipe.write)
+        except BrokenPipeError:
+            # Reader closed the file
+            pass
+        except Exception as err:
+            self._error = str(err)
+
+    def _finish(self, eof):
+        """ Wait for the background thread. """
+        self._writer.join()
+        return self._error
+
+
+class CLIBackend(object):
+    """ HDFS client, running ``hadoop fs`` commands. """
+
+    name = 'cli'
+
+    def _run(self, cmd, errmsg):
+        """ Run ``hadoop`` command.
+
+        :raises HDFSException: command failed
+
+        :param cmd: command
+        :type cmd: list
+        :param errmsg: first line of the error message
+        :type errmsg: str
+        """
+        try:
+            proc = subprocess.Popen(cmd,
+                                    stdin=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    stdout=DEVNULL)
+            check_stderr(proc)
+        except (subprocess.CalledProcessError, OSError) as err:
+            if isinstance(err, subprocess.CalledProcessError):
+                err.cmd = ' '.join(cmd)
+            raise HDFSException("%s\nError message: %s\n" % (errmsg, err))
+
+    def makedirs(self, dirname):
+        """ Try to create directory (with parents). """
+        self._run(["hadoop", "fs", "-mkdir", "-p", dirname],
+                  "Failed to create HDFS directory: %s" % dirname)
+
+    def putfiles(self, fnames, dest):
+        """ Upload files to HDFS with a single command. """
+        self._run(["hadoop", "fs", "-put"] + list(fnames) + [dest],
+                  "Failed to put file to HDFS: %s" % ', '.join(fnames))
+
+    def getfiles(self, fnames, dest=os.curdir):
+        """ Download files from HDFS with a single command. """
+        self._run(["hadoop", "fs", "-get"] + list(fnames) + [dest],
+                  "Failed to get file from HDFS: %s" % ', '.join(fnames))
+
+    def open(self, fname, readahead=READAHEAD):
+        """ Open HDFS file for streaming. """
+        return StreamFile(fname, readahead)
+
+    def listdir(self, dirname):
+        """ List HDFS directory.
+
+        :return: names of subdirectories and files
+        :rtype: tuple(list, list)
+        """
+        cmd = ["hadoop", "fs", "-ls", dirname]
+        out = []
+        try:
+            # Use PIPE for all the std* to avoid catching and/or blocking
+            # current process std*
+            proc = subprocess.Popen(cmd,
+                                    stdin=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    stdout=subprocess.PIPE)
+            while proc.poll() is None:
+                timeout = 0.1
+                check_stderr(proc, timeout)
+                ready, _, _ = select.select((proc.stdout, ), (), (), timeout)
+                if ready:
+                    out.append(proc.stdout.readline().strip())
+            if proc.poll():
+                raise subprocess.CalledProcessError(proc.returncode,
+                                                    ' '.join(cmd))
+        except (subprocess.CalledProcessError, OSError) as err:
+            if isinstance(err, subprocess.CalledProcessError):
+                err.cmd = ' '.join(cmd)
+            raise HDFSException("Failed to list the HDFS directory: %s\n"
+                                "Error message: %s\n" % (dirname, err))
+
+        # Parse output of `ls`:
+        # {{{
+        # Found 3 items
+        # -rwxrwx---   3 $user  $group 1114404 2016-09-28 16:11 /path/to/file1
+        # -rwxrwx---   3 $user  $group 1572867 2016-09-28 16:11 /path/to/file2
+        # drwxrwx---   - $user  $group       0 2017-05-22 14:07 /path/to/subdir
+        # }}}
+
+        subdirs, files = [], []
+        for line in out:
+            line = line.split(None, 7)
+            if len(line) != 8:
+                continue
+
+            # We need to return only the name of the file or subdir
+            filename = line[7]
+            filename = basename(filename)
+            if line[0][0] == 'd':
+                subdirs.append(filename)
+            elif line[0][0] == '-':
+                files.append(filename)
+        return subdirs, files
+
+    def close(self):
+        """ Release resources (nothing to release). """
+        pass
+
+
+class WebHDFSBackend(object):
+    """ HDFS client, using WebHDFS REST API.
+
+    HTTP connections are kept in a pool (per host) and reused, so that
+    a series of operations does not pay for connection setup every time.
+
+    Class/instance variable description:
+
+    * Idle connections: {(scheme, netloc): [HTTPConnection, ...]}
+        _pool
+    """
+
+    name = 'webhdfs'
+
+    # REST API path prefix
+    PREFIX = '/webhdfs/v1'
+
+    # Max number of idle connections per host (and parallel transfers)
+    POOL_SIZE = 4
+
+    # Socket timeout (seconds)
+    TIMEOUT = 60
+
+    # Size of data chunks read from the response (bytes)
+    CHUNK_SIZE = 65536
+
+    def __init__(self, url=None, user=None, pool_size=POOL_SIZE,
+                 timeout=TIMEOUT):
+        """ Initialize client.
+
+        :raises ValueError: URL is not specified or is invalid
+
+        :param url: NameNode URL (default: ``DKB_WEBHDFS_URL``)
+        :type url: str
+        :param user: HDFS user name (default: ``DKB_HDFS_USER`` or
+                     current user)
+        :type user: str
+        :param pool_size: max number of idle connections per host
+        :type pool_size: int
+        :param timeout: socket timeout (seconds)
+        :type timeout: float
+        """
+        url = url or os.environ.get(ENV_URL)
+        if not url:
+            raise ValueError("WebHDFS URL is not specified (%s)" % ENV_URL)
+        if '://' not in url:
+            url = 'http://' + url
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise ValueError("Invalid WebHDFS URL: '%s'" % url)
+        self.url = '%s://%s' % (parts.scheme, parts.netloc)
+        self.user = user or os.environ.get(ENV_USER) or getpass.getuser()
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._pool = {}
+        self._lock = threading.Lock()
+
+    def _url(self, fname, op, **params):
+        """ Construct operation URL for HDFS file. """
+        if not path.isabs(fname):
+            fname = path.join('/user', self.user, fname)
+        params['op'] = op
+        params['user.name'] = self.user
+        return '%s%s%s?%s' % (self.url, self.PREFIX,
+                              quote(path.normpath(fname)), urlencode(params))
+
+    def _connection(self, key):
+        """ Take idle connection from the pool or create new one.
+
+        :return: connection and flag if it was used before
+        :rtype: tuple(http.client.HTTPConnection, bool)
+        """
+        with self._lock:
+            idle = self._pool.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, netloc = key
+        if scheme == 'https':
+            cls = http.client.HTTPSConnection
+        else:
+            cls = http.client.HTTPConnection
+        conn = cls(netloc, timeout=self.timeout)
+        conn.connect()
+        # Request headers and body are sent separately: do not let them
+        # wait for (delayed) acknowledgement
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, False
+
+    def _release(self, key, conn, resp):
+        """ Return connection to the pool (if it can be reused). """
+        if resp.will_close:
+            conn.close()
+            return
+        with self._lock:
+            idle = self._pool.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, method, url, body=None, headers={}):
+        """ Send request and get response headers.
+
+        :return: response, pool key and connection
+        :rtype: tuple
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        target = parts.path + ('?' + parts.query if parts.query else '')
+        while True:
+            conn = None
+            try:
+                conn, reused = self._connection(key)
+                conn.request(method, target, body, headers)
+                return conn.getresponse(), key, conn
+            except (http.client.HTTPException, OSError):
+                if conn is None:
+                    raise
+                conn.close()
+                if not reused or (body is not None
+                                  and not hasattr(body, 'seek')):
+                    raise
+                # Idle connection was closed by server: retry with new one
+                if body is not None:
+                    body.seek(0)
+
+    def _finish(self, resp, key, conn):
+        """ Read the rest of the response and release connection. """
+        try:
+            data = resp.read()
+        except BaseException:
+            conn.close()
+            raise
+        self._release(key, conn, resp)
+        return data
+
+    @staticmethod
+    def _error(resp, data):
+        """ Construct error message from the error response. """
+        try:
+            err = json.loads(data.decode('utf-8'))['RemoteException']
+            return '%s: %s' % (err['exception'], err['message'])
+        except (ValueError, KeyError, TypeError):
+            return 'HTTP %d %s' % (resp.status, resp.reason)
+
+    def _call(self, method, fname, op, body=None, headers={}, **params):
+        """ Perform operation, following the redirect to a DataNode.
+
+        Request body (if any) is sent only after the redirect.
+
+        :raises HDFSException: operation failed
+
+        :return: response (not read yet), pool key and connection
+        :rtype: tuple
+        """
+        resp, key, conn = self._send(method, self._url(fname, op, **params))
+        if resp.status in (301, 302, 303, 307, 308):
+            location = resp.getheader('Location')
+            self._finish(resp, key, conn)
+            resp, key, conn = self._send(method, location, body, headers)
+        elif body is not None and resp.status < 300:
+            self._finish(resp, key, conn)
+            raise HDFSException("Unexpected response to %s (no redirect)"
+                                % op)
+        if resp.status >= 300:
+            raise HDFSException(self._error(resp,
+                                            self._finish(resp, key, conn)))
+        return resp, key, conn
+
+    def _json(self, method, fname, op, **params):
+        """ Perform operation and decode its (JSON) result. """
+        data = self._finish(*self._call(method, fname, op, **params))
+        return json.loads(data.decode('utf-8')) if data else None
+
+    def _map(self, func, *args):
+        """ Apply function to every set of arguments in parallel. """
+        args = list(zip(*args))
+        if len(args) < 2 or self.pool_size < 2:
+            return [func(*a) for a in args]
+        with ThreadPoolExecutor(min(self.pool_size, len(args))) as pool:
+            return list(pool.map(lambda a: func(*a), args))
+
+    def _isdir(self, fname):
+        """ Check if HDFS path is an existing directory. """
+        resp, key, conn = self._send('GET', self._url(fname,
+                                                      'GETFILESTATUS'))
+        data = self._finish(resp, key, conn)
+        if resp.status == 404:
+            return False
+        if resp.status >= 300:
+            raise HDFSException(self._error(resp, data))
+        status = json.loads(data.decode('utf-8'))['FileStatus']
+        return status['type'] == 'DIRECTORY'
+
+    def makedirs(self, dirname):
+        """ Try to create directory (with parents). """
+        try:
+            result = self._json('PUT', dirname, 'MKDIRS')
+            if not (result or {}).get('boolean'):
+                raise HDFSException("operation was not performed")
+        except (HDFSException, http.client.HTTPException, OSError) as err:
+            raise HDFSException("Failed to create HDFS directory: %s\n"
+                                "Error message: %s\n" % (dirname, err))
+
+    def _put(self, fname, dest):
+        """ Upload single file. """
+        try:
+            with open(fname, 'rb') as f:
+                headers = {'Content-Type': 'application/octet-stream',
+                           'Content-Length': str(os.fstat(f.fileno())
+                                                 .st_size)}
+                self._finish(*self._call('PUT', dest, 'CREATE', f, headers,
+                                         overwrite='false'))
+        except (HDFSException, http.client.HTTPException, OSError) as err:
+            raise HDFSException("Failed to put file to HDFS: %s\n"
+                                "Error message: %s\n" % (fname, err))
+
+    def putfiles(self, fnames, dest):
+        """ Upload files to HDFS (in parallel).
+
+        Just like ``hadoop fs -put``, a single file is uploaded
+        as ``dest``, unless ``dest`` is an existing directory.
+        """
+        fnames = list(fnames)
+        try:
+            to_dir = len(fnames) > 1 or self._isdir(dest)
+        except (HDFSException, http.client.HTTPException, OSError) as err:
+            raise HDFSException("Failed to put file to HDFS: %s\n"
+                                "Error message: %s\n"
+                                % (', '.join(fnames), err))
+        if to_dir:
+            dests = [path.join(dest, os.path.basename(f)) for f in fnames]
+        else:
+            dests = [dest]
+        self._map(self._put, fnames, dests)
+
+    def read(self, fname, write):
+        """ Read HDFS file, passing its content to ``write()`` by chunks.
+
+        :raises HDFSException: failed to read the file
+        """
+        resp, key, conn = self._call('GET', fname, 'OPEN')
+        try:
+            chunk = resp.read(self.CHUNK_SIZE)
+            while chunk:
+                write(chunk)
+                chunk = resp.read(self.CHUNK_SIZE)
+        except BaseException:
+            conn.close()
+            raise
+        self._release(key, conn, resp)
+
+    def _get(self, fname, dest):
+        """ Download single file. """
+        try:
+            with open(dest, 'xb') as f:
+                try:
+                    self.read(fname, f.write)
+                except BaseException:
+                    f.close()
+                    os.remove(dest)
+                    raise
+        except (HDFSException, http.client.HTTPException, OSError) as err:
+            raise HDFSException("Failed to get file from HDFS: %s\n"
+                                "Error message: %s\n" % (fname, err))
+
+    def getfiles(self, fnames, dest=os.curdir):
+        """ Download files from HDFS to local directory (in parallel). """
+        fnames = list(fnames)
+        dests = [os.path.join(dest, basename(f)) for f in fnames]
+        self._map(self._get, fnames, dests)
+
+    def open(self, fname, readahead=READAHEAD):
+        """ Open HDFS file for streaming. """
+        return WebHDFSFile(self, fname, readahead)
+
+    def listdir(self, dirname):
+        """ List HDFS directory.
+
+        :return: names of subdirectories and files
+        :rtype: tuple(list, list)
+        """
+        try:
+            result = self._json('GET', dirname, 'LISTSTATUS')
+            statuses = result['FileStatuses']['FileStatus']
+        except (HDFSException, http.client.HTTPException, OSError,
+                ValueError, KeyError, TypeError) as err:
+            raise HDFSException("Failed to list the HDFS directory: %s\n"
+                                "Error message: %s\n" % (dirname, err))
+        subdirs, files = [], []
+        for status in statuses:
+            if status.get('type') == 'DIRECTORY':
+                subdirs.append(status['pathSuffix'])
+            elif status.get('type') == 'FILE':
+                files.append(status['pathSuffix'])
+        return subdirs, files
+
+    def close(self):
+        """ Close idle connections. """
+        with self._lock:
+            pool, self._pool = self._pool, {}
+        for idle in pool.values():
+            for conn in idle:
+                conn.close()
+
+
+# Available backends
+BACKENDS = {CLIBackend.name: CLIBackend,
+            WebHDFSBackend.name: WebHDFSBackend}
+
+
+def set_backend(name=None, **kwargs):
+    """ Select HDFS backend.
+
+    :raises ValueError: unknown backend name or invalid backend parameters
+
+    :param name: backend name (one of ``BACKENDS``). If not specified,
+                 ``cli`` is selected
+    :type name: str, NoneType
+    :param kwargs: backend parameters (see backend class constructor)
+
+    :return: name of the selected backend
+    :rtype: str
+    """
+    global _backend
+    if name is None:
+        name = CLIBackend.name
+    if name not in BACKENDS:
+        raise ValueError("Unknown HDFS backend: '%s' (expected one of: %s)"
+                         % (name, ', '.join(sorted(BACKENDS))))
+    new_backend = BACKENDS[name](**kwargs)
+    if _backend:
+        _backend.close()
+    _backend = new_backend
+    return name
+
+
+def backend():
+    """ Return name of the current backend. """
+    return _backend.name
+
+
 def makedirs(dirname):
     """ Try to create directory (with parents). """
-    cmd = ["hadoop", "fs", "-mkdir", "-p", dirname]
-    try:
-        proc = subprocess.Popen(cmd,
-                                stdin=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdout=DEVNULL)
-        check_stderr(proc)
-    except (subprocess.CalledProcessError, OSError) as err:
-        if isinstance(err, subprocess.CalledProcessError):
-            err.cmd = ' '.join(cmd)
-        raise HDFSException("Failed to create HDFS directory: %s\n"
-                            "Error message: %s\n" % (dirname, err))
+    _backend.makedirs(dirname)
 
 
 def putfile(fname, dest):
     """ Upload file to HDFS. """
-    cmd = ["hadoop", "fs", "-put", fname, dest]
-    try:
-        proc = subprocess.Popen(cmd,
-                                stdin=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdout=DEVNULL)
-        check_stderr(proc)
-    except (subprocess.CalledProcessError, OSError) as err:
-        if isinstance(err, subprocess.CalledProcessError):
-            err.cmd = ' '.join(cmd)
-        raise HDFSException("Failed to put file to HDFS: %s\n"
-                            "Error message: %s\n" % (fname, err))
+    _backend.putfiles([fname], dest)
+
+
+def putfiles(fnames, dest_dir):
+    """ Upload files to HDFS directory with a single (batched) operation.
+
+    :param fnames: local file names
+    :type fnames: list
+    :param dest_dir: existing HDFS directory
+    :type dest_dir: str
+    """
+    if fnames:
+        _backend.putfiles(fnames, dest_dir)
 
 
 def movefile(fname, dest):
@@ -83,50 +713,74 @@ def movefile(fname, dest):
                 " (%s): %s" % (fname, err), logLevel.WARN)
 
 
+def movefiles(fnames, dest_dir):
+    """ Move local files to HDFS directory with a single operation. """
+    fnames = [f for f in fnames if os.path.exists(f)]
+    putfiles(fnames, dest_dir)
+    for fname in fnames:
+        try:
+            os.remove(fname)
+        except OSError as err:
+            log("Failed to remove local copy of HDFS file"
+                " (%s): %s" % (fname, err), logLevel.WARN)
+
+
 def getfile(fname):
     """ Download file from HDFS.
 
     Return value: file name (without directory)
     """
-    cmd = ["hadoop", "fs", "-get", fname]
-    name = basename(fname)
-    try:
-        proc = subprocess.Popen(cmd,
-                                stdin=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdout=DEVNULL)
-        check_stderr(proc)
-    except (subprocess.CalledProcessError, OSError) as err:
-        if isinstance(err, subprocess.CalledProcessError):
-            err.cmd = ' '.join(cmd)
-        raise HDFSException("Failed to get file from HDFS: %s\n"
-                            "Error message: %s\n" % (fname, err))
-    return name
+    _backend.getfiles([fname])
+    return basename(fname)
+
+
+def getfiles(fnames, dest_dir=os.curdir):
+    """ Download files from HDFS with a single (batched) operation.
+
+    :param fnames: HDFS file names
+    :type fnames: list
+    :param dest_dir: local directory
+    :type dest_dir: str
+
+    :return: local file names (without directory)
+    :rtype: list
+    """
+    if fnames:
+        _backend.getfiles(fnames, dest_dir)
+    return [basename(f) for f in fnames]
+
+
+def stream_file(fname, readahead=READAHEAD):
+    """ Open HDFS file for reading without a local copy.
+
+    :param fname: HDFS file name
+    :type fname: str
+    :param readahead: max number of bytes to read in advance
+    :type readahead: int
+
+    :return: open file object
+    :rtype: PipeFile
+    """
+    return _backend.open(fname, readahead)
 
 
-def File(fname):
+def File(fname, binary=False):
     """ Get and open temporary local copy of HDFS file
 
+    Parameters:
+        fname  -- HDFS file name
+        binary -- open file in binary mode (e.g. for compressed data)
+
     Return value: open file object (TemporaryFile).
     """
-    cmd = ["hadoop", "fs", "-cat", fname]
-    tmp_file = tempfile.TemporaryFile()
+    tmp_file = tempfile.TemporaryFile('w+b' if binary else 'w+')
     try:
-        proc = subprocess.Popen(cmd,
-                                stdin=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdout=tmp_file)
-        check_stderr(proc)
+        with stream_file(fname) as f:
+            shutil.copyfileobj(f.buffer if binary else f, tmp_file)
         tmp_file.seek(0)
-    except (subprocess.CalledProcessError, OSError) as err:
-        if isinstance(err, subprocess.CalledProcessError):
-            err.cmd = ' '.join(cmd)
+    except BaseException:
         tmp_file.close()
-        raise HDFSException("Failed to get file from HDFS: %s\n"
-                            "Error message: %s\n" % (fname, err))
-    if tmp_file.closed:
-        return None
-
+        raise
     return tmp_file
 
 
@@ -139,51 +793,7 @@ def listdir(dirname, mode='a'):
                    'f': list files
                    'd': list subdirectories
     """
-    cmd = ["hadoop", "fs", "-ls", dirname]
-    out = []
-    try:
-        # Use PIPE for all the std* to avoid catching and/or blocking
-        # current process std*
-        proc = subprocess.Popen(cmd,
-                                stdin=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                stdout=subprocess.PIPE)
-        while proc.poll() is None:
-            timeout = 0.1
-            check_stderr(proc, timeout)
-            ready, _, _ = select.select((proc.stdout, ), (), (), timeout)
-            if ready:
-                out.append(proc.stdout.readline().strip())
-        if proc.poll():
-            raise subprocess.CalledProcessError(proc.returncode, ' '.join(cmd))
-    except (subprocess.CalledProcessError, OSError) as err:
-        if isinstance(err, subprocess.CalledProcessError):
-            err.cmd = ' '.join(cmd)
-        raise HDFSException("Failed to list the HDFS directory: %s\n"
-                            "Error message: %s\n" % (dirname, err))
-
-    # Parse output of `ls`:
-    # {{{
-    # Found 3 items
-    # -rwxrwx---   3 $user      $group 1114404 2016-09-28 16:11 /path/to/file1
-    # -rwxrwx---   3 $user      $group 1572867 2016-09-28 16:11 /path/to/file2
-    # drwxrwx---   - $user      $group       0 2017-05-22 14:07 /path/to/subdir
-    # }}}
-
-    subdirs, files = [], []
-    for line in out:
-        line = line.split(None, 7)
-        if len(line) != 8:
-            continue
-
-        # We need to return only the name of the file or subdir
-        filename = line[7]
-        filename = basename(filename)
-        if line[0][0] == 'd':
-            subdirs.append(filename)
-        elif line[0][0] == '-':
-            files.append(filename)
-
+    subdirs, files = _backend.listdir(dirname)
     if mode == 'a':
         result = subdirs + files
     elif mode == 'f':
@@ -217,3 +827,11 @@ def join(p, *args):
         else:
             paths.append(a)
     return path.join(*paths).strip()
+
+
+try:
+    set_backend(os.environ.get(ENV_BACKEND) or None)
+except ValueError as err:
+    log("Failed to set HDFS backend from %s (%s); using default one."
+        % (ENV_BACKEND, err), logLevel.WARN)
+    set_backend()
@@ -0,0 +1,99 @@
+"""
+pyDKB.common.json_codec
+
+Pluggable JSON codec: decode JSON with the fastest available library,
+falling back to the standard ``json`` module.
+
+Supported backends (in order of preference): ``orjson``, ``ujson``,
+``rapidjson``, ``json`` (standard library). The first installed one
+is selected at import time; a specific backend can be requested via
+environment variable ``DKB_JSON_CODEC`` or with ``set_backend()``.
+
+Result of ``loads()`` does not depend on the backend (for any data the
+dataflow operates with): it falls back to ``json.loads()`` whenever the
+backend fails (invalid JSON, NaN/Infinity, ...), so that accepted input
+and error messages are the same as with standard ``json``. Note that
+integers exceeding 64 bits may be decoded as floats by some backends.
+
+JSON is encoded with standard ``json`` only: the dataflow output must stay
+byte-for-byte the same, and other libraries can not reproduce its format.
+"""
+
+import os
+import json
+import importlib
+
+from .types import logLevel
+from .misc import log
+
+# Environment variable to choose backend
+ENV_VAR = 'DKB_JSON_CODEC'
+
+# Supported backends in order of preference
+BACKENDS = ('orjson', 'ujson', 'rapidjson', 'json')
+
+# Exceptions which mean that backend can not handle the data
+_FALLBACK_ERRORS = (ValueError, TypeError, OverflowError)
+
+# Current backend: name, loads()
+_backend = None
+_loads = None
+
+
+def set_backend(name=None):
+    """ Select JSON library to be used.
+
+    :raises ValueError: unknown backend name
+    :raises ImportError: backend library is not installed
+
+    :param name: backend name (one of ``BACKENDS``). If not specified,
+                 the first available one is selected
+    :type name: str, NoneType
+
+    :return: name of the selected backend
+    :rtype: str
+    """
+    global _backend, _loads
+    if name is None:
+        for name in BACKENDS[:-1]:
+            try:
+                return set_backend(name)
+            except ImportError:
+                pass
+        name = 'json'
+    if name not in BACKENDS:
+        raise ValueError("Unknown JSON codec: '%s' (expected one of: %s)"
+                         % (name, ', '.join(BACKENDS)))
+    _loads = importlib.import_module(name).loads
+    _backend = name
+    return name
+
+
+def backend():
+    """ Return name of the current backend. """
+    return _backend
+
+
+def loads(s):
+    """ Decode JSON string.
+
+    :param s: JSON document
+    :type s: str
+
+    :return: decoded object
+    :rtype: object
+    """
+    if _loads is not json.loads:
+        try:
+            return _loads(s)
+        except _FALLBACK_ERRORS:
+            pass
+    return json.loads(s)
+
+
+try:
+    set_backend(os.environ.get(ENV_VAR) or None)
+except (ValueError, ImportError) as err:
+    log("Failed to set JSON codec from %s (%s); using default one."
+        % (ENV_VAR, err), logLevel.WARN)
+    set_backend()
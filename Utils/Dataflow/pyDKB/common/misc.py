@@ -4,16 +4,215 @@ pyDKB.common.misc
 Miscellanious utility functions.
 """
 
+import os
 import sys
-import inspect
-from datetime import datetime
 import time
+import atexit
+import threading
+import importlib.util
+
+try:
+    import contextvars
+except ImportError:
+    # Python < 3.7 (see ``ContextLocal``)
+    contextvars = None
 
 from .types import logLevel
 
 # Datetime format for log messages
 DTFORMAT = '%Y-%m-%d %H:%M:%S'
 
+# Environment variables to configure logging
+ENV_LOG_RATE = 'DKB_LOG_RATE'
+ENV_LOG_BUFFER = 'DKB_LOG_BUFFER'
+
+# Log levels of messages subject to the rate limit
+RATE_LIMITED_LEVELS = (logLevel.WARN, )
+
+# Rate limit set by ``set_log_rate()`` without arguments: records per
+# period (seconds) from one line of code. The period is also used for
+# DKB_LOG_RATE value without one. Rate is not limited unless requested.
+LOG_RATE = (10, 60)
+
+# Max interval between buffered output flushes (seconds)
+LOG_FLUSH_INTERVAL = 1
+
+# Logging state (shared by all threads, guarded by ``_log_lock``):
+# * rate limit (max number of records, period) or None;
+_log_rate = None
+# * buffer size (bytes; 0 means no buffering);
+_log_buffer_size = 0
+# * buffered records and their total length;
+_log_buffer = []
+_log_buffered = 0
+# * rate limit state: {(code, line, level): [period start, number of
+#   records, number of suppressed ones, last suppressed message, prefix]};
+_log_sites = {}
+# * cached timestamp: (second, formatted string).
+_log_dtime = (None, '')
+_log_lock = threading.RLock()
+_log_flusher = None
+
+
+def set_log_rate(records=None, period=None):
+    """ Limit the rate of repeated log records.
+
+    Records of ``RATE_LIMITED_LEVELS`` produced by the same line of code
+    are output no more than ``records`` times per ``period`` seconds;
+    the rest are suppressed and reported with a single record ("N more
+    like this"), followed by the last suppressed message, when the period
+    is over (at least within ``LOG_FLUSH_INTERVAL`` seconds after it).
+
+    :param records: max number of records per period (0 -- no limit).
+                    If not specified, ``LOG_RATE`` is used
+    :type records: int, NoneType
+    :param period: period length (seconds)
+    :type period: float, NoneType
+    """
+    global _log_rate
+    flush_log()
+    if records is None:
+        records, period = LOG_RATE
+    with _log_lock:
+        _log_rate = (records, period) if records > 0 else None
+        if _log_rate:
+            _start_flusher()
+
+
+def set_log_buffer(size=0):
+    """ Set size of the log output buffer.
+
+    Buffered records are written to STDERR when the buffer is full,
+    when a record of ERROR (or higher) level is logged and, at least,
+    every ``LOG_FLUSH_INTERVAL`` seconds.
+
+    :param size: buffer size in bytes (0 -- no buffering)
+    :type size: int
+    """
+    global _log_buffer_size
+    flush_log()
+    with _log_lock:
+        _log_buffer_size = max(size, 0)
+        if _log_buffer_size:
+            _start_flusher()
+
+
+def _start_flusher():
+    """ Start flusher thread, if not started yet (see ``_flush()``). """
+    global _log_flusher
+    with _log_lock:
+        if not _log_flusher:
+            _log_flusher = threading.Thread(target=_flush_periodically)
+            _log_flusher.daemon = True
+            _log_flusher.start()
+
+
+def _flush_periodically():
+    """ Flush log buffer and report on suppressed records for the rate
+    limit periods that are over every ``LOG_FLUSH_INTERVAL`` seconds.
+    """
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        _flush(summaries=False)
+
+
+def flush_log():
+    """ Write buffered log records and reports on suppressed ones. """
+    _flush(summaries=True)
+
+
+def _flush(summaries=False):
+    """ Write buffered log records and reports on suppressed ones.
+
+    :param summaries: if reports are to be written for all the records
+                      suppressed so far (by default -- only for the rate
+                      limit periods that are over)
+    :type summaries: bool
+    """
+    global _log_buffer, _log_buffered
+    with _log_lock:
+        now = time.time()
+        reports = []
+        for key, site in list(_log_sites.items()):
+            if summaries or not _log_rate or now - site[0] >= _log_rate[1]:
+                if site[2]:
+                    reports.append(_summary(key[2], site))
+                del _log_sites[key]
+        out, _log_buffer, _log_buffered = _log_buffer + reports, [], 0
+        if out:
+            sys.stderr.write(''.join(out))
+            sys.stderr.flush()
+
+
+def _timestamp():
+    """ Return current time, formatted for log records. """
+    global _log_dtime
+    now = int(time.time())
+    if _log_dtime[0] != now:
+        _log_dtime = (now, time.strftime(DTFORMAT, time.localtime(now)))
+    return _log_dtime[1]
+
+
+def _lines(message):
+    """ Split message into non-empty lines. """
+    if not isinstance(message, list):
+        message = [message]
+    lines = []
+    for m in message:
+        lines += [line for line in str(m).splitlines() if line.strip()]
+    return lines
+
+
+def _format(lines, level, prefix):
+    """ Construct log record. """
+    tail = ''.join("(==) %s\n" % line for line in lines[1:])
+    return "%s (%s)%s %s\n%s" % (_timestamp(), logLevel.memberName(level),
+                                 prefix, lines[0], tail)
+
+
+def _summary(level, site):
+    """ Construct report on suppressed log records. """
+    return _format(["%d more like this (suppressed). Last one:"
+                    % site[2]] + _lines(site[3]), level, site[4])
+
+
+def _write(record, buffered=False):
+    """ Output log record (with ``_log_lock`` acquired). """
+    global _log_buffered
+    if not _log_buffer_size:
+        sys.stderr.write(record)
+        return
+    _log_buffer.append(record)
+    _log_buffered += len(record)
+    if not buffered or _log_buffered >= _log_buffer_size:
+        _flush()
+
+
+def _rate_limited(site_key, message, prefix):
+    """ Apply rate limit to the record (with ``_log_lock`` acquired).
+
+    :return: True if the record must be suppressed
+    :rtype: bool
+    """
+    records, period = _log_rate
+    now = time.time()
+    site = _log_sites.get(site_key)
+    if site is None:
+        _log_sites[site_key] = [now, 1, 0, None, prefix]
+        return False
+    if now - site[0] >= period:
+        if site[2]:
+            _write(_summary(site_key[2], site), buffered=True)
+        site[:] = [now, 1, 0, None, prefix]
+        return False
+    if site[1] < records:
+        site[1] += 1
+        return False
+    site[2] += 1
+    site[3] = message
+    site[4] = prefix
+    return True
+
 
 def log(message, level=logLevel.INFO, *args):
     """ Output log message with given log level.
@@ -25,6 +224,9 @@ def log(message, level=logLevel.INFO, *args):
 
     Empty lines and lines containing only whitespace symbols are ignored.
 
+    Repeated records may be suppressed (see ``set_log_rate()``); output
+    may be buffered (see ``set_log_buffer()``).
+
     :param message: message to output (string, list of strings or
                     any other object)
     :type message: object
@@ -34,29 +236,35 @@ def log(message, level=logLevel.INFO, *args):
                   level prefix and message body)
     :type *args: str
     """
+    log_from(sys._getframe(1), message, level, *args)
+
+
+def log_from(frame, message, level=logLevel.INFO, *args):
+    """ Output log message on behalf of the code, executed in given frame.
+
+    Same as ``log()``, but the frame (used to get the module name for
+    the default prefix and to identify the record source for the rate
+    limit) is specified explicitly. To be used by logging wrappers.
+
+    :param frame: stack frame of the code producing the message
+    :type frame: frame
+    """
     if not logLevel.hasMember(level):
         log("Unknown log level: %s" % level, logLevel.WARN)
         level = logLevel.INFO
-    if not isinstance(message, list):
-        message = [message]
-    lines = []
-    for m in message:
-        lines += [line for line in str(m).splitlines() if line.strip()]
     if args:
         prefix = ' ' + ' '.join(['(%s)' % p for p in args])
     else:
-        frm = inspect.stack()[1]
-        mod = inspect.getmodule(frm[0])
-        modname = getattr(mod, '__name__', 'main')
-        prefix = ' (%s)' % modname
-    if lines:
-        dtime = datetime.now().strftime(DTFORMAT)
-        out_message = "%s (%s)%s %s" % (dtime, logLevel.memberName(level),
-                                        prefix, lines[0])
-        for line in lines[1:]:
-            out_message += "\n(==) %s" % line
-        out_message += "\n"
-        sys.stderr.write(out_message)
+        prefix = ' (%s)' % frame.f_globals.get('__name__', 'main')
+    with _log_lock:
+        if _log_rate and level in RATE_LIMITED_LEVELS \
+                and _rate_limited((frame.f_code, frame.f_lineno, level),
+                                  message, prefix):
+            return
+        lines = _lines(message)
+        if lines:
+            _write(_format(lines, level, prefix),
+                   buffered=level < logLevel.ERROR)
 
 
 def ensure_argparse_arg_name(args, kwargs):
@@ -152,3 +360,118 @@ def execute_with_retry(f, args=[], kwargs={}, retry_on=(Exception,),
                 % (f.__name__, attempt, max_tries, str(e), sleep))
             time.sleep(sleep)
     return result
+
+
+class LazyModule(object):
+    """ Proxy for a module, importing it on first access to attributes.
+
+    Unlike ``importlib.util.LazyLoader``, safe to be used from multiple
+    threads (the module is imported with ``importlib.import_module()``,
+    guarded by the import system locks).
+    """
+
+    def __init__(self, name):
+        """ Initialize proxy for module ``name``. """
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attr):
+        """ Get attribute of the module (importing it if needed). """
+        module = self.__module
+        if module is None:
+            module = self.__module = importlib.import_module(self.__name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return "<lazy module '%s'>" % self.__name
+
+
+def lazy_import(name):
+    """ Import module on first access to its attributes.
+
+    Used for modules that are heavy to import but needed only in some
+    scenarios (e.g. clients of external services), so that stages start fast
+    with ``--help``, ``--skip`` or when the functionality is not used.
+
+    :raises ImportError: module not found
+
+    :param name: full module name
+    :type name: str
+
+    :return: module (if already imported) or module proxy
+    :rtype: module, LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError("No module named '%s'" % name, name=name)
+    return LazyModule(name)
+
+
+class ContextLocal(object):
+    """ Storage for values local to a thread or to an asyncio task.
+
+    Works as ``threading.local``, but is based on :py:mod:`contextvars`:
+    values set in an asyncio task are not visible to other tasks
+    (including the ones started by this task after the value was set).
+    """
+
+    def __init__(self):
+        """ Initialize empty storage. """
+        object.__setattr__(self, '_values',
+                           contextvars.ContextVar('values', default={}))
+
+    def __getattr__(self, name):
+        """ Get value set in the current context. """
+        try:
+            return self._values.get()[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        """ Set value for the current context. """
+        # Values dict is never changed in place, as it is shared with
+        # contexts copied from the current one
+        values = dict(self._values.get())
+        values[name] = value
+        self._values.set(values)
+
+    def __delattr__(self, name):
+        """ Remove value from the current context. """
+        values = dict(self._values.get())
+        try:
+            del values[name]
+        except KeyError:
+            raise AttributeError(name)
+        self._values.set(values)
+
+
+if contextvars is None:
+    # No asyncio tasks to keep apart (``AsyncProcessorStage`` requires
+    # Python 3.7+): values are local to threads only
+    ContextLocal = threading.local
+
+
+def _configure_from_env():
+    """ Configure logging from environment variables.
+
+    ``DKB_LOG_RATE``: rate limit ("RECORDS" or "RECORDS/PERIOD"; not
+    limited if not set);
+    ``DKB_LOG_BUFFER``: output buffer size (bytes).
+    """
+    try:
+        rate = os.environ.get(ENV_LOG_RATE)
+        if rate:
+            records, period = rate.split('/') if '/' in rate \
+                else (rate, LOG_RATE[1])
+            set_log_rate(int(records), float(period))
+        set_log_buffer(int(os.environ.get(ENV_LOG_BUFFER) or 0))
+    except ValueError as err:
+        log("Failed to configure logging from %s/%s (%s); using defaults."
+            % (ENV_LOG_RATE, ENV_LOG_BUFFER, err), logLevel.WARN)
+        set_log_rate(0)
+        set_log_buffer()
+
+
+_configure_from_env()
+atexit.register(flush_log)
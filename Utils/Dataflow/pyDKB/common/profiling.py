@@ -0,0 +1,133 @@
+"""
+pyDKB.common.profiling
+
+Profilers to be used for stage runs.
+
+* ``cprofile`` -- deterministic profiler (:py:mod:`cProfile`); sees only
+                  the thread it was started in. Profile is written in
+                  ``pstats`` format (``python -m pstats FILE``,
+                  ``snakeviz``, ...);
+* ``sampling`` -- statistical profiler: stacks of all threads are sampled
+                  with a fixed interval by a background thread, so the
+                  overhead does not depend on the number of function
+                  calls. Profile is written as "collapsed stacks" (one line
+                  per unique stack: frames separated with ``;`` and number
+                  of samples), to be turned into a flamegraph with
+                  ``flamegraph.pl``, ``speedscope``, etc.
+"""
+
+import os
+import sys
+import cProfile
+import threading
+import collections
+
+# Known profilers
+MODES = ('cprofile', 'sampling')
+
+# Profile file extensions
+EXTENSIONS = {'cprofile': '.prof', 'sampling': '.folded'}
+
+
+class CProfiler(object):
+    """ Deterministic profiler (wrapper for ``cProfile.Profile``). """
+
+    def __init__(self):
+        """ Initialize profiler. """
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        """ Start profiling the current thread. """
+        self._profile.enable()
+
+    def stop(self):
+        """ Stop profiling. """
+        self._profile.disable()
+
+    def dump(self, fname):
+        """ Write profile to the file (in ``pstats`` format). """
+        self._profile.dump_stats(fname)
+
+
+class SamplingProfiler(object):
+    """ Statistical profiler, sampling stacks of all threads. """
+
+    # Default interval between samples (seconds)
+    INTERVAL = 0.005
+
+    def __init__(self, interval=INTERVAL):
+        """ Initialize profiler.
+
+        :param interval: interval between samples (seconds)
+        :type interval: float
+        """
+        self.interval = interval
+        self.samples = collections.Counter()
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """ Start sampling in a background thread. """
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._run)
+        self._sampler.daemon = True
+        self._sampler.start()
+
+    def stop(self):
+        """ Stop sampling. """
+        self._stopped.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+
+    def _run(self):
+        """ Take samples until stopped. """
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = dict((t.ident, t.name) for t in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self.stack(frame)
+                stack.insert(0, names.get(thread_id, 'thread-%s'
+                                          % thread_id))
+                self.samples[';'.join(stack)] += 1
+
+    @staticmethod
+    def stack(frame):
+        """ Return list of frame names from the outermost to ``frame``. """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append('%s (%s:%d)' % (code.co_name,
+                                         os.path.basename(code.co_filename),
+                                         code.co_firstlineno))
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def dump(self, fname):
+        """ Write collected samples to the file (as collapsed stacks). """
+        with open(fname, 'w') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write('%s %d\n' % (stack.replace(' ', '_'), count))
+
+
+def profiler(mode):
+    """ Construct profiler of given type.
+
+    :raises ValueError: unknown profiler type
+
+    :param mode: profiler type (one of ``MODES``)
+    :type mode: str
+
+    :return: profiler (with methods ``start()``, ``stop()`` and
+             ``dump(fname)``)
+    :rtype: CProfiler, SamplingProfiler
+    """
+    if mode == 'cprofile':
+        return CProfiler()
+    if mode == 'sampling':
+        return SamplingProfiler()
+    raise ValueError("Unknown profiler: '%s' (expected one of: %s)"
+                     % (mode, ', '.join(MODES)))
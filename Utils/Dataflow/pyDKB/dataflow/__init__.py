@@ -1,12 +1,35 @@
 """
 Dataflow organization utils.
+
+Submodules with heavy dependencies (``cds``, ``pipeline``) are imported
+on first access.
 """
 
+import importlib
+
 from .types import *
 from .dkbID import dkbID
 from .exceptions import *
-from .cds import *
 from . import communication
+from . import metrics
+from . import checkpoint
 from . import stage
 
 __all__ = []
+
+# Names provided by lazily imported submodules: {name: submodule}
+_LAZY = {'CDSInvenioConnector': 'cds',
+         'KerberizedCDSInvenioConnector': 'cds',
+         'cds': 'cds',
+         'pipeline': 'pipeline'}
+
+
+def __getattr__(name):
+    """ Import submodule providing ``name`` on first access. """
+    if name not in _LAZY:
+        raise AttributeError("module '%s' has no attribute '%s'"
+                             % (__name__, name))
+    module = importlib.import_module('.' + _LAZY[name], __name__)
+    if name == _LAZY[name]:
+        return module
+    return getattr(module, name)
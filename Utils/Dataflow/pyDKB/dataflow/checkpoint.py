@@ -0,0 +1,207 @@
+"""
+pyDKB.dataflow.checkpoint
+
+Checkpoint journal for resuming interrupted (f)ile mode runs.
+
+For every input file the journal keeps number of input messages already
+processed (with their output written to the output file) and size of the
+output file at that moment; fully processed input files are marked as
+"done". When a stage is restarted with the same journal:
+
+* input files marked as "done" are skipped (as well as partially
+  processed ones with output files already finalized: the stage may be
+  stopped after an output file is renamed from ``*.part``, but before its
+  input file is marked as "done");
+* partially processed files are read from the first message not
+  processed yet;
+* corresponding output files are truncated to the recorded size and
+  written further.
+
+Journal is a text file with a JSON record per line, appended after every
+processed batch:
+
+  {"input": <path>, "messages": <N>, "output": <path>, "size": <bytes>}
+  {"input": <path>, "done": true}
+
+Output data are written (and flushed) before the record, so the journal
+never refers to output not written yet. A record torn by a crash is
+dropped when the journal is opened, and the journal is compacted to
+a single record per input file.
+
+NOTE: the journal and output files are flushed, but not synced to disk:
+      checkpoints survive a crash of the stage process, not of the host.
+"""
+
+import os
+import json
+
+from pyDKB.common import LoggableObject
+from pyDKB.common.types import logLevel
+from .exceptions import DataflowException
+
+
+class CheckpointException(DataflowException):
+    """ Checkpoint journal exception. """
+    pass
+
+
+class Checkpoint(LoggableObject):
+    """ Journal of input messages processed by a stage.
+
+    Input and output file paths are stored as absolute ones.
+
+    Class/instance variable description:
+
+    * State of input files: {path: {'messages': N, 'output': path,
+                                    'size': bytes, 'done': bool}}
+        state
+
+    * Input file recorded last
+        _current
+    """
+
+    def __init__(self, fname):
+        """ Open (or create) the journal.
+
+        :raises CheckpointException: failed to read or write the journal
+
+        :param fname: journal file name
+        :type fname: str
+        """
+        self.fname = fname
+        self.state = {}
+        self._current = None
+        try:
+            if self._load():
+                self._compact()
+            self._fd = open(fname, 'a')
+        except (OSError, IOError) as err:
+            raise CheckpointException("Failed to open checkpoint journal"
+                                      " (%s)" % fname, err)
+
+    def _load(self):
+        """ Read state of input files from the journal.
+
+        :return: True if the journal needs compaction (has torn or
+                 repeated records)
+        :rtype: bool
+        """
+        if not os.path.exists(self.fname):
+            return False
+        records = 0
+        with open(self.fname, 'r') as f:
+            for line in f:
+                try:
+                    if not line.endswith('\n'):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                    path = record['input']
+                except (ValueError, KeyError, TypeError) as err:
+                    self.log("Dropping invalid record from checkpoint"
+                             " journal (%s): %s" % (err, line.strip()),
+                             logLevel.WARN)
+                    records += 1
+                    continue
+                records += 1
+                if record.get('done'):
+                    self.state.setdefault(path, {'messages': 0})
+                    self.state[path]['done'] = True
+                else:
+                    self.state[path] = {'messages': record['messages'],
+                                        'output': record['output'],
+                                        'size': record['size']}
+        done = sum(1 for s in self.state.values() if s.get('done'))
+        self.log("Checkpoint journal loaded (%s): %d input files processed,"
+                 " %d partially processed."
+                 % (self.fname, done, len(self.state) - done))
+        return records > len(self.state)
+
+    def _compact(self):
+        """ Rewrite the journal with a single record per input file. """
+        tmp = self.fname + '.tmp'
+        with open(tmp, 'w') as f:
+            for path, state in self.state.items():
+                f.write(self._record(path, state))
+        os.replace(tmp, self.fname)
+
+    @staticmethod
+    def _record(path, state):
+        """ Construct journal record for the input file state. """
+        if state.get('done'):
+            record = {'input': path, 'done': True}
+        else:
+            record = dict(state, input=path)
+        return json.dumps(record, sort_keys=True) + '\n'
+
+    def _write(self, path):
+        """ Append record for the input file to the journal. """
+        try:
+            self._fd.write(self._record(path, self.state[path]))
+            self._fd.flush()
+        except (OSError, IOError, ValueError) as err:
+            raise CheckpointException("Failed to write checkpoint journal"
+                                      " (%s)" % self.fname, err)
+
+    def get(self, path):
+        """ Get state of the input file.
+
+        :param path: input file path
+        :type path: str
+
+        :return: state (see ``state``) or None if file was never processed
+        :rtype: dict, NoneType
+        """
+        return self.state.get(os.path.abspath(path))
+
+    def is_done(self, path):
+        """ Check if the input file is fully processed. """
+        return bool((self.get(path) or {}).get('done'))
+
+    def commit(self, path, messages, output, size):
+        """ Record messages of the input file as processed.
+
+        If the previous record was about another input file, that file is
+        marked as "done".
+
+        :param path: input file path
+        :type path: str
+        :param messages: number of input messages processed since the
+                         previous commit
+        :type messages: int
+        :param output: output file path
+        :type output: str
+        :param size: output file size (bytes)
+        :type size: int
+        """
+        path = os.path.abspath(path)
+        if self._current and self._current != path:
+            self.done(self._current)
+        self._current = path
+        state = self.state.setdefault(path, {'messages': 0})
+        state['messages'] += messages
+        state['output'] = os.path.abspath(output)
+        state['size'] = size
+        self._write(path)
+
+    def done(self, path):
+        """ Mark input file as fully processed. """
+        path = os.path.abspath(path)
+        self.state.setdefault(path, {'messages': 0})['done'] = True
+        if self._current == path:
+            self._current = None
+        self._write(path)
+
+    def finish(self):
+        """ Mark input file recorded last as fully processed.
+
+        To be called when all input is processed and output files are
+        finalized.
+        """
+        if self._current:
+            self.done(self._current)
+
+    def close(self):
+        """ Close the journal. """
+        if self._fd:
+            self._fd.close()
+            self._fd = None
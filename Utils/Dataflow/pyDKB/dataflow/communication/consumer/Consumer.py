@@ -39,12 +39,19 @@ class Consumer(LoggableObject):
         if config:
             self.config = config
 
+    def stream_config(self):
+        """ Get configuration for the input stream.
+
+        Length-prefixed framing is used for (s)tream sources only.
+        """
+        return dict(self.config, framing='delimiter')
+
     def init_stream(self):
         """ Init input stream. """
         src = self.get_source()
         if src:
             self._stream = \
-                StreamBuilder(src, self.config) \
+                StreamBuilder(src, self.stream_config()) \
                 .setStream('input') \
                 .setType(self.message_type) \
                 .build()
@@ -61,6 +68,16 @@ class Consumer(LoggableObject):
             return None
         return self._stream.is_readable()
 
+    def source_is_readable(self):
+        """ Check if current source is readable.
+
+        :returns: None  -- no source,
+                  False -- source is empty / fully read,
+                  True  -- source is defined and is not empty
+        :rtype: bool, NoneType
+        """
+        return self.stream_is_readable()
+
     def get_stream(self):
         """ Get input stream linked to the current source.
 
@@ -84,6 +101,10 @@ class Consumer(LoggableObject):
                 self._stream.reset(src)
         return src
 
+    def transferred(self):
+        """ Return amount of data read (see ``Stream.transferred``). """
+        return self._stream.transferred if self._stream else 0
+
     def set_message_type(self, Type):
         """ Set input message type. """
         self.message_type = Type
@@ -111,10 +132,16 @@ class Consumer(LoggableObject):
             None  (all input sources are empty)
         """
         s = self.get_stream()
-        if not s:
-            msg = None
-        else:
-            msg = next(s)
+        msg = None
+        while s:
+            try:
+                msg = next(s)
+                break
+            except StopIteration:
+                pass
+            # Source (e.g. pipe) turned out to be over:
+            # switch to the next one
+            s = self.next_source() and self.get_stream()
         return msg
 
     def get_item(self):
@@ -12,10 +12,13 @@ TODO: think about:
 
 import sys
 import os
+import collections
+from concurrent import futures
 
 from . import Consumer
 from .Consumer import ConsumerException
 from pyDKB.common.types import logLevel
+from pyDKB.common import compression
 from .. import Message
 
 
@@ -25,6 +28,9 @@ class FileConsumer(Consumer):
     # Current file
     current_file = None
 
+    # Checkpoint journal (``pyDKB.dataflow.checkpoint.Checkpoint``)
+    checkpoint = None
+
     # Override
     def reconfigure(self, config={}):
         """ (Re)initialize consumer with Stage configuration. """
@@ -55,14 +61,35 @@ class FileConsumer(Consumer):
             result = self.stream_is_readable()
         if fd and result is None:
             # check file directly only when there's no stream bound to it
-            stat = os.fstat(fd.fileno())
-            result = fd.tell() != stat.st_size
+            if not fd.seekable():
+                # Pipe: can not tell in advance
+                result = not fd.closed
+            else:
+                stat = os.fstat(fd.fileno())
+                result = fd.tell() != stat.st_size
         return result
 
     def get_source_info(self):
         """ Return current source info. """
         return self.current_file
 
+    def reset_stream(self):
+        """ Reset input stream to the current source.
+
+        When a partially processed file (see ``_unfinished_files()``) is
+        opened, messages already processed are skipped.
+        """
+        src = super(FileConsumer, self).reset_stream()
+        skip = self.current_file.pop('skip', 0) if src else 0
+        if skip:
+            skipped = self._stream.skip(skip)
+            if skipped < skip:
+                self.log("Input file is shorter than recorded in the"
+                         " checkpoint journal (%s): %d messages expected,"
+                         " %d found." % (self.current_file['full_path'],
+                                         skip, skipped), logLevel.WARN)
+        return src
+
     def init_sources(self):
         """ Initialize sources iterator if not initialized yet. """
         if not self.input_files:
@@ -109,7 +136,11 @@ class FileConsumer(Consumer):
         return iter(sys.stdin.readline, "")
 
     def _filenames_from_dir(self, dirname):
-        """ Return list of files in given local directory. """
+        """ Return list of files in given local directory.
+
+        Files with extension matching the input message type are taken,
+        including compressed ones (see :py:mod:`pyDKB.common.compression`).
+        """
         files = []
         ext = Message(self.message_type).extension()
         try:
@@ -117,7 +148,7 @@ class FileConsumer(Consumer):
             # Make files order predictable
             for f in dir_content:
                 if os.path.isfile(os.path.join(dirname, f)) \
-                        and f.lower().endswith(ext):
+                        and compression.strip_suffix(f.lower()).endswith(ext):
                     files.append(f)
         except OSError as err:
             raise Consumer.ConsumerException(err)
@@ -133,6 +164,98 @@ class FileConsumer(Consumer):
             d['full_path'] = os.path.join(d['dir'], d['name'])
             yield d
 
+    def _unfinished_files(self, files):
+        """ Filter out files already processed (see ``checkpoint``).
+
+        Partially processed files get number of messages to be skipped
+        (``skip``) in their metadata.
+
+        If the output file of a partially processed one is already
+        finalized (the stage was stopped after its output file was renamed,
+        but before the input file was marked as "done"), all its messages
+        are processed: the input file is marked as "done" and skipped.
+
+        :param files: file metadata (see ``_adjusted_filenames()``)
+        :type files: iterable(dict)
+
+        :return: iterable object, yielding file metadata
+        :rtype: generator
+        """
+        for f in files:
+            state = self.checkpoint.get(f['full_path'])
+            if not state:
+                yield f
+            elif state.get('done'):
+                self.log("Skipping input file (already processed): %s"
+                         % f['full_path'])
+            elif os.path.isfile(state['output']) \
+                    and os.path.getsize(state['output']) == state['size']:
+                self.log("Skipping input file (already processed, output"
+                         " file is finalized): %s" % f['full_path'])
+                self.checkpoint.done(f['full_path'])
+            else:
+                self.log("Resuming input file processing: %s (%d messages"
+                         " processed)" % (f['full_path'], state['messages']))
+                f['skip'] = state['messages']
+                yield f
+
+    def _open_file(self, f):
+        """ Open input file.
+
+        Compressed files (``*.gz``, ``*.zst``) are decompressed on the fly.
+
+        :param f: file metadata (see ``_adjusted_filenames()``)
+        :type f: dict
+
+        :return: open file descriptor
+        :rtype: file
+        """
+        return compression.open_file(f['full_path'], 'r')
+
+    def _opened_files(self, files):
+        """ Return iterable object, yielding file metadata and open file.
+
+        With ``prefetch`` configuration parameter set to K > 0, next K
+        files are opened in background threads while the current one is
+        being read. Errors are raised when the failed file is reached,
+        just as without prefetch.
+
+        :param files: file metadata
+        :type files: iterable(dict)
+
+        :return: iterable object, yielding (metadata, open file) pairs
+        :rtype: generator
+        """
+        prefetch = self.config.get('prefetch') or 0
+        if prefetch < 1:
+            for f in files:
+                yield f, self._open_file(f)
+            return
+        queue = collections.deque()
+        pool = futures.ThreadPoolExecutor(prefetch)
+        try:
+            for f in files:
+                queue.append((f, pool.submit(self._open_file, f)))
+                if len(queue) > prefetch:
+                    f, opened = queue.popleft()
+                    yield f, opened.result()
+            while queue:
+                f, opened = queue.popleft()
+                yield f, opened.result()
+        finally:
+            # Close files opened in advance, but never used
+            for f, opened in queue:
+                opened.cancel()
+            for f, opened in queue:
+                if opened.cancelled() or opened.exception():
+                    continue
+                try:
+                    opened.result().close()
+                except Exception as err:
+                    self.log("Failed to close prefetched file (%s): %s"
+                             % (f['full_path'], err), logLevel.WARN)
+            pool.shutdown()
+
     def _input_files(self):
         """ Return iterable object, yielding dict with open file metadata.
 
@@ -141,8 +264,16 @@ class FileConsumer(Consumer):
           * name      -- file name
           * dir       -- directory name
           * full_path -- full path to the file
+          * skip      -- number of messages to skip (for partially
+                         processed files, see ``_unfinished_files()``)
         """
-        input_files = self._adjusted_filenames()
-        for f in input_files:
-            with open(f['full_path'], 'r') as f['fd']:
-                yield f
+        files = self._adjusted_filenames()
+        if self.checkpoint:
+            files = self._unfinished_files(files)
+        opened_files = self._opened_files(files)
+        try:
+            for f, fd in opened_files:
+                with fd as f['fd']:
+                    yield f
+        finally:
+            opened_files.close()
@@ -6,6 +6,7 @@ from . import FileConsumer
 from . import Consumer
 from pyDKB.common import hdfs
 from pyDKB.common import HDFSException
+from pyDKB.common import compression
 
 
 class HDFSConsumer(FileConsumer):
@@ -59,16 +60,29 @@ class HDFSConsumer(FileConsumer):
             yield d
 
     # Override
-    def _input_files(self):
-        """ Return iterable object, yielding dict with open file metadata.
+    def _open_file(self, f):
+        """ Open input file.
 
-        Metadata include:
-          * fd        -- open file descriptor
-          * name      -- file name
-          * dir       -- HDFS directory name
-          * full_path -- full path to the file in HDFS
+        File is either downloaded into temporary local file or
+        (with ``hdfs_stream`` configuration parameter) read directly
+        from the HDFS client (see :py:func:`pyDKB.common.hdfs.stream_file`).
+        Compressed files (``*.gz``, ``*.zst``) are decompressed on the fly.
+
+        :param f: file metadata (see ``_adjusted_filenames()``)
+        :type f: dict
+
+        :return: open file descriptor
+        :rtype: file
         """
-        input_files = self._adjusted_filenames()
-        for f in input_files:
-            with hdfs.File(f['full_path']) as f['fd']:
-                yield f
+        method = compression.detect(f['name'])
+        if self.config.get('hdfs_stream'):
+            fd = hdfs.stream_file(f['full_path'])
+        else:
+            fd = hdfs.File(f['full_path'], binary=bool(method))
+        if method:
+            try:
+                fd = compression.CompressedFile(fd, method)
+            except BaseException:
+                fd.close()
+                raise
+        return fd
@@ -26,10 +26,29 @@ class StreamConsumer(Consumer):
             raise ConsumerException("Empty EOM is not allowed "
                                              "for stream input.")
 
+    def stream_config(self):
+        """ Get configuration for the input stream. """
+        return self.config
+
     def get_source_info(self):
         """ Return current source info. """
         return {'fd': self.fd}
 
+    def source_is_readable(self):
+        """ Check if current source is readable.
+
+        Stream is the only source, so it is treated as readable
+        (without reading anything) until it is closed.
+
+        :returns: None  -- no source,
+                  False -- stream is closed,
+                  True  -- stream is open
+        :rtype: bool, NoneType
+        """
+        if not self.fd:
+            return None
+        return not self.fd.closed
+
     def get_source(self):
         """ Get Stream file descriptor. """
         return self.fd
@@ -19,6 +19,7 @@ class ConsumerBuilder(object):
     """ Constructor for Consumer instance. """
 
     consumerClass = None
+    checkpoint = None
 
     def __init__(self, config={}):
         """ Constructor initialization. """
@@ -59,11 +60,21 @@ class ConsumerBuilder(object):
         self.message_type = Type
         return self
 
+    def setCheckpoint(self, checkpoint):
+        """ Set checkpoint journal (for local file source only). """
+        if checkpoint and self.consumerClass is not FileConsumer:
+            raise ConsumerException("Checkpoint journal requires local (f)ile"
+                                    " source.")
+        self.checkpoint = checkpoint
+        return self
+
     def build(self, config={}):
         """ Return constructed consumer. """
         if not config:
             config = self.config
         instance = self.consumerClass(config)
+        if self.checkpoint:
+            instance.checkpoint = self.checkpoint
         if self.message_type:
             instance.set_message_type(self.message_type)
         return instance
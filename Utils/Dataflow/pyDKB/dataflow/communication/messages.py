@@ -7,11 +7,17 @@ Definition of abstract message class and specific message classes
 from . import messageType
 from . import codeType
 from pyDKB.common.misc import (log, logLevel)
+from pyDKB.common import json_codec
 
 import json
 import sys
 import copy
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 __message_class = {}
 
 
@@ -45,11 +51,29 @@ def Message(msg_type):
 
 
 class AbstractMessage(object):
-    """ Abstract message """
+    """ Abstract message
+
+    By default message protects its content from outer changes: the
+    object passed to the constructor is copied, and so is the content
+    returned by ``content()``, ``decode()`` and ``encode()``.
+
+    Owned messages (``owned=True``) skip all the copying: the message
+    takes the passed object as is and returns its own content to the
+    caller. It is up to the code that creates (or receives) an owned
+    message to make sure the content is not shared with anyone who is
+    not supposed to see the changes.
+    """
 
     msg_type = None
     native_types = []
 
+    # Code of the encoded messages (used by default in ``decode()`` and
+    # ``encode()``)
+    default_code = codeType.STRING
+    # Encoded messages are bytes, not text (such messages are always
+    # written with length-prefixed framing)
+    binary = False
+
     _ext = ".out"
 
     decoded = None
@@ -57,37 +81,145 @@ class AbstractMessage(object):
 
     incompl = None
 
-    def __init__(self, message=None):
-        """ Save initial message. """
+    owned = False
+
+    def __init__(self, message=None, owned=False):
+        """ Save initial message.
+
+        :param message: original message (encoded or native content)
+        :type message: object
+        :param owned: if True, take ownership of ``message``: it will not
+                      be copied, so the caller must not modify it after
+                      the message is created
+        :type owned: bool
+        """
+        self.owned = bool(owned)
         self.__orig = message
-        self.decode()
+        self._decode()
+
+    def _copy(self, obj):
+        """ Return a copy of ``obj`` (or ``obj`` itself, if owned). """
+        if self.owned:
+            return obj
+        return copy.deepcopy(obj)
+
+    def _original(self):
+        """ Return original message without copying. """
+        return self.__orig
+
+    def _release(self):
+        """ Drop all references to the message content. """
+        self.__orig = None
+        self.decoded = None
+        self.encoded = None
 
     def getOriginal(self):
         """ Return original message. """
-        return copy.deepcopy(self.__orig)
+        return self._copy(self.__orig)
+
+    def _decode(self, code):
+        """ Decode original and return decoded value without copying.
+
+        Raises DecodeUnknownType
+        """
+        raise DecodeUnknownType(code, self.__class__)
+
+    def _encode(self, code):
+        """ Encode message and return encoded value without copying.
+
+        Raises EncodeUnknownType
+        """
+        raise EncodeUnknownType(code, self.__class__)
 
-    def decode(self, code):
+    def decode(self, code=None):
         """ Decode original from CODE to TYPE-specific format.
 
         Raises ValueError
         """
-        raise DecodeUnknownType(code, self.__class__)
+        if code is None:
+            code = self.default_code
+        return self._copy(self._decode(code))
 
-    def encode(self, code):
+    def encode(self, code=None):
         """ Encode original message from TYPE-specific format to CODE.
 
         Raises ValueError
         """
-        raise EncodeUnknownType(code, self.__class__)
+        if code is None:
+            code = self.default_code
+        return self._copy(self._encode(code))
 
     @classmethod
     def typeName(cls):
         """ Return message type name as string. """
         return messageType.memberName(cls.msg_type)
 
+    @classmethod
+    def check(cls):
+        """ Check if the message class can be used.
+
+        :raises ImportError: required module is not installed
+        """
+        pass
+
+    @classmethod
+    def convertible(cls, other):
+        """ Check if messages of class ``other`` can be converted to ``cls``.
+
+        :param other: message class
+        :type other: type
+
+        :rtype: bool
+        """
+        return other.msg_type == cls.msg_type
+
+    @classmethod
+    def convert(cls, message):
+        """ Construct message of this class with the same content.
+
+        The new message shares content with ``message`` (see
+        ``view()``), so ``message`` must not be modified afterwards.
+
+        :param message: message of a convertible class (see
+                        ``convertible()``)
+        :type message: AbstractMessage
+
+        :return: new message
+        :rtype: AbstractMessage
+        """
+        result = cls(message.view(), owned=True)
+        result.incomplete(message.incomplete())
+        return result
+
     def content(self):
         """ Return message content. """
-        return copy.deepcopy(self.decode())
+        return self._copy(self._decode())
+
+    def view(self):
+        """ Return message content without copying it.
+
+        The returned object is "borrowed" from the message: it must not
+        be modified, or the changes will affect the message itself.
+
+        :return: message content
+        :rtype: object
+        """
+        return self._decode()
+
+    def take(self):
+        """ Hand message content over to the caller.
+
+        Content is returned without copying and the message drops all
+        its references to it, so the caller becomes the only owner of
+        the returned object. The message is left empty and must not be
+        used any more.
+
+        :return: message content
+        :rtype: object
+        """
+        result = self._decode()
+        self._release()
+        return result
 
     @classmethod
     def extension(cls):
@@ -111,7 +243,11 @@ class AbstractMessage(object):
 
 
 class JSONMessage(AbstractMessage):
-    """ Message in JSON format. """
+    """ Message in JSON format.
+
+    Subclasses may keep the same (JSON-compatible) content in another
+    encoding, overriding ``_loads()`` and ``_dumps()``.
+    """
     msg_type = messageType.JSON
     native_types = [dict, list, int, float]
 
@@ -122,14 +258,29 @@ class JSONMessage(AbstractMessage):
     _non_dict_not_implemented_warn = "JSON messages with non-dict content" \
                                      " are not fully implemented."
 
-    def decode(self, code=codeType.STRING):
+    @classmethod
+    def convertible(cls, other):
+        """ Messages with JSON-compatible content can be converted. """
+        return issubclass(other, JSONMessage)
+
+    @staticmethod
+    def _loads(data):
+        """ Decode content from ``default_code``. """
+        return json_codec.loads(data)
+
+    @staticmethod
+    def _dumps(content):
+        """ Encode content into ``default_code``. """
+        return json.dumps(content)
+
+    def _decode(self, code=None):
         """ Decode original data as JSON. """
-        if not self.decoded:
-            orig = self.getOriginal()
+        if self.decoded is None:
+            orig = self._original()
             if isinstance(orig, tuple(self.native_types)):
-                self.decoded = orig
-            elif code == codeType.STRING:
-                self.decoded = json.loads(orig)
+                self.decoded = self._copy(orig)
+            elif code in (None, self.default_code):
+                self.decoded = self._loads(orig)
                 self.encoded = orig
             else:
                 raise DecodeUnknownType(code, self.__class__)
@@ -140,30 +291,72 @@ class JSONMessage(AbstractMessage):
                     log(self._non_dict_not_implemented_warn, logLevel.WARN)
                     JSONMessage._non_dict_not_implemented_warn = None
                 self.incomplete(False)
-        return copy.deepcopy(self.decoded)
+        return self.decoded
 
-    def encode(self, code=codeType.STRING):
+    def _encode(self, code=None):
         """ Encode JSON as CODE. """
         if not self.encoded:
-            content = self.content()
+            content = self._decode()
             if self.incomplete():
                 if isinstance(content, dict):
+                    # Shallow copy is enough to add the marker without
+                    # touching the content itself
+                    content = dict(content)
                     content[self.incompl_key] = True
                 else:
                     raise NotImplementedError("Incomplete marker for JSON"
                                               " message with non-dict content"
                                               " is not implemented.")
-            if code == codeType.STRING:
-                self.encoded = json.dumps(content)
+            if code in (None, self.default_code):
+                self.encoded = self._dumps(content)
             else:
                 raise EncodeUnknownType(code, self.__class__)
-            self.decoded = content
-        return copy.deepcopy(self.encoded)
+        return self.encoded
 
 
 __message_class[messageType.JSON] = JSONMessage
 
 
+class MsgPackMessage(JSONMessage):
+    """ Message with JSON content, encoded with MessagePack.
+
+    Compact binary encoding for links between stages; requires
+    ``msgpack`` module.
+    """
+    msg_type = messageType.MSGPACK
+
+    default_code = codeType.BINARY
+    binary = True
+
+    _ext = ".msgpack"
+
+    @classmethod
+    def check(cls):
+        """ Check if ``msgpack`` module is installed.
+
+        :raises ImportError: module is not installed
+        """
+        if msgpack is None:
+            raise ImportError("Module 'msgpack' is required for %s"
+                              " messages." % cls.typeName())
+
+    @staticmethod
+    def _loads(data):
+        """ Decode content from MessagePack. """
+        if not isinstance(data, (bytes, bytearray)):
+            raise TypeError("MessagePack data must be bytes (got '%s')"
+                            % type(data).__name__)
+        return msgpack.unpackb(data)
+
+    @staticmethod
+    def _dumps(content):
+        """ Encode content into MessagePack. """
+        return msgpack.packb(content)
+
+
+__message_class[messageType.MSGPACK] = MsgPackMessage
+
+
 class TTLMessage(AbstractMessage):
     """ Messages in TTL format
 
@@ -178,14 +371,14 @@ class TTLMessage(AbstractMessage):
 
     _ext = ".ttl"
 
-    def decode(self, code=codeType.STRING):
+    def _decode(self, code=codeType.STRING):
         """ Decode original data as TTL.
 
         Currently takes text as it is.
         TODO: check some formal matter to confirm the string is TTL.
         """
-        if not self.decoded:
-            orig = self.getOriginal()
+        if self.decoded is None:
+            orig = self._original()
             if isinstance(orig, tuple(self.native_types)):
                 self.decoded = orig
             elif code == codeType.STRING:
@@ -193,18 +386,18 @@ class TTLMessage(AbstractMessage):
                 self.encoded = orig
             else:
                 raise DecodeUnknownType(code, self.__class__)
-        return copy.deepcopy(self.decoded)
+        return self.decoded
 
-    def encode(self, code=codeType.STRING):
+    def _encode(self, code=codeType.STRING):
         """ Encode TTL as CODE. """
         if not self.encoded:
-            orig = self.getOriginal()
+            orig = self._original()
             if code == codeType.STRING:
                 self.encoded = str(orig)
             else:
                 raise EncodeUnknownType(code, self.__class__)
             self.decoded = orig
-        return copy.deepcopy(self.encoded)
+        return self.encoded
 
 
 __message_class[messageType.TTL] = TTLMessage
@@ -14,6 +14,7 @@ import time
 
 from .Producer import Producer, ProducerException
 from pyDKB.common.types import logLevel
+from pyDKB.common import compression
 
 
 class FileProducer(Producer):
@@ -23,6 +24,16 @@ class FileProducer(Producer):
     _default_dir = None
     current_file = None
 
+    # Suffix of output files being written (not finalized yet),
+    # used with checkpoint journal only
+    PART_SUFFIX = '.part'
+
+    # Checkpoint journal (``pyDKB.dataflow.checkpoint.Checkpoint``)
+    checkpoint = None
+
+    # Output is incomplete (files should not be finalized)
+    interrupted = False
+
     def reconfigure(self, config={}):
         """ (Re)configure producer according to the config hash. """
         if not config:
@@ -123,15 +134,23 @@ class FileProducer(Producer):
                 raise ProducerException
         return path
 
+    def compression(self):
+        """ Get compression method for output files (None -- plain). """
+        return self.config.get('compress')
+
     def get_filename(self):
-        """ Return filename, corresponding the source, or timestamp-based. """
+        """ Return filename, corresponding the source, or timestamp-based.
+
+        Extension corresponds to the message type and compression method.
+        """
         ext = ''
         msgClass = self.message_class()
         if msgClass:
             ext = msgClass.extension()
+        ext += compression.suffix(self.compression())
         src = self.get_source_info()
         if src and src.get('name'):
-            src_name = src['name']
+            src_name = compression.strip_suffix(src['name'])
             result = os.path.splitext(src_name)[0] + ext
         else:
             result = str(int(time.time())) + ext
@@ -172,16 +191,84 @@ class FileProducer(Producer):
         else:
             self.close_file()
             self.ensure_dir()
-            cur['fd'] = open(cur['local_path'], 'w')
+            cur['fd'] = self.open_file(cur)
         self.current_file = cur
         return cur
 
+    def open_file(self, f):
+        """ Open output file.
+
+        With checkpoint journal data are written to a temporary file
+        (``<local_path>.part``), renamed to ``local_path`` when the file
+        is closed (see ``close_file()``). If the source is partially
+        processed according to the journal, the temporary file is
+        truncated to the recorded size and written further.
+
+        With ``compress`` configuration parameter data are compressed on
+        the fly (see :py:mod:`pyDKB.common.compression`).
+
+        :param f: file metadata (see ``file_info()``)
+        :type f: dict
+
+        :return: open file descriptor
+        :rtype: file
+        """
+        if not self.checkpoint:
+            return compression.open_file(f['local_path'], 'w',
+                                         self.compression())
+        part = f['local_path'] + self.PART_SUFFIX
+        state = None
+        if f['src'] and f['src'].get('full_path'):
+            state = self.checkpoint.get(f['src']['full_path'])
+        if not state or state.get('done'):
+            if os.path.exists(part):
+                self.log("Overwriting incomplete output file: %s" % part,
+                         logLevel.WARN)
+            return compression.open_file(part, 'w', self.compression())
+        if state['output'] != os.path.abspath(f['local_path']):
+            raise ProducerException("Output file differs from the one in"
+                                    " the checkpoint journal: %s (expected:"
+                                    " %s)" % (f['local_path'],
+                                              state['output']))
+        if not os.path.exists(part) \
+                or os.path.getsize(part) < state['size']:
+            raise ProducerException("Output file is missing or shorter than"
+                                    " recorded in the checkpoint journal:"
+                                    " %s (expected: %d bytes)"
+                                    % (part, state['size']))
+        fd = open(part, 'r+')
+        fd.truncate(state['size'])
+        fd.seek(0, os.SEEK_END)
+        self.log("Resuming output file: %s (%d bytes)"
+                 % (part, state['size']))
+        return fd
+
     def close_file(self):
-        """ Close current file. """
+        """ Close current file and finalize it (unless interrupted).
+
+        Finalization (renaming of the temporary file) is done with
+        checkpoint journal only (see ``open_file()``).
+        """
         f = self.current_file
         if f and f.get('fd'):
             f['fd'].close()
             del f['fd']
+            if self.checkpoint and not self.interrupted:
+                try:
+                    os.replace(f['local_path'] + self.PART_SUFFIX,
+                               f['local_path'])
+                except OSError as err:
+                    raise ProducerException("Failed to finalize output"
+                                            " file: %s" % f['local_path'],
+                                            err)
+
+    def interrupt(self):
+        """ Mark output as incomplete.
+
+        With checkpoint journal files are closed without finalization,
+        keeping the temporary names (see ``open_file()``).
+        """
+        self.interrupted = True
 
     def close(self):
         """ Close opened files and remove temporary one. """
@@ -19,6 +19,13 @@ from pyDKB.common import hdfs
 class HDFSProducer(FileProducer):
     """ Data producer implementation for HDFS data dest. """
 
+    # Max number of closed output files waiting to be moved to HDFS
+    # (1 -- every file is moved as soon as it is closed)
+    upload_batch = 1
+
+    # Closed output files to be moved: {HDFS dir: [local path, ...]}
+    _pending = None
+
     def config_dir(self, config={}):
         """ Configure output directory. """
         if not config:
@@ -54,11 +61,36 @@ class HDFSProducer(FileProducer):
         return f
 
     def close_file(self):
-        """ Close current file and move it to HDFS. """
+        """ Close current file and move it to HDFS.
+
+        With ``upload_batch`` > 1 closed files are moved to HDFS by
+        batches (see ``upload()``).
+        """
         super(HDFSProducer, self).close_file()
         f = self.current_file
         if f:
             l_path = f.get('local_path')
             h_path = f.get('hdfs_path')
             if l_path and h_path and os.path.exists(l_path):
-                hdfs.movefile(l_path, h_path)
+                if self.upload_batch <= 1:
+                    hdfs.movefile(l_path, h_path)
+                    return
+                if self._pending is None:
+                    self._pending = {}
+                pending = self._pending.setdefault(f['dir'], [])
+                if l_path not in pending:
+                    pending.append(l_path)
+                if sum(map(len, self._pending.values())) \
+                        >= self.upload_batch:
+                    self.upload()
+
+    def upload(self):
+        """ Move closed output files waiting for it to HDFS. """
+        pending, self._pending = self._pending or {}, {}
+        for dirname, files in pending.items():
+            hdfs.movefiles(files, dirname)
+
+    def close(self):
+        """ Close opened files and move them to HDFS. """
+        super(HDFSProducer, self).close()
+        self.upload()
@@ -36,10 +36,17 @@ class Producer(LoggableObject):
             self.config = config
         self.init_stream()
 
+    def stream_config(self):
+        """ Get configuration for the output stream.
+
+        Length-prefixed framing is used for (s)tream destinations only.
+        """
+        return dict(self.config, framing='delimiter')
+
     def init_stream(self):
         """ Init output stream (without real destination). """
         self._stream = \
-            StreamBuilder(None, self.config) \
+            StreamBuilder(None, self.stream_config()) \
             .setStream('output') \
             .setType(self.message_type) \
             .build()
@@ -106,9 +113,21 @@ class Producer(LoggableObject):
         """ Flush buffered messages to the current dest. """
         self.get_stream().flush()
 
-    def drop(self):
-        """ Drop buffered messages. """
-        self.get_stream(False).drop()
+    def buffered(self):
+        """ Return number of buffered messages. """
+        return self.get_stream(False).buffered()
+
+    def full(self):
+        """ Check if the output buffer has reached its limits. """
+        return self.get_stream(False).full()
+
+    def transferred(self):
+        """ Return amount of data written (see ``Stream.transferred``). """
+        return self._stream.transferred if self._stream else 0
+
+    def drop(self, since=0):
+        """ Drop buffered messages (all or all but ``since`` first). """
+        self.get_stream(False).drop(since)
 
     def close(self):
         """ Close opened data stream and data dest. """
@@ -23,6 +23,10 @@ class StreamProducer(Producer):
         self.fd = sys.stdout
         super(StreamProducer, self).reconfigure(config)
 
+    def stream_config(self):
+        """ Get configuration for the output stream. """
+        return self.config
+
     def get_dest_info(self):
         """ Return current dest info. """
         return {'fd': self.fd}
@@ -22,6 +22,7 @@ class ProducerBuilder(object):
     producerClass = None
     message_type = None
     src_info = None
+    checkpoint = None
 
     def __init__(self, config={}):
         """ Constructor initialization. """
@@ -69,11 +70,24 @@ class ProducerBuilder(object):
         self.src_info = src_info
         return self
 
+    def setCheckpoint(self, checkpoint):
+        """ Set checkpoint journal (for local uncompressed files only). """
+        if checkpoint and self.producerClass is not FileProducer:
+            raise ProducerException("Checkpoint journal requires local (f)ile"
+                                    " destination.")
+        if checkpoint and self.config.get('compress'):
+            raise ProducerException("Checkpoint journal can not be used with"
+                                    " compressed output.")
+        self.checkpoint = checkpoint
+        return self
+
     def build(self, config={}):
         """ Return constructed producer. """
         if not config:
             config = self.config
         instance = self.producerClass(config)
+        if self.checkpoint:
+            instance.checkpoint = self.checkpoint
         if self.message_type:
             instance.set_message_type(self.message_type)
         if self.src_info and getattr(instance, 'get_source_info', False):
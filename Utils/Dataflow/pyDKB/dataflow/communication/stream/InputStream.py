@@ -6,6 +6,8 @@ from .Stream import Stream
 from pyDKB.common.types import logLevel
 from . import Message
 from pyDKB.common import custom_readline
+from pyDKB.common.compression import CompressedFile
+from . import framing
 
 import os
 import sys
@@ -24,7 +26,15 @@ class InputStream(Stream):
     def _reset_iterator(self):
         """ Reset inner iterator on a new file descriptor. """
         fd = self.get_fd()
-        if self.EOM == '\n':
+        if self.framing == 'length':
+            binary = Message(self.message_type).binary
+            self.__iterator = framing.read_frames(fd, skip_eop=True,
+                                                  binary=binary)
+            self.is_readable = self._gi_is_readable
+        elif isinstance(fd, CompressedFile):
+            self.__iterator = fd.messages(self.EOM)
+            self.is_readable = self._gi_is_readable
+        elif self.EOM == '\n' and self._fd_is_seekable():
             self.__iterator = iter(fd.readline, "")
             self.is_readable = self._fd_is_readable
         elif self.EOM == '':
@@ -34,6 +44,16 @@ class InputStream(Stream):
             self.__iterator = custom_readline(fd, self.EOM)
             self.is_readable = self._gi_is_readable
 
+    def _fd_is_seekable(self):
+        """ Check if bound file descriptor is a regular file (or STDIN).
+
+        Other non-seekable files (pipes) are read with
+        ``custom_readline()`` to tell when they are over without
+        blocking.
+        """
+        fd = self.get_fd()
+        return fd.fileno() == sys.stdin.fileno() or fd.seekable()
+
     def reset(self, fd, close=True, force=False):
         """ Reset current stream with new file descriptor.
 
@@ -92,7 +112,8 @@ class InputStream(Stream):
             result = None
         elif getattr(fd, 'closed', True):
             result = False
-        elif fd.fileno() == sys.stdin.fileno():
+        elif fd.fileno() == sys.stdin.fileno() or not fd.seekable():
+            # Pipes are readable until closed
             result = True
         else:
             stat = os.fstat(fd.fileno())
@@ -127,9 +148,8 @@ class InputStream(Stream):
         messageClass = Message(self.message_type)
 
         try:
-            msg = messageClass(message)
-            msg.decode()
-            return msg
+            # Message is decoded on construction
+            return messageClass(message)
         except (ValueError, TypeError) as err:
             self.log("Failed to read input message as %s.\n"
                      "Cause: %s\n"
@@ -144,15 +164,39 @@ class InputStream(Stream):
         Raw item is a sequence of symbols that corresponds
         to the supervisor/worker communication protocol object.
         Known objects:
-        * message (``<raw_data>+<EOM>``).
+        * message (``<raw_data>+<EOM>``);
+        * frame (``(kind, <raw_data>)``, for "length" framing mode;
+          see :py:mod:`.framing`).
 
         :returns: next raw item
-        :rtype: str
+        :rtype: str, tuple
         """
         if not self.__iterator:
             self._reset_iterator()
         return next(self.__iterator)
 
+    def skip(self, n):
+        """ Skip next ``n`` raw items (without parsing them).
+
+        :param n: number of items to skip
+        :type n: int
+
+        :returns: number of items skipped (less than ``n`` if the stream
+                  is over)
+        :rtype: int
+        """
+        skipped = 0
+        while skipped < n:
+            try:
+                item = self.get_raw_item()
+            except StopIteration:
+                break
+            if self.framing == 'length':
+                item = item[1]
+            self.transferred += len(item)
+            skipped += 1
+        return skipped
+
     def get_item(self):
         """ Get next stream item (constructed of raw items).
 
@@ -169,7 +213,17 @@ class InputStream(Stream):
             msg = self.get_raw_item()
         except StopIteration:
             return None
-        if not msg.endswith(self.EOM):
+        if self.framing == 'length':
+            kind, msg = msg
+            self.transferred += len(msg)
+            if kind is None:
+                self.log("Unexpected end of stream (incomplete frame),"
+                         " skipping rest of input: %r" % msg[:20],
+                         logLevel.WARN)
+                return False
+            result = self.parse_message(msg)
+        elif not msg.endswith(self.EOM):
+            self.transferred += len(msg)
             log_msg = msg[:10] + '<...>' * (len(msg) > 20)
             log_msg += msg[-min(len(msg) - 10, 10):]
             log_msg = log_msg.replace('\n', r'\n')
@@ -177,6 +231,7 @@ class InputStream(Stream):
                      "'%s'" % log_msg, logLevel.WARN)
             return False
         else:
+            self.transferred += len(msg)
             if self.EOM != '':
                 msg = msg[:-len(self.EOM)]
             result = self.parse_message(msg)
@@ -4,23 +4,63 @@ pyDKB.dataflow.communication.stream.OutputStream
 
 from .Stream import Stream
 from . import Message
+from . import framing
+
+# Default buffer limits: number of messages (0 -- unlimited) and total
+# size of encoded messages (characters, i.e. bytes for ASCII data)
+MAX_BUFFERED = 0
+MAX_BUFFERED_SIZE = 16 * 1024 * 1024
 
 
 class OutputStream(Stream):
-    """ Implementation of the output stream. """
+    """ Implementation of the output stream.
+
+    Messages are encoded as soon as they are written to the stream and
+    kept in the buffer till ``flush()``. Buffer limits do not cause
+    flushes by themselves (buffered messages may still be dropped),
+    but tell the writer when it is time to flush (see ``full()``).
+    """
 
-    msg_buffer = []
+    # Encoded messages
+    msg_buffer = None
+    # Total length of the encoded messages
+    buffered_size = 0
+
+    max_buffered = MAX_BUFFERED
+    max_buffered_size = MAX_BUFFERED_SIZE
+
+    def __init__(self, fd=None, config={}):
+        """ Initialization of OutputStream object. """
+        self.msg_buffer = []
+        self.buffered_size = 0
+        super(OutputStream, self).__init__(fd, config)
 
     def configure(self, config={}):
         """ Configure instance. """
         super(OutputStream, self).configure(config)
         self.EOP = config.get('eop', '')
+        max_buffered = config.get('output_buffer')
+        if max_buffered is not None:
+            self.max_buffered = max_buffered
+        max_buffered_size = config.get('output_buffer_size')
+        if max_buffered_size is not None:
+            self.max_buffered_size = max_buffered_size
 
     def write(self, message):
-        """ Add message to the buffer. """
+        """ Add (encoded) message to the buffer.
+
+        Messages of other types with compatible content (e.g. JSON ones
+        for MessagePack stream) are converted to the stream message type.
+        """
         messageClass = Message(self.message_type)
+        msg_type = getattr(message, 'msg_type', None)
+        if msg_type and msg_type != messageClass.msg_type \
+                and messageClass.convertible(type(message)):
+            message = messageClass.convert(message)
         if isinstance(message, messageClass):
-            self.msg_buffer.append(message)
+            data = message.encode()
+            self.msg_buffer.append(data)
+            self.buffered_size += len(data)
         elif isinstance(message, list):
             for m in message:
                 self.write(m)
@@ -29,17 +69,59 @@ class OutputStream(Stream):
                             " type '%s' or 'list' (got '%s')"
                             % (messageClass.__name__, type(message).__name__))
 
+    def full(self):
+        """ Check if the buffer has reached one of the limits. """
+        return bool(self.msg_buffer) and (
+            0 < self.max_buffered <= len(self.msg_buffer)
+            or 0 < self.max_buffered_size <= self.buffered_size)
+
     def flush(self):
-        """ Flush buffer to the output stream. """
-        for msg in self.msg_buffer:
-            self.get_fd().write(msg.encode())
-            self.get_fd().write(self.EOM)
+        """ Flush buffer to the output stream (with a single write). """
+        if not self.msg_buffer:
+            return
+        fd = self.get_fd()
+        if self.framing == 'length':
+            msgs = self.msg_buffer
+            if not Message(self.message_type).binary:
+                encoding = getattr(fd, 'encoding', None) or 'utf-8'
+                msgs = [msg.encode(encoding) for msg in msgs]
+            data = b''.join([framing.frame(framing.MESSAGE, msg)
+                             for msg in msgs])
+            binary = getattr(fd, 'buffer', None)
+            if binary is None:
+                fd.write(data)
+            else:
+                # Text layer may have something buffered
+                fd.flush()
+                binary.write(data)
+            self.transferred += self.buffered_size
+        else:
+            data = self.EOM.join(self.msg_buffer)
+            data += self.EOM
+            fd.write(data)
+            self.transferred += len(data)
         self.drop()
 
     def eop(self):
         """ Signalize Supervisor about end of process. """
-        self.get_fd().write(self.EOP)
+        if self.framing == 'length':
+            framing.write_frame(self.get_fd(), framing.EOP)
+        else:
+            self.get_fd().write(self.EOP)
 
-    def drop(self):
-        """ Drop buffer without sending messages anywhere. """
-        self.msg_buffer = []
+    def buffered(self):
+        """ Return number of messages in the buffer. """
+        return len(self.msg_buffer)
+
+    def drop(self, since=0):
+        """ Drop buffer without sending messages anywhere.
+
+        :param since: number of (first) messages to keep in the buffer
+        :type since: int
+        """
+        if since:
+            self.buffered_size -= sum(len(m) for m in self.msg_buffer[since:])
+            del self.msg_buffer[since:]
+        else:
+            self.msg_buffer = []
+            self.buffered_size = 0
@@ -7,7 +7,9 @@ from io import IOBase
 
 from pyDKB.common import LoggableObject
 from . import messageType
+from . import Message
 from .exceptions import StreamException
+from .framing import MODES
 
 
 class Stream(LoggableObject):
@@ -15,10 +17,16 @@ class Stream(LoggableObject):
 
     message_type = None
     EOM = None
+    framing = 'delimiter'
     _fd = None
 
+    # Number of characters (bytes, for ASCII data) of messages read from
+    # or written to the stream
+    transferred = 0
+
     def __init__(self, fd=None, config={}):
         """ Initialization of Stream object. """
+        self.transferred = 0
         self.reset(fd)
         self.configure(config)
 
@@ -28,12 +36,29 @@ class Stream(LoggableObject):
             raise TypeError("Stream.configure() expects parameter of type"
                             " 'dict' (got '%s')" % config.__class__.__name__)
         self.EOM = config['eom']
+        framing = config.get('framing') or 'delimiter'
+        if framing not in MODES:
+            raise ValueError("Unknown framing mode: '%s' (expected one of:"
+                             " %s)" % (framing, ', '.join(MODES)))
+        self.framing = framing
+        self._check_framing()
 
     def set_message_type(self, msg_type):
         """ Set type of the messages in the stream. """
         if not messageType.hasMember(msg_type):
             raise ValueError("Unknown message type: %s" % msg_type)
         self.message_type = msg_type
+        self._check_framing()
+
+    def _check_framing(self):
+        """ Switch to "length" framing for binary messages.
+
+        Binary messages may contain any bytes, so they can not be
+        delimited with EOM/EOP symbols.
+        """
+        if messageType.hasMember(self.message_type) \
+                and Message(self.message_type).binary:
+            self.framing = 'length'
 
     def message_type(self):
         """ Get type of the messages in the stream. """
@@ -11,6 +11,7 @@ from .InputStream import InputStream
 from .Stream import Stream
 from .InputStream import InputStream
 from .OutputStream import OutputStream
+from . import framing
 
 from .exceptions import StreamException
 
@@ -0,0 +1,162 @@
+"""
+pyDKB.dataflow.communication.stream.framing
+
+Length-prefixed framing of stream items.
+
+In "length" framing mode every stream item (message or EOP marker) is
+written as a frame: fixed-size binary header, followed by the payload.
+Header consists of the item kind (one byte: ``M`` -- message,
+``P`` -- EOP marker) and the payload length in bytes (unsigned 32-bit,
+big-endian); EOP frames have no payload.
+
+Since payload length is known in advance, messages may contain any
+symbols (including EOM/EOP ones) and reader never has to scan data
+for separators. That is why binary messages (e.g. MessagePack ones) are
+always written in this mode.
+"""
+
+import os
+import select
+import struct
+
+from pyDKB.common.compression import CompressedFile
+
+# Frame header: item kind, payload length
+HEADER = struct.Struct('>cI')
+
+# Item kinds
+MESSAGE = b'M'
+EOP = b'P'
+
+# Known framing modes
+MODES = ('delimiter', 'length')
+
+# Max number of bytes to read from the file descriptor at once
+CHUNK_SIZE = 65536
+
+
+def frame(kind, payload=b''):
+    """ Construct frame for a stream item.
+
+    :param kind: item kind (``MESSAGE`` or ``EOP``)
+    :type kind: bytes
+    :param payload: item payload
+    :type payload: bytes
+
+    :return: frame
+    :rtype: bytes
+    """
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def write_frame(f, kind, payload=''):
+    """ Write frame to a (text or binary) file object.
+
+    :param f: writable file object
+    :type f: file
+    :param kind: item kind (``MESSAGE`` or ``EOP``)
+    :type kind: bytes
+    :param payload: item payload (text is encoded according to the ``f``
+                    encoding)
+    :type payload: str, bytes
+    """
+    if not isinstance(payload, bytes):
+        encoding = getattr(f, 'encoding', None) or 'utf-8'
+        payload = payload.encode(encoding)
+    data = frame(kind, payload)
+    binary = getattr(f, 'buffer', None)
+    if binary is None:
+        f.write(data)
+    else:
+        # Text layer may have something buffered
+        f.flush()
+        binary.write(data)
+
+
+def read_frames(f, skip_eop=False, binary=False):
+    """ Read frames from a file object.
+
+    Construct generator, yielding ``(kind, payload)`` pairs for every
+    frame read from ``f``; ``payload`` is decoded according to the ``f``
+    encoding (unless ``binary`` is True). If data are over in the middle
+    of a frame, ``(None, rest)`` is yielded with raw (not decoded) rest
+    of data.
+
+    If ``skip_eop`` is True, EOP frames are skipped silently.
+
+    Compressed files (:py:class:`pyDKB.common.compression.CompressedFile`)
+    are read via their ``buffer`` (decompressed data).
+
+    Just like :py:func:`pyDKB.common.custom_readline`, generator
+    supports non-blocking check for the next item: ``send(True)`` returns
+    ``True`` if there is another item to yield (or the stream is still
+    open and may provide one) or raises ``StopIteration`` otherwise.
+
+    :param f: readable file object (with ``fileno()`` method)
+    :type f: file
+    :param skip_eop: do not yield EOP frames
+    :type skip_eop: bool
+    :param binary: yield payload as bytes
+    :type binary: bool
+
+    :return: iterable object
+    :rtype: generator
+    """
+    encoding = getattr(f, 'encoding', None) or 'utf-8'
+    errors = getattr(f, 'errors', None) or 'strict'
+    if isinstance(f, CompressedFile):
+        # Compressed file: data are always available till EOF
+        poller = None
+        read = f.buffer.read
+    else:
+        fd = f.fileno()
+        poller = select.poll()
+        poller.register(fd, select.POLLIN)
+
+        def read(size):
+            return os.read(fd, size)
+    buf = bytearray()
+    # Start of the first not yet yielded frame
+    start = 0
+    eof = False
+    # Flag variable to say send() from next()
+    send_not_next = None
+    unpack = HEADER.unpack_from
+    hsize = HEADER.size
+    while True:
+        if len(buf) - start >= hsize:
+            kind, length = unpack(buf, start)
+            end = start + hsize + length
+            if end <= len(buf):
+                payload = buf[start + hsize:end]
+                start = end
+                if skip_eop and kind == EOP:
+                    continue
+                while send_not_next:
+                    send_not_next = yield True
+                if binary:
+                    payload = bytes(payload)
+                else:
+                    payload = payload.decode(encoding, errors)
+                send_not_next = yield (kind, payload)
+                continue
+        if eof:
+            if start < len(buf):
+                while send_not_next:
+                    send_not_next = yield True
+                yield (None, bytes(buf[start:]))
+            break
+        if poller and send_not_next and not poller.poll(0):
+            send_not_next = yield True
+            continue
+        if poller and not send_not_next:
+            poller.poll()
+        chunk = read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            continue
+        if start:
+            # Drop already yielded frames (once per chunk)
+            del buf[:start]
+            start = 0
+        buf += chunk
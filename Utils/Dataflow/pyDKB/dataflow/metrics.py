@@ -0,0 +1,215 @@
+"""
+pyDKB.dataflow.metrics
+
+Runtime metrics of a processor stage.
+
+Stage collects counters (messages read, written, failed and skipped;
+bytes read and written) and latency histograms (message processing,
+waiting for input, output flush) and writes them to a metrics file
+periodically and at exit.
+
+Metrics file is written either as JSON or (if its name ends with
+``.prom``) in Prometheus text format, suitable for the node exporter
+textfile collector. The file is replaced atomically, so readers never
+see it half-written.
+"""
+
+import os
+import json
+import time
+import bisect
+import tempfile
+import threading
+
+from pyDKB.common import LoggableObject
+from pyDKB.common.types import logLevel
+
+# Default upper bounds of histogram buckets (seconds)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Counters: name, description
+COUNTERS = (('messages_in', 'Input messages read'),
+            ('messages_out', 'Output messages written'),
+            ('messages_failed', 'Messages failed to be read or processed'),
+            ('messages_skipped', 'Messages passed through in skip mode'),
+            ('bytes_in', 'Input data read (bytes, for ASCII data)'),
+            ('bytes_out', 'Output data written (bytes, for ASCII data)'))
+
+# Histograms: name, description
+HISTOGRAMS = (('process', 'Batch processing time'),
+              ('input_wait', 'Time spent waiting for an input message'),
+              ('output_flush', 'Time spent writing output of a batch'))
+
+# Prefix for Prometheus metric names
+PROMETHEUS_PREFIX = 'dkb_stage_'
+
+
+class Histogram(object):
+    """ Histogram of observed values with fixed buckets. """
+
+    def __init__(self, buckets=BUCKETS):
+        """ Initialize empty histogram.
+
+        :param buckets: upper bounds of the buckets (sorted)
+        :type buckets: tuple
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """ Add value to the histogram. """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """ Return list of (upper bound, number of values <= bound).
+
+        The last bound is ``float('inf')``.
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'), ),
+                                self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class StageMetrics(LoggableObject):
+    """ Metrics of a stage, dumped to a file.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, stage, fname, interval=60):
+        """ Initialize metrics.
+
+        :param stage: stage name (for Prometheus label)
+        :type stage: str
+        :param fname: metrics file name (``*.prom`` for Prometheus format)
+        :type fname: str
+        :param interval: interval between dumps (seconds; 0 -- dump
+                         only at exit)
+        :type interval: float
+        """
+        self.stage = stage
+        self.fname = fname
+        self.interval = interval
+        self.started = time.time()
+        self.counters = dict((name, 0) for name, descr in COUNTERS)
+        self.histograms = dict((name, Histogram())
+                               for name, descr in HISTOGRAMS)
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._dumper = None
+        if interval > 0:
+            self._dumper = threading.Thread(target=self._dump_periodically)
+            self._dumper.daemon = True
+            self._dumper.start()
+
+    def inc(self, name, value=1):
+        """ Increase counter. """
+        with self._lock:
+            self.counters[name] += value
+
+    def set(self, name, value):
+        """ Set counter value. """
+        with self._lock:
+            self.counters[name] = value
+
+    def observe(self, name, value):
+        """ Add value (seconds) to histogram. """
+        with self._lock:
+            self.histograms[name].observe(value)
+
+    def add_collector(self, func):
+        """ Add function to be called (with metrics) before every dump.
+
+        Collectors are used to update values, which are not counted
+        on the fly (e.g. take number of bytes from the streams).
+        """
+        self.collectors.append(func)
+
+    def snapshot(self):
+        """ Return current values as a JSON-serializable dict. """
+        for func in self.collectors:
+            func(self)
+        with self._lock:
+            return {
+                'stage': self.stage,
+                'timestamp': time.time(),
+                'uptime': time.time() - self.started,
+                'counters': dict(self.counters),
+                'histograms': dict(
+                    (name, {'count': h.count, 'sum': h.sum,
+                            'buckets': [[b if b != float('inf') else '+Inf',
+                                         c] for b, c in h.cumulative()]})
+                    for name, h in self.histograms.items())
+            }
+
+    def prometheus(self, snapshot):
+        """ Format snapshot in Prometheus text format. """
+        label = 'stage="%s"' % self.stage.replace('\\', r'\\') \
+            .replace('"', r'\"')
+        lines = []
+        for name, descr in COUNTERS:
+            metric = PROMETHEUS_PREFIX + name + '_total'
+            lines += ['# HELP %s %s.' % (metric, descr),
+                      '# TYPE %s counter' % metric,
+                      '%s{%s} %d' % (metric, label,
+                                     snapshot['counters'][name])]
+        for name, descr in HISTOGRAMS:
+            metric = PROMETHEUS_PREFIX + name + '_seconds'
+            h = snapshot['histograms'][name]
+            lines += ['# HELP %s %s.' % (metric, descr),
+                      '# TYPE %s histogram' % metric]
+            for bound, count in h['buckets']:
+                lines.append('%s_bucket{%s,le="%s"} %d'
+                             % (metric, label, bound, count))
+            lines += ['%s_sum{%s} %r' % (metric, label, h['sum']),
+                      '%s_count{%s} %d' % (metric, label, h['count'])]
+        metric = PROMETHEUS_PREFIX + 'uptime_seconds'
+        lines += ['# HELP %s Time since the stage start.' % metric,
+                  '# TYPE %s gauge' % metric,
+                  '%s{%s} %r' % (metric, label, snapshot['uptime'])]
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """ Write metrics to the file (replacing it atomically). """
+        snapshot = self.snapshot()
+        if self.fname.endswith('.prom'):
+            data = self.prometheus(snapshot)
+        else:
+            data = json.dumps(snapshot, indent=2, sort_keys=True) + '\n'
+        dirname = os.path.dirname(os.path.abspath(self.fname))
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=dirname,
+                                       prefix='.' + os.path.basename(
+                                           self.fname) + '.')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, self.fname)
+        except (OSError, IOError) as err:
+            self.log("Failed to write metrics file (%s): %s"
+                     % (self.fname, err), logLevel.WARN)
+            if tmp and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _dump_periodically(self):
+        """ Dump metrics every ``interval`` seconds until stopped. """
+        while not self._stopped.wait(self.interval):
+            self.dump()
+
+    def stop(self):
+        """ Stop periodic dumps and write final values. """
+        self._stopped.set()
+        if self._dumper and self._dumper is not threading.current_thread():
+            self._dumper.join()
+        self.dump()
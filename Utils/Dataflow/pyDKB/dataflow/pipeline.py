@@ -0,0 +1,270 @@
+"""
+pyDKB.dataflow.pipeline
+
+In-process pipeline of processor stages.
+
+Instead of running every stage as a separate program and connecting them
+with pipes (encoding and decoding every message between the stages),
+pipeline loads stage scripts into a single process and passes messages
+(decoded content) from one stage to another directly.
+
+A stage which needs to be isolated (e.g. because of heavy or conflicting
+dependencies) can be run as a separate process: the pipeline talks to it
+via the stream protocol with length-prefixed framing ("--framing length").
+
+Stage script, to be loaded into the pipeline, must provide function
+``init_stage(args)``, returning configured
+:py:class:`pyDKB.dataflow.stage.ProcessorStage` instance.
+
+Usage example (see ``--help`` for details)::
+
+  pipeline.py -m s --stage "091_datasetsRucio/datasets_processing.py --skip"\\
+                   --stage "016_task2es/task2es.py" \\
+                   --isolated-stage "095_datasetInfoAMI/amiDatasets.py"
+"""
+
+import os
+import sys
+import shlex
+import subprocess
+import importlib.util
+
+from . import messageType
+from . import communication
+from .exceptions import DataflowException
+from .stage import ProcessorStage
+from .communication.stream import framing
+from pyDKB.common.types import logLevel
+
+
+def load_stage(path, args=None):
+    """ Load stage script and initialize the stage.
+
+    :raises DataflowException: script does not provide ``init_stage()``
+
+    :param path: path to the stage script
+    :type path: str
+    :param args: stage arguments
+    :type args: list
+
+    :return: configured stage
+    :rtype: pyDKB.dataflow.stage.ProcessorStage
+    """
+    path = os.path.abspath(path)
+    name = '_'.join(path.split(os.sep)[-2:]).replace('.', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, 'init_stage'):
+        raise DataflowException("Stage script can not be loaded into"
+                                " pipeline (no init_stage()): %s" % path)
+    return module.init_stage(args or [])
+
+
+class IsolatedStage(object):
+    """ Pipeline node: stage running as a separate process.
+
+    Stage is run in (s)tream mode with length-prefixed framing; for every
+    input message pipeline waits for the EOP frame and takes all message
+    frames before it as the output of the message processing.
+    """
+
+    def __init__(self, args, input_type=messageType.JSON,
+                 output_type=messageType.JSON):
+        """ Start the stage process.
+
+        :param args: stage command (with arguments)
+        :type args: list
+        :param input_type: input message type
+        :type input_type: messageType member
+        :param output_type: output message type
+        :type output_type: messageType member
+        """
+        self.args = args
+        self.__input_message_type = input_type
+        self.__output_message_type = output_type
+        self.proc = subprocess.Popen(list(args) + ['-m', 's',
+                                                   '--framing', 'length'],
+                                     stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE)
+        self.__reader = framing.read_frames(self.proc.stdout)
+
+    def input_message_class(self):
+        """ Get input message class. """
+        return communication.Message(self.__input_message_type)
+
+    def output_message_class(self):
+        """ Get output message class. """
+        return communication.Message(self.__output_message_type)
+
+    def messages_owned(self):
+        """ Check if "messages are owned" mode is on (always True). """
+        return True
+
+    def process_messages(self, messages):
+        """ Process messages with the stage process.
+
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: processing status and output messages
+        :rtype: tuple(bool, list)
+        """
+        result = []
+        cls = self.output_message_class()
+        for msg in messages:
+            framing.write_frame(self.proc.stdin, framing.MESSAGE,
+                                msg.encode())
+            self.proc.stdin.flush()
+            kind, payload = next(self.__reader, (None, None))
+            while kind == framing.MESSAGE:
+                result.append(cls(payload))
+                kind, payload = next(self.__reader, (None, None))
+            if kind != framing.EOP:
+                raise DataflowException("Stage process terminated"
+                                        " unexpectedly (exit code: %s): %s"
+                                        % (self.proc.wait(),
+                                           ' '.join(self.args)))
+        return True, result
+
+    def stop(self):
+        """ Finish the stage process. """
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+        self.proc.stdout.close()
+
+
+class Pipeline(ProcessorStage):
+    """ Processor stage running a chain of other stages in one process.
+
+    Every batch of input messages is passed through all the pipeline
+    nodes (stages) one by one; output messages of the last node are
+    written to the output.
+
+    Class/instance variable description:
+
+    * Pipeline nodes (ProcessorStage or IsolatedStage objects)
+        __nodes
+    """
+
+    def __init__(self, description="DKB Dataflow pipeline: run processor"
+                                   " stages within a single process."):
+        """ Initialize the pipeline. """
+        self.__nodes = []
+        super(Pipeline, self).__init__(description)
+        self.set_input_message_type(messageType.JSON)
+        self.set_output_message_type(messageType.JSON)
+        self.set_messages_owned()
+
+    def defaultArguments(self):
+        """ Default parser configuration. """
+        super(Pipeline, self).defaultArguments()
+        self.add_argument('--stage', action='append', type=str,
+                          help='stage command (script with arguments) to '
+                          'be loaded into the pipeline. Can be used '
+                          'multiple times: stages will be applied in the '
+                          'order of specification.',
+                          default=[],
+                          metavar='CMD',
+                          dest='stages'
+                          )
+        self.add_argument('--isolated-stage', action='append',
+                          type=lambda cmd: IsolatedStage.__name__ + ':' + cmd,
+                          help='same as "--stage", but the stage will be '
+                          'run as a separate process.',
+                          metavar='CMD',
+                          dest='stages'
+                          )
+
+    def configure(self, args=None):
+        """ Configure the pipeline and its stages. """
+        super(Pipeline, self).configure(args)
+        prefix = IsolatedStage.__name__ + ':'
+        try:
+            for cmd in self.ARGS.stages:
+                if cmd.startswith(prefix):
+                    self.add_isolated_stage(shlex.split(cmd[len(prefix):]))
+                else:
+                    cmd = shlex.split(cmd)
+                    self.add_stage(load_stage(cmd[0], cmd[1:]))
+        except BaseException as err:
+            self.log("Failed to configure pipeline: %s" % err, logLevel.ERROR)
+            self.stop()
+            sys.exit(1)
+
+    def add_stage(self, stage):
+        """ Add configured stage to the end of the pipeline. """
+        self.__nodes.append(stage)
+
+    def add_isolated_stage(self, args):
+        """ Start stage process and add it to the end of the pipeline. """
+        self.__nodes.append(IsolatedStage(args))
+
+    def nodes(self):
+        """ Return list of the pipeline nodes. """
+        return list(self.__nodes)
+
+    @staticmethod
+    def process_batch(stage, messages):
+        """ Pass batch of messages through the pipeline. """
+        stage.output(stage.transfer(messages))
+        return True
+
+    def transfer(self, messages):
+        """ Pass messages through all the nodes.
+
+        Output messages of a node are converted into the input messages
+        of the next one without encoding: decoded content is passed as is
+        (with "incomplete" mark).
+
+        :param messages: input messages
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: output messages of the last node
+        :rtype: list(pyDKB.messages.AbstractMessage)
+        """
+        for node in self.__nodes:
+            cls = node.input_message_class()
+            owned = node.messages_owned()
+            node_input = []
+            for msg in messages:
+                if not isinstance(msg, cls):
+                    incompl = msg.incomplete()
+                    msg = cls(msg.take(), owned=True)
+                    msg.incomplete(incompl)
+                msg.owned = owned
+                node_input.append(msg)
+            messages = []
+            for msg in node_input:
+                ok, output = node.process_messages([msg])
+                if ok:
+                    messages.extend(output)
+            if not messages:
+                break
+        return messages
+
+    # Override
+    def stop(self):
+        """ Finalize the pipeline and its stages. """
+        super(Pipeline, self).stop()
+        for node in self.__nodes:
+            try:
+                node.stop()
+            except Exception as err:
+                self.log("Failed to stop pipeline node %s: %s"
+                         % (node, err), logLevel.ERROR)
+
+
+def main(args):
+    """ Run pipeline with given arguments. """
+    pipeline = Pipeline()
+    pipeline.configure(args)
+    exit_code = pipeline.run()
+    if exit_code == 0:
+        pipeline.stop()
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -2,6 +2,7 @@
 Definition of an abstract class for Dataflow Stages.
 """
 
+import os
 import sys
 import traceback
 import configparser
@@ -9,6 +10,7 @@ from collections import defaultdict
 import textwrap
 
 from pyDKB.common import LoggableObject
+from pyDKB.common import profiling
 from pyDKB.common.types import logLevel
 from pyDKB.common.misc import (log,
                                ensure_argparse_arg_name)
@@ -38,8 +40,13 @@ class AbstractStage(LoggableObject):
 
     * Stage custom config (defaultdict(defaultdict(str)))
         CONFIG
+
+    * Profiler (if profiling is enabled and running)
+        _profiler
     """
 
+    _profiler = None
+
     def __init__(self, description="DKB Dataflow stage"):
         """ Initialize the stage
 
@@ -132,6 +139,39 @@ class AbstractStage(LoggableObject):
                           default=None,
                           dest='eop'
                           )
+        self.add_argument('--profile', action='store', type=str,
+                          nargs='?', const='cprofile',
+                          help='profile stage run with (c)Profile (writes '
+                          'pstats file) or with statistical (sampling) '
+                          'profiler (writes collapsed stacks for '
+                          'flamegraphs). NOTE: cProfile sees the main '
+                          'thread only, use sampling profiler with '
+                          '--workers > 1. Use "--profile=MODE" form before '
+                          'positional arguments.\n'
+                          'Can also be set via DKB_PROFILE environment '
+                          'variable.\n'
+                          'DEFAULT (if specified without MODE): cprofile',
+                          default=os.environ.get('DKB_PROFILE') or None,
+                          metavar='MODE',
+                          choices=profiling.MODES,
+                          dest='profile'
+                          )
+        self.add_argument('--profile-messages', action='store', type=int,
+                          help='stop profiling after N input messages '
+                          '(0 -- profile the whole run)',
+                          default=0,
+                          metavar='N',
+                          dest='profile_messages'
+                          )
+        self.add_argument('--profile-dir', action='store', type=str,
+                          help='directory for profile files (named '
+                          '<stage>.<pid>.prof or <stage>.<pid>.folded). '
+                          'Can also be set via DKB_PROFILE_DIR environment '
+                          'variable',
+                          default=os.environ.get('DKB_PROFILE_DIR') or '.',
+                          metavar='DIR',
+                          dest='profile_dir'
+                          )
 
     def _is_flag_option(self, **kwargs):
         """ Check if added argument is a flag option. """
@@ -224,6 +264,16 @@ class AbstractStage(LoggableObject):
                          "Case: %s" % (err), logLevel.ERROR)
                 sys.exit(1)
 
+        if self.ARGS.profile not in (None,) + profiling.MODES:
+            self.args_error("argument --profile: invalid choice: '%s'"
+                            " (choose from %s)"
+                            % (self.ARGS.profile,
+                               ', '.join(profiling.MODES)))
+        if self.ARGS.profile_messages < 0:
+            self.args_error("argument --profile-messages: non-negative"
+                            " value expected (got %d)"
+                            % self.ARGS.profile_messages)
+
         if self.ARGS.mode == 'm':
             if 'f' in (self.ARGS.source, self.ARGS.dest):
                 self.log("File source/destination is not allowed "
@@ -298,6 +348,34 @@ class AbstractStage(LoggableObject):
                 trace = traceback.format_exception(*exc_info)
                 self.log(''.join(trace), logLevel.DEBUG)
 
+    def stage_name(self):
+        """ Get stage name (name of the executed script). """
+        return os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+    def start_profiling(self):
+        """ Start profiler (if requested by ``--profile``). """
+        if not self.ARGS or not self.ARGS.profile or self._profiler:
+            return
+        self._profiler = profiling.profiler(self.ARGS.profile)
+        self._profiler.start()
+
+    def stop_profiling(self):
+        """ Stop profiler (if running) and write profile file. """
+        if not self._profiler:
+            return
+        prof = self._profiler
+        self._profiler = None
+        prof.stop()
+        fname = os.path.join(self.ARGS.profile_dir, '%s.%d%s'
+                             % (self.stage_name(), os.getpid(),
+                                profiling.EXTENSIONS[self.ARGS.profile]))
+        try:
+            prof.dump(fname)
+        except (OSError, IOError) as err:
+            self.log("Failed to write profile: %s" % err, logLevel.WARN)
+        else:
+            self.log("Profile written to: %s" % fname)
+
     def stop(self):
         """ Stop running processes and output error information. """
         self.output_error()
@@ -0,0 +1,330 @@
+"""
+Definition of a class for Dataflow Data Processing Stages with
+asynchronous (asyncio-based) message processing (requires Python 3.7+).
+
+        USAGE:
+         AsyncProcessorStage [<options>] [<input files>]
+
+        OPTIONS:
+         (same as for ProcessorStage; --workers is ignored)
+
+         --concurrency      N           - max number of input messages
+                                          processed concurrently
+"""
+
+import time
+import asyncio
+import inspect
+import threading
+from concurrent import futures
+
+from . import ProcessorStage
+from pyDKB.common.types import logLevel
+
+
+async def _result(value):
+    """ Return value (awaiting for it, if needed). """
+    if inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+class AsyncProcessorStage(ProcessorStage):
+    """ Processor stage with asynchronous message processing.
+
+    Intended for stages spending most of the time waiting for remote
+    services. ``process()`` is defined as a coroutine function
+    (``async def process(stage, message)``) and up to ``--concurrency``
+    input messages are processed concurrently by an asyncio event loop
+    in the main thread.
+
+    Input is read by a separate thread. Every input batch is processed as
+    soon as it is read (all messages of the batch -- concurrently, see
+    ``process_each()``); output of the batch is written, followed by
+    a single EOP marker, in the input order (or, with ``--unordered``,
+    in order of completion) -- just as in ``ProcessorStage`` parallel
+    mode.
+
+    ``process()``, ``skip_process()`` and ``process_batch()`` may be
+    either coroutine or regular functions.
+
+    NOTE: regular functions (as well as the coroutine code between
+          ``await`` expressions) block the event loop; blocking calls
+          (e.g. requests made with synchronous clients) should be
+          wrapped with ``run_blocking()``.
+
+    Class/instance variable description:
+
+    * Semaphore limiting number of messages processed concurrently
+        __semaphore
+    """
+
+    __semaphore = None
+
+    def __init__(self, description="DKB Dataflow data processing stage"
+                                   " (asynchronous)."):
+        """ Initialize the stage. """
+        super(AsyncProcessorStage, self).__init__(description)
+
+    def defaultArguments(self):
+        """ Default parser configuration. """
+        super(AsyncProcessorStage, self).defaultArguments()
+        self.add_argument('--concurrency', action='store', type=int,
+                          help='max number of input messages to be '
+                          'processed concurrently (number of coroutines '
+                          'waiting for remote services at the same '
+                          'time). Up to twice as many input batches are '
+                          'read in advance.\n'
+                          'DEFAULT: %(default)s',
+                          default=10,
+                          metavar='N',
+                          dest='concurrency'
+                          )
+
+    def parse_args(self, args):
+        """ Parse arguments and check stage-specific values.
+
+        Exits with code 2 in case of invalid argument value.
+        """
+        super(AsyncProcessorStage, self).parse_args(args)
+        if self.ARGS.concurrency < 1:
+            self.args_error("argument --concurrency: positive value expected"
+                            " (got %d)" % self.ARGS.concurrency)
+
+    def batch_processor(self):
+        """ Get coroutine function to process batches of messages.
+
+        :return: ``process_batch()`` or, in "skip" mode, function
+                 calling ``skip_process()`` for every message
+        :rtype: function
+        """
+        if self.ARGS.skip_process:
+            async def process_batch(stage, messages):
+                return await stage.process_each(stage.skip_process,
+                                                messages)
+        else:
+            process_batch = self.process_batch
+        stage_metrics = self.get_metrics()
+        if stage_metrics:
+            process = process_batch
+            skip = self.ARGS.skip_process
+
+            async def process_batch(stage, messages):
+                start = time.time()
+                ok = await _result(process(stage, messages))
+                stage_metrics.observe('process', time.time() - start)
+                if skip:
+                    stage_metrics.inc('messages_skipped', len(messages))
+                elif not ok:
+                    stage_metrics.inc('messages_failed', len(messages))
+                return ok
+        return process_batch
+
+    def process_messages(self, messages):
+        """ Process messages outside of the stage main loop.
+
+        See ``ProcessorStage.process_messages()``; the event loop is
+        run till the messages are processed.
+        """
+        return asyncio.run(self._process_messages(messages))
+
+    async def _process_messages(self, messages):
+        """ Process messages, collecting the output. """
+        self.__semaphore = asyncio.Semaphore(self.ARGS.concurrency)
+        self._local.buffer = []
+        ok = bool(messages) \
+            and await _result(self.batch_processor()(self, messages))
+        return ok, self._local.buffer
+
+    def run_batches(self, process_batch):
+        """ Run process_batch() for input batches in the event loop.
+
+        :param process_batch: batch processing (coroutine) function
+        :type process_batch: function
+        """
+        if self.ARGS.workers > 1:
+            self.log("Asynchronous stage does not use worker threads"
+                     " (--workers); see --concurrency.", logLevel.WARN)
+        asyncio.run(self._run_batches(process_batch))
+
+    async def _run_batches(self, process_batch):
+        """ Process input batches and write their output.
+
+        Batches are passed from the input reader thread to the event loop
+        and processed as separate tasks; their results are written by
+        the main task (see ``write_result()``). Exceptions raised during
+        processing (or input reading) are re-raised.
+        """
+        concurrency = self.ARGS.concurrency
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(futures.ThreadPoolExecutor(concurrency))
+        self.__semaphore = asyncio.Semaphore(concurrency)
+        ordered = self.ordered_output()
+        results = asyncio.Queue()
+        slots = threading.BoundedSemaphore(2 * concurrency)
+        stop = threading.Event()
+        tasks = set()
+
+        def done(task):
+            tasks.discard(task)
+            if not ordered:
+                results.put_nowait(task)
+
+        def submit(batch, source_info):
+            task = loop.create_task(self._async_task(process_batch, batch,
+                                                     source_info))
+            tasks.add(task)
+            task.add_done_callback(done)
+            if ordered:
+                results.put_nowait(task)
+
+        async def finish():
+            if tasks:
+                await asyncio.wait(list(tasks))
+            results.put_nowait(None)
+
+        def fail(err):
+            f = loop.create_future()
+            f.set_exception(err)
+            results.put_nowait(f)
+
+        reader = threading.Thread(target=self._async_reader,
+                                  args=(loop, submit, finish, fail, slots,
+                                        stop))
+        reader.daemon = True
+        reader.start()
+        try:
+            item = await results.get()
+            while item is not None:
+                self.write_result(*(await item))
+                slots.release()
+                item = await results.get()
+        finally:
+            stop.set()
+
+    def _async_reader(self, loop, submit, finish, fail, slots, stop):
+        """ Read input batches and pass them to the event loop.
+
+        Batches are passed to ``submit()``; when input is over,
+        ``finish()`` coroutine is scheduled. In case of failure, the
+        exception is passed to ``fail()``.
+        """
+        try:
+            for batch in self.input_batch(self.ARGS.batch_size):
+                slots.acquire()
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(submit, batch,
+                                          self.get_source_info())
+        except BaseException as err:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(fail, err)
+        else:
+            asyncio.run_coroutine_threadsafe(finish(), loop)
+
+    async def _async_task(self, process_batch, batch, source_info):
+        """ Process batch in a separate task.
+
+        :param batch: input items (as returned by ``input()``)
+        :type batch: list
+
+        :return: processing status, output messages, errors
+                 (``output_error()`` arguments), batch source info
+                 and number of input items in the batch
+        :rtype: tuple
+        """
+        self._local.buffer = []
+        self._local.errors = []
+        messages = [msg for msg in batch if msg]
+        ok = bool(messages) \
+            and await _result(process_batch(self, messages))
+        return (ok, self._local.buffer, self._local.errors, source_info,
+                len(batch))
+
+    @staticmethod
+    async def process(stage, input_message):
+        """ Transform input_message -> output_message.
+
+        To be implemented individually for every stage (as a coroutine
+        or regular function); see ``ProcessorStage.process()``.
+        """
+        raise NotImplementedError("Stage method process() is not implemented")
+
+    @staticmethod
+    async def process_batch(stage, messages):
+        """ Transform a batch of input messages -> output messages.
+
+        Default implementation processes all messages of the batch
+        concurrently (see ``process_each()``); see
+        ``ProcessorStage.process_batch()``.
+
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: True/False (success/failure)
+        :rtype: bool
+        """
+        return await stage.process_each(stage.process, messages)
+
+    async def process_each(self, process, messages):
+        """ Apply ``process`` to every message (concurrently).
+
+        Every message is processed in a separate task, but no more than
+        ``--concurrency`` messages at a time. Output of every message is
+        collected apart and, if processing succeeded, is passed to the
+        output in the input order; output of failed messages is dropped.
+
+        :param process: single message processing function
+                        (``process()`` or ``skip_process()``)
+        :type process: function
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: True
+        :rtype: bool
+        """
+        tasks = [asyncio.ensure_future(self._process_one(process, msg))
+                 for msg in messages]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        stage_metrics = self.get_metrics()
+        for ok, buf, errors in results:
+            for err in errors:
+                self.output_error(*err)
+            if ok:
+                self.output(buf)
+            elif stage_metrics:
+                stage_metrics.inc('messages_failed')
+        return True
+
+    async def _process_one(self, process, message):
+        """ Process single message, collecting its output and errors.
+
+        :return: processing status, output messages, errors
+        :rtype: tuple
+        """
+        self._local.buffer = []
+        self._local.errors = []
+        async with self.__semaphore:
+            ok = await _result(process(self, message))
+        return ok, self._local.buffer, self._local.errors
+
+    async def run_blocking(self, func, *args):
+        """ Call blocking function in a separate thread.
+
+        Allows to use synchronous clients (e.g. of remote services
+        without asyncio support) in ``process()`` without blocking
+        the event loop. Up to ``--concurrency`` functions are run
+        at the same time.
+
+        :param func: function to call
+        :type func: function
+
+        :return: function result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
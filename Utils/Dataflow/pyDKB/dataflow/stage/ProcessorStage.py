@@ -22,6 +22,75 @@ Definition of an abstract class for Dataflow Data Processing Stages.
 
          --hdfs                         - equivalent to "--source h --dest h"
 
+         --hdfs-stream                  - read HDFS files as streams
+                                          (without temporary local copies)
+
+         --prefetch         K           - number of input files to be
+                                          opened (downloaded) in advance
+
+         --framing          {delimiter|length}
+                                        - how messages and EOP markers are
+                                          delimited in (s)tream input and
+                                          output: with EOM/EOP symbols or
+                                          with length-prefixed frames
+
+         --input-type       {json|msgpack}
+         --output-type      {json|msgpack}
+                                        - encoding of input/output
+                                          messages (instead of the one
+                                          the stage declares)
+
+         --batch-size       N           - number of input messages to be
+                                          processed (and flushed to the
+                                          output) together
+
+         --workers          N           - number of threads processing
+                                          batches in parallel
+
+         --unordered                    - allow output order to differ
+                                          from the input one (for
+                                          --workers > 1 and (s)tream
+                                          output)
+
+         --output-buffer    N           - max number of output messages
+                                          to be buffered before flush
+
+         --output-buffer-size BYTES     - max size of buffered (encoded)
+                                          output messages
+
+         --compress         {gzip|zstd} - compress output files (for
+                                          local and HDFS destinations)
+
+         --metrics          FILE        - write runtime metrics (counters,
+                                          latency histograms) to FILE
+                                          (JSON or, for *.prom, Prometheus
+                                          text format)
+
+         --metrics-interval SEC         - interval between metrics updates
+
+         --cache            FILE        - cache results of lookups in
+                                          external services in FILE
+                                          (SQLite database)
+
+         --cache-ttl        SEC         - TTL of cached results
+
+         --cache-negative-ttl SEC       - TTL of cached negative results
+                                          ("not found")
+
+         --cache-size       N           - max number of cached results
+
+         --checkpoint       FILE        - journal of processed input
+                                          messages, to resume interrupted
+                                          (f)ile mode runs
+
+         --profile[=MODE]               - profile the run with (c)Profile
+                                          or (sampling) profiler
+
+         --profile-messages N           - stop profiling after N input
+                                          messages
+
+         --profile-dir      DIR         - directory for profile files
+
          -m, --mode         MODE        - MODE:
                                           (f)ile      = --source f
                                                         --dest f (can be
@@ -40,15 +109,29 @@ Definition of an abstract class for Dataflow Data Processing Stages.
 
 import os
 import sys
+import time
+import threading
+import queue
+from concurrent import futures
 
 from . import AbstractStage
 from . import messageType
 from pyDKB.common.types import logLevel
+from pyDKB.common.misc import lazy_import, ContextLocal
 from pyDKB.dataflow import DataflowException
+from pyDKB.common import CacheException
+from pyDKB.common import CompressionException
+from pyDKB.common import compression
 from pyDKB.common import hdfs
 from pyDKB.dataflow import communication
+from pyDKB.dataflow import metrics
+from pyDKB.dataflow import checkpoint
 from pyDKB.dataflow.communication import consumer
 from pyDKB.dataflow.communication import producer
+from pyDKB.dataflow.communication.stream import OutputStream
+
+# Needed only if lookup cache is used (--cache)
+cache = lazy_import('pyDKB.common.cache')
 
 
 class ProcessorStage(AbstractStage):
@@ -67,6 +150,25 @@ class ProcessorStage(AbstractStage):
 
     * List of objects to be "stopped"
         __stoppable
+
+    * Indicates if input messages are owned by ``process()``
+        __messages_owned
+
+    * Thread- (or asyncio task-) local storage (output buffer of a worker,
+      source info of the batch being written to the output)
+        _local
+
+    * Runtime metrics (if enabled)
+        __metrics
+
+    * Number of input messages processed under profiler
+        __profiled
+
+    * Lookup cache (if enabled)
+        __cache
+
+    * Checkpoint journal (if enabled)
+        __checkpoint
     """
 
     __input_message_type = None
@@ -75,6 +177,19 @@ class ProcessorStage(AbstractStage):
     __input = None
     _out_stream = None
 
+    __messages_owned = False
+
+    __metrics = None
+
+    __profiled = 0
+
+    __cache = None
+
+    __checkpoint = None
+
+    # Message types to be chosen with --input-type/--output-type
+    _message_types = ('json', 'msgpack')
+
     # Name of the option that switches stage into 'skip' mode
     _skip_option = '--skip'
 
@@ -92,6 +207,7 @@ class ProcessorStage(AbstractStage):
         * ...
         """
         self.__stoppable = []
+        self._local = ContextLocal()
         super(ProcessorStage, self).__init__(description)
 
     def set_input_message_type(self, Type=None):
@@ -116,6 +232,26 @@ class ProcessorStage(AbstractStage):
         """ Get output message class. """
         return communication.Message(self.__output_message_type)
 
+    def set_messages_owned(self, owned=True):
+        """ Turn on/off "messages are owned" mode.
+
+        In this mode input messages are handed to ``process()`` as owned
+        (see ``AbstractMessage`` in
+        :py:mod:`pyDKB.dataflow.communication.messages`):
+        ``message.content()`` returns decoded data without copying it.
+        It is safe as long as ``process()`` does not use the input message
+        after the content was modified (e.g. does not pass it to the output
+        as is).
+
+        :param owned: new mode value
+        :type owned: bool
+        """
+        self.__messages_owned = bool(owned)
+
+    def messages_owned(self):
+        """ Check if "messages are owned" mode is on. """
+        return self.__messages_owned
+
     def defaultArguments(self):
         """ Default parser configuration. """
         super(ProcessorStage, self).defaultArguments()
@@ -181,6 +317,180 @@ class ProcessorStage(AbstractStage):
                           default=False,
                           dest='hdfs'
                           )
+        self.add_argument('--hdfs-stream', action='store_true',
+                          help='read (h)dfs input files as streams, without '
+                          'making temporary local copies: processing starts '
+                          'as soon as first data are received. Read-ahead '
+                          'is limited to %d bytes per file'
+                          % hdfs.READAHEAD,
+                          default=False,
+                          dest='hdfs_stream'
+                          )
+        self.add_argument('--prefetch', action='store', type=int,
+                          help='number of (f)ile or (h)dfs input files to be '
+                          'opened (or downloaded) in background threads '
+                          'while the current one is processed.\n'
+                          'DEFAULT: %(default)s',
+                          default=0,
+                          metavar='K',
+                          dest='prefetch'
+                          )
+        self.add_argument('--framing', action='store', type=str,
+                          help='how items are delimited in (s)tream input '
+                          'and output:\n'
+                          '    delimiter -- messages end with EOM, '
+                          'EOP is a marker symbol;\n'
+                          '    length    -- every message and EOP is '
+                          'written as a frame with a binary header, '
+                          'containing its length (EOM and EOP values are '
+                          'ignored)',
+                          default='delimiter',
+                          choices=communication.stream.framing.MODES,
+                          dest='framing'
+                          )
+        self.add_argument('--input-type', action='store', type=str,
+                          help='type (encoding) of input messages, if it '
+                          'differs from the stage default one (messages '
+                          'must have compatible content, e.g. JSON and '
+                          'MessagePack ones). Binary types (msgpack) are '
+                          'always read with "length" framing',
+                          default=None,
+                          choices=self._message_types,
+                          dest='input_type'
+                          )
+        self.add_argument('--output-type', action='store', type=str,
+                          help='type (encoding) of output messages; see '
+                          '--input-type',
+                          default=None,
+                          choices=self._message_types,
+                          dest='output_type'
+                          )
+        self.add_argument('--batch-size', action='store', type=int,
+                          help='number of input messages to be passed to '
+                          'process_batch() at once. Output is flushed (and '
+                          'EOP marker is sent) once per batch; batch never '
+                          'spans over two input files.\n'
+                          'NOTE: EOP marker is sent once per batch, so values '
+                          'above 1 are not suitable for supervisors expecting '
+                          'one marker per message.\n'
+                          'DEFAULT: %(default)s',
+                          default=1,
+                          metavar='N',
+                          dest='batch_size'
+                          )
+        self.add_argument('--workers', action='store', type=int,
+                          help='number of worker threads to process input '
+                          'batches in parallel (useful for stages waiting '
+                          'for remote services). Output order matches the '
+                          'input one unless "--unordered" is specified.\n'
+                          'DEFAULT: %(default)s',
+                          default=1,
+                          metavar='N',
+                          dest='workers'
+                          )
+        self.add_argument('--unordered', action='store_true',
+                          help='write output of parallel workers in order of '
+                          'completion (not of input). Supported for (s)tream '
+                          'output only.',
+                          default=False,
+                          dest='unordered'
+                          )
+        self.add_argument('--output-buffer', action='store', type=int,
+                          help='max number of output messages to be kept in '
+                          'the buffer: when it is reached, output of the '
+                          'already processed messages of a batch is '
+                          'flushed before the batch is over (0 -- '
+                          'unlimited).\n'
+                          'NOTE: buffered messages are kept encoded.',
+                          default=OutputStream.max_buffered,
+                          metavar='N',
+                          dest='output_buffer'
+                          )
+        self.add_argument('--output-buffer-size', action='store', type=int,
+                          help='max total size (bytes, for ASCII data) of '
+                          'the output messages to be kept in the buffer '
+                          '(0 -- unlimited); see --output-buffer',
+                          default=OutputStream.max_buffered_size,
+                          metavar='BYTES',
+                          dest='output_buffer_size'
+                          )
+        self.add_argument('--compress', action='store', type=str,
+                          help='compress output files (for (f)ile and '
+                          '(h)dfs destinations) on the fly; file names get '
+                          'suffix \'.gz\' or \'.zst\' respectively. '
+                          'Compressed input files (\'*.gz\', \'*.zst\') '
+                          'are decompressed regardless of this option',
+                          default=None,
+                          choices=compression.METHODS,
+                          dest='compress'
+                          )
+        self.add_argument('--metrics', action='store', type=str,
+                          help='file to write runtime metrics to: numbers '
+                          'of input/output/failed/skipped messages and '
+                          'bytes, histograms of processing, input wait and '
+                          'output flush time. Written in JSON or (for '
+                          '\'*.prom\' files) in Prometheus text format '
+                          '(for node exporter textfile collector)',
+                          default=None,
+                          metavar='FILE',
+                          dest='metrics'
+                          )
+        self.add_argument('--metrics-interval', action='store', type=float,
+                          help='interval (in seconds) between metrics file '
+                          'updates; 0 means "write at exit only".\n'
+                          'DEFAULT: %(default)s',
+                          default=60,
+                          metavar='SEC',
+                          dest='metrics_interval'
+                          )
+        self.add_argument('--cache', action='store', type=str,
+                          help='SQLite database file to cache results of '
+                          'lookups in external services (for stages '
+                          'wrapping their requests with cached()). Can be '
+                          'shared by several stages. Can also be set via '
+                          'DKB_CACHE environment variable',
+                          default=os.environ.get('DKB_CACHE') or None,
+                          metavar='FILE',
+                          dest='cache'
+                          )
+        self.add_argument('--cache-ttl', action='store', type=float,
+                          help='time (in seconds) to keep cached results.\n'
+                          'DEFAULT: %(default)s',
+                          default=7 * 24 * 3600,
+                          metavar='SEC',
+                          dest='cache_ttl'
+                          )
+        self.add_argument('--cache-negative-ttl', action='store', type=float,
+                          help='time (in seconds) to keep cached negative '
+                          'results (like "dataset not found").\n'
+                          'DEFAULT: %(default)s',
+                          default=24 * 3600,
+                          metavar='SEC',
+                          dest='cache_negative_ttl'
+                          )
+        self.add_argument('--cache-size', action='store', type=int,
+                          help='max number of cached results; least '
+                          'recently used ones are removed when it is '
+                          'exceeded (0 -- unlimited).\n'
+                          'DEFAULT: %(default)s',
+                          default=100000,
+                          metavar='N',
+                          dest='cache_size'
+                          )
+        self.add_argument('--checkpoint', action='store', type=str,
+                          help='journal of processed input messages for '
+                          '(f)ile source and destination. If the stage is '
+                          'restarted after a failure with the same '
+                          'journal, processed input files are skipped, '
+                          'partially processed ones are read from the '
+                          'first message not processed yet, and their '
+                          'output files are written further. Output files '
+                          'are written as \'*.part\' and renamed when '
+                          'complete',
+                          default=None,
+                          metavar='FILE',
+                          dest='checkpoint'
+                          )
         self.add_argument(self._skip_option, action='store_true',
                           help='Skip process and push input message '
                           'forward as-is (marking it as "incomplete").',
@@ -202,6 +512,30 @@ class ProcessorStage(AbstractStage):
         if ignore_on_skip:
             self._reset_on_skip += list(kwargs.keys())
 
+    def parse_args(self, args):
+        """ Parse arguments and check Processor-specific values.
+
+        Exits with code 2 in case of invalid argument value.
+        """
+        super(ProcessorStage, self).parse_args(args)
+        for arg in ('batch_size', 'workers'):
+            value = getattr(self.ARGS, arg)
+            if value < 1:
+                self.args_error("argument --%s: positive value expected"
+                                " (got %d)" % (arg.replace('_', '-'), value))
+        for arg in ('prefetch', 'output_buffer', 'output_buffer_size',
+                    'metrics_interval', 'cache_ttl', 'cache_negative_ttl',
+                    'cache_size'):
+            value = getattr(self.ARGS, arg)
+            if value < 0:
+                self.args_error("argument --%s: non-negative value expected"
+                                " (got %s)" % (arg.replace('_', '-'), value))
+        if self.ARGS.compress:
+            try:
+                compression.check(self.ARGS.compress)
+            except CompressionException as err:
+                self.args_error("argument --compress: %s" % err)
+
     def configure(self, args=None):
         """ Configure stage according to the config parameters.
 
@@ -214,49 +548,191 @@ class ProcessorStage(AbstractStage):
         elif self.ARGS is None:
             # Need to initialize ARGS to proceed
             self.parse_args([])
+        self.__input_message_type = self.negotiate_message_type(
+            self.__input_message_type, self.ARGS.input_type, 'input-type')
+        self.__output_message_type = self.negotiate_message_type(
+            self.__output_message_type, self.ARGS.output_type, 'output-type')
         try:
+            if self.ARGS.checkpoint:
+                self.__checkpoint = \
+                    checkpoint.Checkpoint(self.ARGS.checkpoint)
             # Input
             self.__input = consumer.ConsumerBuilder(vars(self.ARGS)) \
                 .setType(self.__input_message_type) \
+                .setCheckpoint(self.__checkpoint) \
                 .build()
             self.__stoppable_append(self.__input, consumer.Consumer)
             # Output
             self.__output = producer.ProducerBuilder(vars(self.ARGS)) \
                 .setType(self.__output_message_type) \
                 .setSourceInfoMethod(self.get_source_info) \
+                .setCheckpoint(self.__checkpoint) \
                 .build()
             self.__stoppable_append(self.__output, producer.Producer)
-        except (consumer.ConsumerException, producer.ProducerException) as err:
+        except (consumer.ConsumerException, producer.ProducerException,
+                checkpoint.CheckpointException) as err:
             self.log(str(err), logLevel.ERROR)
             self.stop()
             sys.exit(1)
+        if self.ARGS.metrics:
+            self.init_metrics()
         self.log_configuration()
 
-    def get_source_info(self):
-        """ Get information about current source. """
+    def negotiate_message_type(self, Type, name, option):
+        """ Choose message type requested in the command line.
+
+        Requested type replaces the stage one if their messages have
+        compatible content (see ``AbstractMessage.convertible()``), so
+        that the stage code works with them just the same way.
+
+        Exits with code 2 in case of incompatible or unavailable type.
+
+        :param Type: message type set by the stage
+        :type Type: int
+        :param name: requested type name (None -- keep the stage one)
+        :type name: str
+        :param option: name of the command line option
+        :type option: str
+
+        :return: message type to be used
+        :rtype: int
+        """
+        if not name:
+            return Type
+        requested = messageType.member(name.upper())
+        cls = communication.Message(requested)
+        if Type and Type != requested \
+                and not cls.convertible(communication.Message(Type)):
+            self.args_error("argument --%s: %s messages can not replace"
+                            " %s ones" % (option, cls.typeName(),
+                                          messageType.memberName(Type)))
+        try:
+            cls.check()
+        except ImportError as err:
+            self.args_error("argument --%s: %s" % (option, err))
+        return requested
+
+    def commit(self, size):
+        """ Record input messages as processed in the checkpoint journal.
+
+        Called when output of the input batch is written (with the EOP
+        marker); the journal gets the batch size and output file size.
+
+        :param size: number of input messages in the batch
+        :type size: int
+        """
+        if not self.__checkpoint:
+            return
+        dest = self.__output.get_dest_info()
+        self.__checkpoint.commit(self.get_source_info()['full_path'], size,
+                                 dest['local_path'], dest['fd'].tell())
+
+    def init_metrics(self):
+        """ Start collecting runtime metrics. """
+        if self.__metrics:
+            self.__metrics.stop()
+        self.__metrics = metrics.StageMetrics(self.stage_name(),
+                                              self.ARGS.metrics,
+                                              self.ARGS.metrics_interval)
+        self.__metrics.add_collector(self._collect_metrics)
+
+    def get_metrics(self):
+        """ Get runtime metrics (``None`` if not collected).
+
+        :rtype: pyDKB.dataflow.metrics.StageMetrics, NoneType
+        """
+        return self.__metrics
+
+    def get_cache(self):
+        """ Get lookup cache (``None`` if not enabled with ``--cache``).
+
+        Cache database is opened on first call. If it can not be opened,
+        the stage proceeds without cache.
+
+        :rtype: pyDKB.common.cache.Cache, NoneType
+        """
+        if self.__cache is None and self.ARGS.cache:
+            try:
+                self.__cache = cache.Cache(self.ARGS.cache,
+                                           self.ARGS.cache_ttl,
+                                           self.ARGS.cache_negative_ttl,
+                                           self.ARGS.cache_size)
+            except CacheException as err:
+                self.log("%s; proceeding without cache." % err,
+                         logLevel.WARN)
+                self.ARGS.cache = None
+        return self.__cache
+
+    def cached(self, func, namespace=None, **kwargs):
+        """ Wrap function (request to external service) with the cache.
+
+        If the cache is not enabled (or the stage is run in "skip" mode,
+        where no lookups are expected), function is returned as is.
+        See ``pyDKB.common.cache.Cache.cached()`` for parameters.
+
+        :param func: function to wrap
+        :type func: function
+
+        :return: wrapped function
+        :rtype: function
+        """
+        if self.ARGS.skip_process:
+            return func
+        lookup_cache = self.get_cache()
+        if lookup_cache is None:
+            return func
+        return lookup_cache.cached(func, namespace, **kwargs)
+
+    def check_profiling(self, processed):
+        """ Stop profiler after ``--profile-messages`` input messages.
+
+        :param processed: number of input messages processed since
+                          the previous call
+        :type processed: int
+        """
+        if not self._profiler or not self.ARGS.profile_messages:
+            return
+        self.__profiled += processed
+        if self.__profiled >= self.ARGS.profile_messages:
+            self.stop_profiling()
+
+    def _collect_metrics(self, stage_metrics):
+        """ Update metrics not counted on the fly (amount of data). """
         if self.__input:
+            stage_metrics.set('bytes_in', self.__input.transferred())
+        if self.__output:
+            stage_metrics.set('bytes_out', self.__output.transferred())
+
+    def get_source_info(self):
+        """ Get information about current source.
+
+        When batches are processed in parallel, returns information about
+        the source of the batch being written to the output.
+        """
+        if hasattr(self._local, 'source_info'):
+            result = self._local.source_info
+        elif self.__input:
             result = self.__input.get_source_info()
         else:
             result = None
         return result
 
     def run(self):
-        """ Run process() for every input() message. """
+        """ Run process_batch() for every batch of input() messages.
+
+        By default batch consists of a single message and is processed with
+        process() (or skip_process() in "skip" mode).
+        """
+        process_batch = self.batch_processor()
         if self.ARGS.skip_process:
-            process = self.skip_process
             self.log("Starting stage execution (skip mode).")
         else:
-            process = self.process
             self.log("Starting stage execution.")
         exit_code = 0
         process_err = None
+        self.start_profiling()
         try:
-            for msg in self.input():
-                if msg and process(self, msg):
-                    self.flush_buffer()
-                else:
-                    self.clear_buffer()
-                self.forward()
+            self.run_batches(process_batch)
         except BaseException as err:
             # Catch everything for uniform exception handling
             # Clear buffer -- just in case someone will decide
@@ -267,6 +743,9 @@ class ProcessorStage(AbstractStage):
             else:
                 exit_code = 1
             self.set_error(*sys.exc_info())
+            if isinstance(self.__output, producer.FileProducer):
+                # Keep incomplete output files unfinalized
+                self.__output.interrupt()
             try:
                 self.clear_buffer()
             except DataflowException:
@@ -279,10 +758,247 @@ class ProcessorStage(AbstractStage):
             # NOTE: If something went wrong in `except` clause, we will still
             # get here and return, so the exceptions from there will never
             # reach the user
+            self.stop_profiling()
             if process_err and not isinstance(process_err, Exception):
                 sys.exit(exit_code)
             return exit_code
 
+    def run_batches(self, process_batch):
+        """ Run process_batch() for every batch of input messages.
+
+        Batches are processed one by one or (for ``--workers`` > 1)
+        in parallel (see ``run_parallel()``).
+
+        :param process_batch: batch processing function
+        :type process_batch: function
+        """
+        if self.ARGS.workers > 1:
+            self.run_parallel(process_batch)
+            return
+        for batch in self.input_batch(self.ARGS.batch_size):
+            messages = [msg for msg in batch if msg]
+            if messages and process_batch(self, messages):
+                self.flush_buffer()
+            else:
+                self.clear_buffer()
+            self.forward()
+            self.commit(len(batch))
+            self.check_profiling(len(batch))
+
+    def batch_processor(self):
+        """ Get function to process batches of messages.
+
+        :return: ``process_batch()`` or, in "skip" mode, function
+                 calling ``skip_process()`` for every message
+        :rtype: function
+        """
+        if self.ARGS.skip_process:
+            def process_batch(stage, messages):
+                return stage.process_each(stage.skip_process, messages)
+        else:
+            process_batch = self.process_batch
+        stage_metrics = self.__metrics
+        if stage_metrics:
+            process = process_batch
+            skip = self.ARGS.skip_process
+
+            def process_batch(stage, messages):
+                start = time.time()
+                ok = process(stage, messages)
+                stage_metrics.observe('process', time.time() - start)
+                if skip:
+                    stage_metrics.inc('messages_skipped', len(messages))
+                elif not ok:
+                    stage_metrics.inc('messages_failed', len(messages))
+                return ok
+        return process_batch
+
+    def process_messages(self, messages):
+        """ Process messages outside of the stage main loop.
+
+        Messages are processed just as in ``run()``, but the output
+        messages are returned instead of being written to the output
+        stream. It allows to run the stage as a part of another program
+        (see :py:mod:`pyDKB.dataflow.pipeline`).
+
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: processing status and output messages (if processing
+                 failed, output messages should be dropped)
+        :rtype: tuple(bool, list)
+        """
+        self._local.buffer = []
+        try:
+            ok = bool(messages) and self.batch_processor()(self, messages)
+            return ok, self._local.buffer
+        finally:
+            del self._local.buffer
+
+    def run_parallel(self, process_batch):
+        """ Run process_batch() for input batches in a pool of threads.
+
+        Input is read by a separate thread, so that results are written
+        to the output (and EOP markers are sent) as soon as they are ready,
+        even if the next input message is not available yet. Number of
+        batches being processed or waiting for output is limited to
+        twice the number of workers.
+
+        Output of every batch (and errors reported by ``output_error()``
+        during its processing) is written by the main thread, followed
+        by a single EOP marker. Exceptions raised in workers are re-raised
+        in the main thread.
+
+        :param process_batch: batch processing function
+        :type process_batch: function
+        """
+        ordered = self.ordered_output()
+        workers = self.ARGS.workers
+        results = queue.Queue()
+        slots = threading.BoundedSemaphore(2 * workers)
+        stop = threading.Event()
+        pool = futures.ThreadPoolExecutor(workers)
+        reader = threading.Thread(target=self._parallel_reader,
+                                  args=(pool, process_batch, results,
+                                        slots, stop, ordered))
+        reader.daemon = True
+        reader.start()
+        try:
+            item = results.get()
+            while item is not None:
+                self.write_result(*item.result())
+                slots.release()
+                item = results.get()
+        finally:
+            stop.set()
+            pool.shutdown(wait=False)
+
+    def ordered_output(self):
+        """ Check if output of parallel batches is to keep input order.
+
+        Unordered output (``--unordered``) is allowed for (s)tream
+        destination only.
+        """
+        if not self.ARGS.unordered:
+            return True
+        if not isinstance(self.__output, producer.StreamProducer):
+            self.log("Unordered output is supported for stream destination"
+                     " only; input order will be preserved.", logLevel.WARN)
+            return True
+        return False
+
+    def write_result(self, ok, buf, errors, source_info, size):
+        """ Write output of a batch processed apart from the main loop.
+
+        Errors reported during the batch processing are written first,
+        then (if processing succeeded) output messages, followed by
+        a single EOP marker.
+
+        :param ok: processing status
+        :type ok: bool
+        :param buf: output messages
+        :type buf: list
+        :param errors: ``output_error()`` arguments
+        :type errors: list(tuple)
+        :param source_info: source info of the batch
+        :type source_info: dict
+        :param size: number of input items (messages, including failed
+                     to be read) in the batch
+        :type size: int
+        """
+        self._local.source_info = source_info
+        try:
+            for err in errors:
+                self.output_error(*err)
+            if ok:
+                self.output(buf)
+                self.flush_buffer()
+            self.forward()
+            self.commit(size)
+            self.check_profiling(size)
+        finally:
+            del self._local.source_info
+
+    def _parallel_reader(self, pool, process_batch, results, slots, stop,
+                         ordered):
+        """ Read input batches and pass them to the pool of workers.
+
+        Puts futures for the batches to ``results`` queue -- in order of
+        submission or (if not ``ordered``) of completion; ``None`` means
+        that all batches are processed. In case of failure, a future with
+        the exception is put to the queue.
+        """
+        # Unordered output: number of batches being processed and
+        # "all batches are submitted" flag, to put ``None`` to the queue
+        # after the future of the last completed batch
+        lock = threading.Lock()
+        state = {'pending': 0, 'submitted': False}
+
+        def done(f):
+            results.put(f)
+            with lock:
+                state['pending'] -= 1
+                if state['submitted'] and not state['pending']:
+                    results.put(None)
+
+        try:
+            for batch in self.input_batch(self.ARGS.batch_size):
+                slots.acquire()
+                if stop.is_set():
+                    return
+                f = pool.submit(self._parallel_task, process_batch, batch,
+                                self.get_source_info())
+                if ordered:
+                    results.put(f)
+                else:
+                    with lock:
+                        state['pending'] += 1
+                    f.add_done_callback(done)
+        except BaseException as err:
+            f = futures.Future()
+            f.set_exception(err)
+            results.put(f)
+        else:
+            with lock:
+                state['submitted'] = True
+                if ordered or not state['pending']:
+                    results.put(None)
+
+    def _parallel_task(self, process_batch, batch, source_info):
+        """ Process batch in a worker thread.
+
+        :param batch: input items (as returned by ``input()``)
+        :type batch: list
+
+        :return: processing status, output messages, errors
+                 (``output_error()`` arguments), batch source info
+                 and number of input items in the batch
+        :rtype: tuple
+        """
+        self._local.buffer = []
+        self._local.errors = []
+        try:
+            messages = [msg for msg in batch if msg]
+            ok = bool(messages) and process_batch(self, messages)
+            return (ok, self._local.buffer, self._local.errors, source_info,
+                    len(batch))
+        finally:
+            del self._local.buffer
+            del self._local.errors
+
+    # Override
+    def output_error(self, message=None, exc_info=None):
+        """ Output traceback of the passed (or last) error with `message`.
+
+        In a worker thread errors are saved and written to the output
+        together with the output messages of the batch.
+        """
+        errors = getattr(self._local, 'errors', None)
+        if errors is None:
+            super(ProcessorStage, self).output_error(message, exc_info)
+        else:
+            errors.append((message, exc_info))
+
     # Override
     def stop(self):
         """ Finalize all the processes and prepare to exit. """
@@ -301,6 +1017,22 @@ class ProcessorStage(AbstractStage):
                 self.log("Failed to stop %s: %s" % (f[0], f[1][1]),
                          logLevel.ERROR)
                 self.output_error(exc_info=f[1])
+        if self.__metrics:
+            self.__metrics.stop()
+        if self.__cache:
+            stats = self.__cache.stats()
+            self.log("Lookup cache: %(hits)d hits, %(negative_hits)d"
+                     " negative hits, %(misses)d misses (hit ratio:"
+                     " %(hit_ratio).2f), %(evicted)d evicted, %(errors)d"
+                     " errors." % stats)
+            self.__cache.close()
+            self.__cache = None
+        if self.__checkpoint:
+            if not self._error:
+                # All input is processed and output files are finalized
+                self.__checkpoint.finish()
+            self.__checkpoint.close()
+            self.__checkpoint = None
 
     @staticmethod
     def process(stage, input_message):
@@ -316,6 +1048,55 @@ class ProcessorStage(AbstractStage):
         """
         raise NotImplementedError("Stage method process() is not implemented")
 
+    @staticmethod
+    def process_batch(stage, messages):
+        """ Transform a batch of input messages -> output messages.
+
+        May be implemented individually for stages which benefit from
+        handling messages together (e.g. grouping requests to external
+        services). Batch size is defined by command line parameter
+        `--batch-size`.
+
+        Default implementation calls ``process()`` for every message of the
+        batch (see ``process_each()``).
+
+        NOTE: if the method fails, output of the whole batch is dropped.
+
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: True/False (success/failure)
+        :rtype: bool
+        """
+        return stage.process_each(stage.process, messages)
+
+    def process_each(self, process, messages):
+        """ Apply ``process`` to every message one by one.
+
+        If processing of a message fails, only output produced
+        for this message is dropped. Output of successfully processed
+        messages is flushed as soon as the output buffer is full
+        (see ``--output-buffer``), not to let it grow with the batch.
+
+        :param process: single message processing function
+                        (``process()`` or ``skip_process()``)
+        :type process: function
+        :param messages: messages to process
+        :type messages: list(pyDKB.messages.AbstractMessage)
+
+        :return: True
+        :rtype: bool
+        """
+        for msg in messages:
+            mark = self.buffered()
+            if not process(self, msg):
+                self.clear_buffer(mark)
+                if self.__metrics:
+                    self.__metrics.inc('messages_failed')
+            elif self.output_full():
+                self.flush_buffer()
+        return True
+
     @staticmethod
     def skip_process(stage, input_message):
         """ Process input_message in "skip" processing mode.
@@ -342,7 +1123,8 @@ class ProcessorStage(AbstractStage):
         :return: True/False (success/failure)
         :rtype: bool
         """
-        out_msg = stage.output_message_class()(input_message.content())
+        out_msg = stage.output_message_class()(input_message.take(),
+                                               owned=True)
         out_msg.incomplete(True)
         stage.output(out_msg)
         return True
@@ -353,12 +1135,57 @@ class ProcessorStage(AbstractStage):
         Returns iterable object.
         Every iteration returns single input message to be processed.
         """
-        for r in self.__input:
+        stage_metrics = self.__metrics
+        if not stage_metrics:
+            for r in self.__input:
+                if r and self.__messages_owned:
+                    r.owned = True
+                yield r
+            return
+        source = iter(self.__input)
+        while True:
+            start = time.time()
+            r = next(source, None)
+            if r is None:
+                break
+            stage_metrics.observe('input_wait', time.time() - start)
+            stage_metrics.inc('messages_in' if r else 'messages_failed')
+            if r and self.__messages_owned:
+                r.owned = True
             yield r
 
+    def input_batch(self, size=1):
+        """ Generator for batches of input messages.
+
+        Batch is closed when it reaches ``size`` messages or when current
+        input source is over (so that all messages of a batch come from
+        the same source).
+
+        :param size: max number of messages in a batch
+        :type size: int
+
+        :returns: iterable object; every iteration returns list of
+                  input items (as returned by ``input()``)
+        :rtype: generator
+        """
+        batch = []
+        for r in self.input():
+            batch.append(r)
+            if len(batch) >= size or not self.__input.source_is_readable():
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def output(self, message):
         """ Put the (list of) message(s) to the output buffer. """
-        self.__output.write(message)
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            self.__output.write(message)
+        elif isinstance(message, list):
+            buf.extend(message)
+        else:
+            buf.append(message)
 
     def forward(self):
         """ Send EOPMarker to the output stream. """
@@ -366,11 +1193,44 @@ class ProcessorStage(AbstractStage):
 
     def flush_buffer(self):
         """ Flush message buffer to the output. """
+        stage_metrics = self.__metrics
+        if not stage_metrics:
+            self.__output.flush()
+            return
+        n = self.__output.buffered()
+        start = time.time()
         self.__output.flush()
+        stage_metrics.observe('output_flush', time.time() - start)
+        stage_metrics.inc('messages_out', n)
+
+    def buffered(self):
+        """ Return number of buffered output messages. """
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            return self.__output.buffered()
+        return len(buf)
+
+    def output_full(self):
+        """ Check if the output buffer is to be flushed.
 
-    def clear_buffer(self):
-        """ Drop buffered output messages. """
-        self.__output.drop()
+        Output of a worker thread (or of ``process_messages()``) is
+        collected without limits and is never reported as full.
+        """
+        if getattr(self._local, 'buffer', None) is not None:
+            return False
+        return self.__output.full()
+
+    def clear_buffer(self, since=0):
+        """ Drop buffered output messages.
+
+        :param since: number of (first) buffered messages to keep
+        :type since: int
+        """
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None:
+            self.__output.drop(since)
+        else:
+            del buf[since:]
 
     def __stoppable_append(self, obj, cls):
         """ Appends OBJ (of type CLS) to the list of STOPPABLE. """
@@ -2,8 +2,16 @@
 Stage submodule init file.
 """
 
+import sys
+
 from .. import messageType
 from .AbstractStage import AbstractStage
 from .ProcessorStage import ProcessorStage
 
 __all__ = ['ProcessorStage']
+
+# Asynchronous stages require Python 3.7+ ('async def' syntax is not
+# supported by earlier versions at all)
+if sys.version_info >= (3, 7):
+    from .AsyncProcessorStage import AsyncProcessorStage
+    __all__.append('AsyncProcessorStage')
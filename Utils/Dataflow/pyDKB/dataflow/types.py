@@ -7,5 +7,5 @@ from ..common import Type
 __all__ = ["dataType", "messageType", "codeType"]
 
 dataType = Type("DOCUMENT", "AUTHOR", "DATASET")
-messageType = Type("STRING", "JSON", "TTL")
-codeType = Type("STRING")
+messageType = Type("STRING", "JSON", "TTL", "MSGPACK")
+codeType = Type("STRING", "BINARY")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Benchmark for AsyncProcessorStage.
+
+Measure throughput (messages per second) of a stage making an HTTP request
+per input message to a local fake service (responding with a fixed delay,
+imitating a remote one, like ES, Rucio or AMI), implemented as:
+* ProcessorStage (blocking requests), one worker;
+* ProcessorStage with N worker threads (`--workers N`);
+* AsyncProcessorStage with N messages processed concurrently
+  (`--concurrency N`).
+
+Usage:
+  async_stage.py [-n MESSAGES] [-d DELAY] [-c N]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import http.client
+import http.server
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow.stage import ProcessorStage, AsyncProcessorStage
+    from pyDKB.dataflow import messageType
+    from pyDKB.dataflow.communication.messages import JSONMessage
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+class FakeService(http.server.BaseHTTPRequestHandler):
+    """ Respond to GET /<taskid> with JSON after a delay. """
+
+    protocol_version = 'HTTP/1.0'
+    delay = 0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps({'taskid': self.path.strip('/'),
+                           'status': 'done'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServer(http.server.ThreadingHTTPServer):
+    """ Server for concurrent requests. """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def start_service(delay):
+    """ Start fake service in a background thread.
+
+    :return: server
+    :rtype: http.server.ThreadingHTTPServer
+    """
+    FakeService.delay = delay
+    server = FakeServer(('127.0.0.1', 0), FakeService)
+    t = threading.Thread(target=server.serve_forever)
+    t.daemon = True
+    t.start()
+    return server
+
+
+def sync_process(stage, message):
+    """ Get task info from the service (blocking request). """
+    data = message.content()
+    conn = http.client.HTTPConnection(*stage.service)
+    try:
+        conn.request('GET', '/%s' % data['taskid'])
+        data.update(json.loads(conn.getresponse().read()))
+    finally:
+        conn.close()
+    stage.output(JSONMessage(data))
+    return True
+
+
+async def async_process(stage, message):
+    """ Get task info from the service (asynchronous request). """
+    data = message.content()
+    reader, writer = await asyncio.open_connection(*stage.service)
+    try:
+        writer.write(('GET /%s HTTP/1.0\r\nHost: %s\r\n\r\n'
+                      % (data['taskid'], stage.service[0])).encode())
+        response = await reader.read()
+    finally:
+        writer.close()
+    data.update(json.loads(response.split(b'\r\n\r\n', 1)[1]))
+    stage.output(JSONMessage(data))
+    return True
+
+
+def measure(workdir, input_file, service, stage, args):
+    """ Run stage over the input file and return messages per second. """
+    output_dir = os.path.join(workdir, 'out%d' % len(os.listdir(workdir)))
+    stage.set_input_message_type(messageType.JSON)
+    stage.set_output_message_type(messageType.JSON)
+    stage.service = service
+    stage.configure(['-o', output_dir] + args + [input_file])
+    start = time.time()
+    stage.run()
+    stage.stop()
+    duration = time.time() - start
+    with open(os.path.join(output_dir, 'input.json')) as f:
+        n = sum(1 for line in f if '"done"' in line)
+    return n / duration
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--messages', type=int, default=200,
+                        help='number of messages (default: %(default)s)')
+    parser.add_argument('-d', '--delay', type=float, default=0.02,
+                        help='service response time'
+                             ' (seconds, default: %(default)s)')
+    parser.add_argument('-c', '--concurrency', type=int, default=16,
+                        help='number of workers / concurrent requests'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    server = start_service(args.delay)
+    workdir = tempfile.mkdtemp()
+    try:
+        input_file = os.path.join(workdir, 'input.json')
+        with open(input_file, 'w') as f:
+            for i in range(args.messages):
+                f.write('{"taskid": %d}\n' % i)
+        n = str(args.concurrency)
+        scenarios = [('sync, 1 worker', ProcessorStage, sync_process, []),
+                     ('sync, %s workers' % n, ProcessorStage, sync_process,
+                      ['--workers', n]),
+                     ('async, concurrency %s' % n, AsyncProcessorStage,
+                      async_process, ['--concurrency', n])]
+        results = []
+        for name, cls, process, stage_args in scenarios:
+            stage = cls()
+            stage.process = process
+            results.append((name, measure(workdir, input_file,
+                                          server.server_address, stage,
+                                          stage_args)))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir)
+    print("Messages: %d, service delay: %s s"
+          % (args.messages, args.delay))
+    for name, result in results:
+        print("%-24s %10.1f msg/s %8.2fx"
+              % (name, result, result / results[0][1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Benchmark for pyDKB lookup cache.
+
+Imitate consecutive runs of a stage over overlapping intervals: every run
+looks up N keys in a fake external service (responding with a fixed
+delay), half of them -- the same as in the previous run; some keys are
+"not found" (negative results). Report run time and hit ratio with and
+without the cache, and the cache overhead per lookup.
+
+Usage:
+  cache.py [-n KEYS] [-r RUNS] [-d DELAY]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.common.cache import Cache
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def make_lookup(delay):
+    """ Construct fake lookup function with given response time. """
+    def get_metadata(dataset):
+        time.sleep(delay)
+        n = int(dataset.rsplit('.', 1)[1])
+        if n % 10 == 0:
+            return None
+        return {'bytes': n * 1024, 'events': n * 10, 'deleted': False}
+    return get_metadata
+
+
+def run(lookup, keys):
+    """ Look up all keys and return duration. """
+    start = time.time()
+    for key in keys:
+        lookup(key)
+    return time.time() - start
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--keys', type=int, default=500,
+                        help='keys per run (default: %(default)s)')
+    parser.add_argument('-r', '--runs', type=int, default=4,
+                        help='number of runs (default: %(default)s)')
+    parser.add_argument('-d', '--delay', type=float, default=0.002,
+                        help='lookup response time'
+                             ' (seconds, default: %(default)s)')
+    args = parser.parse_args(args)
+    workdir = tempfile.mkdtemp()
+    try:
+        step = args.keys // 2
+        runs = [['mc16_13TeV.AOD.%d' % i
+                 for i in range(r * step, r * step + args.keys)]
+                for r in range(args.runs)]
+        lookup = make_lookup(args.delay)
+        print("Keys per run: %d (overlap: %d), lookup delay: %s s"
+              % (args.keys, args.keys - step, args.delay))
+        print("%-5s %12s %12s %10s" % ('run', 'no cache', 'cache',
+                                       'hit ratio'))
+        fname = os.path.join(workdir, 'lookups.db')
+        for i, keys in enumerate(runs):
+            plain = run(lookup, keys)
+            cache = Cache(fname)
+            cached = run(cache.cached(lookup, 'benchmark'), keys)
+            stats = cache.stats()
+            cache.close()
+            print("%-5d %10.3f s %10.3f s %10.2f"
+                  % (i + 1, plain, cached, stats['hit_ratio']))
+        cache = Cache(fname)
+        keys = runs[-1]
+        duration = run(cache.cached(lookup, 'benchmark'), keys)
+        cache.close()
+        print("Lookup time (all hits): %.1f us"
+              % (duration / len(keys) * 1e6))
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
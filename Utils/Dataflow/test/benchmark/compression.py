@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Benchmark for compressed input and output files.
+
+Generate a dataset of NDJSON files with task-like documents (imitating
+a backfill dump), store it plain, gzip- and (if `zstandard` is installed)
+zstd-compressed, and run a pass-through stage over every variant (writing
+output compressed the same way, `--compress`). Report wall time, size of
+the data on disk (input and output) and the amount of data read/written
+by the stage process (from /proc/self/io, if available).
+
+Usage:
+  compression.py [-f FILES] [-n MESSAGES]
+"""
+
+import os
+import sys
+import time
+import json
+import shutil
+import random
+import argparse
+import tempfile
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow.stage import ProcessorStage
+    from pyDKB.dataflow import messageType
+    from pyDKB.dataflow.communication.messages import JSONMessage
+    from pyDKB.common import compression
+    from pyDKB.common import CompressionException
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def task(i, rnd):
+    """ Construct task-like document. """
+    project = rnd.choice(('mc16_13TeV', 'data18_13TeV', 'mc20_13TeV'))
+    dsid = rnd.randint(300000, 399999)
+    return {'taskid': 10000000 + i,
+            'taskname': '%s.%d.PhPy8EG_A14_ttbar_hdamp258p75.merge.AOD'
+                        '.e6337_s3126_r10201' % (project, dsid),
+            'project': project,
+            'status': rnd.choice(('done', 'finished', 'failed', 'aborted')),
+            'phys_group': rnd.choice(('SOFT', 'HIGG', 'TOPQ', 'SUSY')),
+            'start_time': '2020-%02d-%02d %02d:%02d:%02d'
+                          % (rnd.randint(1, 12), rnd.randint(1, 28),
+                             rnd.randint(0, 23), rnd.randint(0, 59),
+                             rnd.randint(0, 59)),
+            'input_events': rnd.randint(0, 10 ** 7),
+            'output_formats': ['AOD', 'DAOD_TOPQ1', 'NTUP_PILEUP'],
+            'hashtag_list': ['MC16a', 'ttbar', 'r10201'],
+            'description': 'Reprocessing of %s sample %d' % (project, dsid)}
+
+
+def generate(dirname, files, messages):
+    """ Write plain NDJSON files.
+
+    :return: total size (bytes)
+    :rtype: int
+    """
+    rnd = random.Random(1)
+    os.makedirs(dirname)
+    for f in range(files):
+        with open(os.path.join(dirname, 'tasks%03d.json' % f), 'w') as out:
+            for i in range(messages):
+                out.write(json.dumps(task(f * messages + i, rnd)) + '\n')
+    return dir_size(dirname)
+
+
+def compress(src, dest, method):
+    """ Store all files from src dir compressed to dest dir. """
+    os.makedirs(dest)
+    for name in os.listdir(src):
+        fname = os.path.join(dest, name + compression.suffix(method))
+        with open(os.path.join(src, name)) as f_in, \
+                compression.open_file(fname, 'w', method) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+
+def dir_size(dirname):
+    """ Return total size of files in the directory. """
+    return sum(os.path.getsize(os.path.join(dirname, f))
+               for f in os.listdir(dirname))
+
+
+def io_counters():
+    """ Return bytes read and written by the process (rchar, wchar). """
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+
+def process(stage, message):
+    """ Pass message through. """
+    stage.output(JSONMessage(message.content()))
+    return True
+
+
+def measure(input_dir, output_dir, method):
+    """ Run stage over the input files.
+
+    :return: duration, (read, written) bytes or None
+    :rtype: tuple
+    """
+    stage = ProcessorStage()
+    stage.set_input_message_type(messageType.JSON)
+    stage.set_output_message_type(messageType.JSON)
+    stage.process = process
+    args = ['-i', input_dir, '-o', output_dir]
+    if method:
+        args += ['--compress', method]
+    stage.configure(args)
+    io_start = io_counters()
+    start = time.time()
+    stage.run()
+    stage.stop()
+    duration = time.time() - start
+    io_end = io_counters()
+    io = None
+    if io_start and io_end:
+        io = (io_end[0] - io_start[0], io_end[1] - io_start[1])
+    return duration, io
+
+
+def mb(n):
+    """ Format number of bytes as MB. """
+    return '%8.1f MB' % (n / 1024. / 1024)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-f', '--files', type=int, default=4,
+                        help='number of files (default: %(default)s)')
+    parser.add_argument('-n', '--messages', type=int, default=25000,
+                        help='messages per file (default: %(default)s)')
+    args = parser.parse_args(args)
+    methods = [None]
+    for method in compression.METHODS:
+        try:
+            compression.check(method)
+            methods.append(method)
+        except CompressionException as err:
+            print("Skipping %s: %s" % (method, err))
+    workdir = tempfile.mkdtemp()
+    try:
+        plain = os.path.join(workdir, 'plain')
+        size = generate(plain, args.files, args.messages)
+        print("Files: %d, messages: %d, data size: %s"
+              % (args.files, args.files * args.messages, mb(size).strip()))
+        print("%-6s %10s %11s %11s %11s %11s"
+              % ('method', 'time', 'input', 'output', 'read', 'written'))
+        for method in methods:
+            input_dir = plain
+            if method:
+                input_dir = os.path.join(workdir, method)
+                compress(plain, input_dir, method)
+            output_dir = os.path.join(workdir, 'out-%s' % method)
+            duration, io = measure(input_dir, output_dir, method)
+            io = io or (0, 0)
+            print("%-6s %8.2f s %s %s %s %s"
+                  % (method or 'plain', duration, mb(dir_size(input_dir)),
+                     mb(dir_size(output_dir)), mb(io[0]), mb(io[1])))
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+"""
+Benchmark for pyDKB.common.hdfs backends.
+
+Upload and download N small files with the ``cli`` backend (one ``hadoop``
+process per file and one per batch) and with the ``webhdfs`` backend
+(pooled keep-alive connections, parallel transfers); check that the
+downloaded files are the same as uploaded ones.
+
+No Hadoop installation is required: ``cli`` backend runs the fake
+``hadoop`` command from the pyDKB tests (HDFS paths are local ones),
+with a delay imitating JVM startup; ``webhdfs`` backend talks to a local
+stand-in WebHDFS server (NameNode and DataNode in one), working with
+a temporary directory.
+
+Usage:
+  hdfs.py [-n FILES] [-s SIZE] [-d DELAY] [-p POOL_SIZE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import (ThreadingHTTPServer, BaseHTTPRequestHandler)
+from urllib.parse import (urlsplit, parse_qs, unquote)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+FAKE_HADOOP_DIR = os.path.join(dkb_dir, 'test', 'pyDKB', 'bin')
+
+try:
+    from pyDKB.common import hdfs
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+class WebHDFSHandler(BaseHTTPRequestHandler):
+    """ Stand-in WebHDFS server: HDFS paths are mapped to ``server.root``.
+
+    Supported operations: MKDIRS, CREATE, OPEN, LISTSTATUS, GETFILESTATUS.
+    CREATE and OPEN are redirected (to the same server), as NameNode does.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, data=b'', ctype='application/json', headers={}):
+        self.send_response(code)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, code, exception, message):
+        self.reply(code, json.dumps({'RemoteException': {
+            'exception': exception, 'message': message}}).encode())
+
+    def parse(self):
+        url = urlsplit(self.path)
+        fname = unquote(url.path)[len(hdfs.WebHDFSBackend.PREFIX):]
+        local = os.path.join(self.server.root, fname.lstrip('/'))
+        params = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        return fname, local, params
+
+    def redirect(self, params):
+        if params.get('datanode'):
+            return False
+        self.reply(307, headers={'Location': 'http://%s:%d%s&datanode=true'
+                                 % (self.server.server_address
+                                    + (self.path,))})
+        return True
+
+    def do_PUT(self):
+        fname, local, params = self.parse()
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length)
+        if params['op'] == 'MKDIRS':
+            os.makedirs(local, exist_ok=True)
+            self.reply(200, b'{"boolean": true}')
+        elif params['op'] == 'CREATE':
+            if self.redirect(params):
+                return
+            if os.path.exists(local):
+                return self.error(403, 'FileAlreadyExistsException',
+                                  '%s already exists' % fname)
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            with open(local, 'wb') as f:
+                f.write(data)
+            self.reply(201)
+        else:
+            self.error(400, 'IllegalArgumentException', 'Invalid value for'
+                       ' webhdfs parameter "op": %s' % params['op'])
+
+    def do_GET(self):
+        fname, local, params = self.parse()
+        if not os.path.exists(local):
+            return self.error(404, 'FileNotFoundException',
+                              'File does not exist: %s' % fname)
+        if params['op'] == 'OPEN':
+            if self.redirect(params):
+                return
+            with open(local, 'rb') as f:
+                self.reply(200, f.read(), 'application/octet-stream')
+        elif params['op'] in ('LISTSTATUS', 'GETFILESTATUS'):
+            names = sorted(os.listdir(local)) \
+                if params['op'] == 'LISTSTATUS' else ['']
+            statuses = [{'pathSuffix': name,
+                         'type': 'DIRECTORY'
+                         if os.path.isdir(os.path.join(local, name))
+                         else 'FILE'} for name in names]
+            if params['op'] == 'LISTSTATUS':
+                result = {'FileStatuses': {'FileStatus': statuses}}
+            else:
+                result = {'FileStatus': statuses[0]}
+            self.reply(200, json.dumps(result).encode())
+        else:
+            self.error(400, 'IllegalArgumentException', 'Invalid value for'
+                       ' webhdfs parameter "op": %s' % params['op'])
+
+
+def start_server(root):
+    """ Start stand-in WebHDFS server in a background thread. """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebHDFSHandler)
+    server.daemon_threads = True
+    server.root = root
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def per_file(fnames, hdfs_dir, local_dir):
+    """ Upload and download files one by one. """
+    for fname in fnames:
+        hdfs.putfile(fname, hdfs.join(hdfs_dir, os.path.basename(fname)))
+    for fname in fnames:
+        name = hdfs.join(hdfs_dir, os.path.basename(fname))
+        hdfs.getfiles([name], local_dir)
+
+
+def batched(fnames, hdfs_dir, local_dir):
+    """ Upload and download files with a single operation each. """
+    hdfs.putfiles(fnames, hdfs_dir)
+    hdfs.getfiles([hdfs.join(hdfs_dir, os.path.basename(f))
+                   for f in fnames], local_dir)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--files', type=int, default=50,
+                        help='number of files (default: %(default)s)')
+    parser.add_argument('-s', '--size', type=int, default=4096,
+                        help='file size in bytes (default: %(default)s)')
+    parser.add_argument('-d', '--delay', type=float, default=0.5,
+                        help='delay of every "hadoop" command run, imitating'
+                             ' JVM startup (default: %(default)s s)')
+    parser.add_argument('-p', '--pool-size', type=int,
+                        default=hdfs.WebHDFSBackend.POOL_SIZE,
+                        help='WebHDFS connection pool size'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    os.environ['PATH'] = FAKE_HADOOP_DIR + os.pathsep + os.environ['PATH']
+    os.environ['HADOOP_FAKE_DELAY'] = str(args.delay)
+    workdir = tempfile.mkdtemp()
+    hdfs_root = os.path.join(workdir, 'hdfs')
+    server = start_server(hdfs_root)
+    try:
+        src_dir = os.path.join(workdir, 'src')
+        os.makedirs(src_dir)
+        fnames = []
+        for i in range(args.files):
+            fname = os.path.join(src_dir, 'file%04d.json' % i)
+            with open(fname, 'wb') as f:
+                f.write(os.urandom(args.size // 2).hex().encode())
+            fnames.append(fname)
+        url = 'http://%s:%d' % server.server_address
+        runs = [('cli', 'per-file', {}, per_file),
+                ('cli', 'batched', {}, batched),
+                ('webhdfs', 'per-file', {'url': url, 'pool_size': 1},
+                 per_file),
+                ('webhdfs', 'batched', {'url': url,
+                                        'pool_size': args.pool_size},
+                 batched)]
+        results = []
+        for i, (backend, mode, params, run) in enumerate(runs):
+            hdfs.set_backend(backend, **params)
+            if backend == 'cli':
+                hdfs_dir = os.path.join(hdfs_root, 'run%d' % i)
+            else:
+                hdfs_dir = '/run%d' % i
+            local_dir = os.path.join(workdir, 'local%d' % i)
+            os.makedirs(local_dir)
+            start = time.time()
+            hdfs.makedirs(hdfs_dir)
+            run(fnames, hdfs_dir, local_dir)
+            duration = time.time() - start
+            for fname in fnames:
+                with open(fname, 'rb') as orig, \
+                        open(os.path.join(local_dir,
+                                          os.path.basename(fname)),
+                             'rb') as copy:
+                    if orig.read() != copy.read():
+                        sys.stderr.write("(ERROR) %s %s: file differs: %s\n"
+                                         % (backend, mode, fname))
+                        return 1
+            results.append((backend, mode, duration))
+    finally:
+        hdfs.set_backend()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir)
+    print("Files: %d x %d bytes (put + get), hadoop delay: %.2f s"
+          % (args.files, args.size, args.delay))
+    for backend, mode, duration in results:
+        print("%-8s %-9s %8.3f s %10.1f files/s %8.2fx"
+              % (backend, mode, duration, 2 * args.files / duration,
+                 results[0][2] / duration))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
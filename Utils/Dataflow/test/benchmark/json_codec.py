@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark for pyDKB.common.json_codec.
+
+Measure decoding time per message with every available JSON codec
+backend (and, for comparison, encoding time with standard ``json``);
+check that decoded data are the same as with standard ``json``.
+
+Usage:
+  json_codec.py [-r ROUNDS] [FILE ...]
+
+By default samples of the data loaded to ES (output of `data4es` stage 019)
+are used.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.common import json_codec
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+DEFAULT_SAMPLES = os.path.join(dkb_dir, 'data4es', '019_esFormat',
+                               'output', 'sample20*.ndjson')
+
+
+def load(files):
+    """ Read non-empty lines from given NDJSON files. """
+    lines = []
+    for fname in files:
+        with open(fname) as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    return lines
+
+
+def measure(func, items, rounds):
+    """ Return CPU time per item (in microseconds). """
+    start = time.process_time()
+    for i in range(rounds):
+        for item in items:
+            func(item)
+    return (time.process_time() - start) * 1e6 / (rounds * len(items))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('files', metavar='FILE', nargs='*',
+                        help='NDJSON file(s) with input messages'
+                             ' (default: %s)' % DEFAULT_SAMPLES)
+    parser.add_argument('-r', '--rounds', type=int, default=10,
+                        help='number of passes over input data'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    files = args.files or sorted(glob.glob(DEFAULT_SAMPLES))
+    lines = load(files)
+    if not lines:
+        sys.stderr.write("(ERROR) No input messages found.\n")
+        return 1
+    size = sum(len(line) for line in lines)
+    print("Messages: %d (avg. size: %d bytes), rounds: %d"
+          % (len(lines), size // len(lines), args.rounds))
+    decoded = [json.loads(line) for line in lines]
+    print("%-10s %12s" % ('backend', 'loads'))
+    for name in json_codec.BACKENDS:
+        try:
+            json_codec.set_backend(name)
+        except ImportError:
+            print("%-10s %12s" % (name, 'n/a'))
+            continue
+        if [json_codec.loads(line) for line in lines] != decoded:
+            sys.stderr.write("(ERROR) %s: decoded data differ.\n" % name)
+            return 1
+        print("%-10s %9.1f us"
+              % (name, measure(json_codec.loads, lines, args.rounds)))
+    print("%-10s %9.1f us"
+          % ('json.dumps', measure(json.dumps, decoded, args.rounds)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for pyDKB.common.misc.log.
+
+Measure time per log record for the previous implementation (module name
+taken from ``inspect.stack()``) and for the current one: with module name
+prefix, with explicit prefix (as ``LoggableObject.log()`` does), with
+buffered output and for a flood of repeated warnings (suppressed by the
+rate limit). Records are written to /dev/null.
+
+Usage:
+  log.py [-n RECORDS] [-d DEPTH]
+"""
+
+import os
+import sys
+import time
+import inspect
+import argparse
+from datetime import datetime
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.common import misc
+    from pyDKB.common import LoggableObject
+    from pyDKB.common.types import logLevel
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def legacy_log(message, level=logLevel.INFO, *args):
+    """ Previous implementation of ``log()``. """
+    if not isinstance(message, list):
+        message = [message]
+    lines = []
+    for m in message:
+        lines += [line for line in str(m).splitlines() if line.strip()]
+    if args:
+        prefix = ' ' + ' '.join(['(%s)' % p for p in args])
+    else:
+        frm = inspect.stack()[1]
+        mod = inspect.getmodule(frm[0])
+        modname = getattr(mod, '__name__', 'main')
+        prefix = ' (%s)' % modname
+    if lines:
+        dtime = datetime.now().strftime(misc.DTFORMAT)
+        out_message = "%s (%s)%s %s" % (dtime, logLevel.memberName(level),
+                                        prefix, lines[0])
+        for line in lines[1:]:
+            out_message += "\n(==) %s" % line
+        out_message += "\n"
+        sys.stderr.write(out_message)
+
+
+class Stage(LoggableObject):
+    """ Object logging with class name prefix. """
+    pass
+
+
+def nested(depth, func):
+    """ Call function with given number of extra frames on the stack. """
+    if depth:
+        return nested(depth - 1, func)
+    return func()
+
+
+def measure(n, depth, func):
+    """ Call ``func(i)`` N times at given stack depth; return duration. """
+    def run():
+        start = time.time()
+        for i in range(n):
+            func(i)
+        return time.time() - start
+    return nested(depth, run)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--records', type=int, default=2000,
+                        help='number of records (default: %(default)s)')
+    parser.add_argument('-d', '--depth', type=int, default=20,
+                        help='stack depth of the calls (default:'
+                             ' %(default)s)')
+    args = parser.parse_args(args)
+    msg = "Dataset not found: mc16_13TeV.%08d.AOD"
+    tests = [
+        ('legacy', None,
+         lambda i: legacy_log(msg % i, logLevel.INFO)),
+        ('legacy prefix', None,
+         lambda i: legacy_log(msg % i, logLevel.INFO, 'Stage')),
+        ('module', None,
+         lambda i: misc.log(msg % i, logLevel.INFO)),
+        ('prefix', None,
+         lambda i: Stage.log(msg % i, logLevel.INFO)),
+        ('buffered', 65536,
+         lambda i: Stage.log(msg % i, logLevel.INFO)),
+        ('legacy flood', None,
+         lambda i: legacy_log(msg % i, logLevel.WARN, 'Stage')),
+        ('flood', None,
+         lambda i: Stage.log(msg % i, logLevel.WARN)),
+    ]
+    stderr = sys.stderr
+    results = []
+    with open(os.devnull, 'w') as devnull:
+        sys.stderr = devnull
+        # Rate limit (off by default) applies to the warnings only
+        misc.set_log_rate()
+        try:
+            for name, buf, func in tests:
+                misc.set_log_buffer(buf or 0)
+                results.append((name, measure(args.records, args.depth,
+                                              func)))
+                misc.flush_log()
+        finally:
+            misc.set_log_buffer()
+            misc.set_log_rate(0)
+            sys.stderr = stderr
+    print("Records: %d, stack depth: %d" % (args.records, args.depth))
+    for name, duration in results:
+        print("%-14s %10.2f us/record %8.1fx"
+              % (name, duration * 1e6 / args.records,
+                 results[0][1] / duration))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
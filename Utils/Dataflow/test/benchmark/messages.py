@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark for pyDKB message handling.
+
+Measure CPU time per message spent by a typical "read -- modify -- write"
+stage cycle (message construction from input line, content extraction,
+output message construction and encoding) with copying (default) and
+borrowing (owned) message semantics.
+
+Usage:
+  messages.py [-r ROUNDS] [FILE ...]
+
+By default ProdSys task metadata samples (output of `data4es` stage 009)
+are used.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow.communication.messages import JSONMessage
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+DEFAULT_SAMPLES = os.path.join(dkb_dir, 'data4es', '009_oracleConnector',
+                               'output', 'sample20*.ndjson')
+
+
+def cycle_default(line):
+    """ Stage cycle with default (copying) message semantics. """
+    msg = JSONMessage(line)
+    data = msg.content()
+    data['_benchmark'] = True
+    return JSONMessage(data).encode()
+
+
+def cycle_owned(line):
+    """ Stage cycle with owned messages (as in ``set_messages_owned()``). """
+    msg = JSONMessage(line, owned=True)
+    data = msg.content()
+    data['_benchmark'] = True
+    return JSONMessage(data, owned=True).encode()
+
+
+def cycle_take(line):
+    """ Stage cycle taking content out of (default) input message. """
+    msg = JSONMessage(line)
+    data = msg.take()
+    data['_benchmark'] = True
+    return JSONMessage(data, owned=True).encode()
+
+
+CYCLES = (('default', cycle_default),
+          ('owned', cycle_owned),
+          ('take', cycle_take))
+
+
+def load(files):
+    """ Read non-empty lines from given NDJSON files. """
+    lines = []
+    for fname in files:
+        with open(fname) as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    return lines
+
+
+def measure(cycle, lines, rounds):
+    """ Return CPU time per message (in microseconds). """
+    start = time.process_time()
+    for i in range(rounds):
+        for line in lines:
+            cycle(line)
+    return (time.process_time() - start) * 1e6 / (rounds * len(lines))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('files', metavar='FILE', nargs='*',
+                        help='NDJSON file(s) with input messages'
+                             ' (default: %s)' % DEFAULT_SAMPLES)
+    parser.add_argument('-r', '--rounds', type=int, default=10,
+                        help='number of passes over input data'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    files = args.files or sorted(glob.glob(DEFAULT_SAMPLES))
+    lines = load(files)
+    if not lines:
+        sys.stderr.write("(ERROR) No input messages found.\n")
+        return 1
+    size = sum(len(line) for line in lines)
+    print("Messages: %d (avg. size: %d bytes), rounds: %d"
+          % (len(lines), size // len(lines), args.rounds))
+    base = None
+    for name, cycle in CYCLES:
+        result = measure(cycle, lines, args.rounds)
+        if base is None:
+            base = result
+        print("%-8s %10.1f us/msg %8.2fx" % (name, result, base / result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""
+Fetch throughput benchmark for the Oracle connector (009).
+
+Fetch results of the 'tasks' query over synthetic ProdSys data
+(`generate_prodsys.py`) with different batch sizes (`database.arraysize`).
+Rows are read from the SQLite database once and then served from memory
+with a fixed delay per fetched batch, imitating a round trip to the Oracle
+server (so that only the connector's own overhead and the number of round
+trips are measured). Rows are fetched as:
+ * tuples      -- rows as returned by the DB driver;
+ * dicts (old) -- rows as hashes, previous per-row conversion;
+ * dicts       -- rows as hashes (`rows_as_dict`);
+ * ndjson      -- NDJSON output text in PLAIN mode (`plain()` records
+                  written with `write_records()`).
+Report the number of rows fetched per second.
+
+Prefetching (`database.prefetchrows`) is done by Oracle Client along
+with query execution; it saves one round trip per query and is not
+imitated here.
+
+Usage:
+  oracle_fetch.py [-t TASKS] [-l LATENCY] [-a ARRAYSIZE[,ARRAYSIZE...]]
+"""
+
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+stage_dir = os.path.join(dkb_dir, 'data4es', '009_oracleConnector')
+sys.path.append(stage_dir)
+
+try:
+    import Oracle2JSON
+    import generate_prodsys
+    from dbConnection import dbConnection, SQLiteConnection
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import Oracle connector: %s\n" % err)
+    sys.exit(1)
+
+# Original output stream of the connector (kept to be restored)
+STDOUT = Oracle2JSON.OUT
+
+INITIAL_DATE = datetime(2020, 3, 1)
+FINAL_DATE = INITIAL_DATE + timedelta(days=1)
+
+QUERY = 'tasks'
+QUERY_PARAMS = {'production_or_analysis_cond': '>='}
+
+
+class MemoryConnection(dbConnection):
+    """ Connection serving query results from memory. """
+
+    def __init__(self, columns, rows, arraysize=None, latency=0):
+        """ Initialize connection.
+
+        :param columns: column names of the query results
+        :type columns: tuple
+        :param rows: query results
+        :type rows: list
+        :param latency: time to wait for every batch (sec)
+        :type latency: float
+        """
+        self.data = (columns, rows)
+        if arraysize:
+            self.arraysize = arraysize
+        self.latency = latency
+        self.queries = {}
+
+    def establish(self):
+        """ Do nothing. """
+        return True
+
+    def execute_saved(self, qname, **params):
+        """ "Execute" query (ignoring the parameters). """
+        self.queries[qname] = {'executed': True}
+        return True
+
+    def fetch_batches(self, qname, arraysize=None):
+        """ Generator for iterator over batches of query results. """
+        if not self.queries[qname].pop('executed', None):
+            return
+        arraysize = arraysize or self.arraysize
+        columns, rows = self.data
+        self.queries[qname]['columns'] = columns
+        for i in range(0, len(rows), arraysize):
+            time.sleep(self.latency)
+            yield rows[i:i + arraysize]
+        # Last (empty) batch
+        time.sleep(self.latency)
+
+
+def load(db):
+    """ Read the query results from the database.
+
+    :return: column names, rows
+    :rtype: tuple
+    """
+    conn = SQLiteConnection(db)
+    stderr = sys.stderr
+    with open(os.devnull, 'w') as devnull:
+        sys.stderr = devnull
+        try:
+            conn.establish()
+            conn.save_queries({QUERY: {
+                'file': Oracle2JSON.query_path(QUERY, 'data4es-sqlite'),
+                'params': QUERY_PARAMS}})
+            execute(conn)
+            rows = list(conn.results(QUERY))
+        finally:
+            sys.stderr = stderr
+    conn.connection.close()
+    return conn.columns(QUERY), rows
+
+
+def old_dicts(conn, qname):
+    """ Previous implementation of ``results(qname, rows_as_dict=True)``.
+    """
+    conn.queries[qname]['columns'] = None
+    for rows in conn.fetch_batches(qname):
+        if not conn.queries[qname].get('columns'):
+            conn.queries[qname]['columns'] = list(conn.columns(qname))
+        for row in rows:
+            yield dict(list(zip(conn.queries[qname]['columns'], row)))
+
+
+def execute(conn):
+    """ Execute the query for the whole time range. """
+    conn.execute_saved(QUERY, start_date=INITIAL_DATE, end_date=FINAL_DATE)
+
+
+def ndjson(conn):
+    """ Write query results as NDJSON text (in PLAIN mode).
+
+    :return: NDJSON text
+    :rtype: str
+    """
+    out = io.StringIO()
+    Oracle2JSON.OUT = out
+    try:
+        Oracle2JSON.write_records(Oracle2JSON.plain(conn, [QUERY],
+                                                    INITIAL_DATE,
+                                                    FINAL_DATE))
+    finally:
+        Oracle2JSON.OUT = STDOUT
+    return out.getvalue()
+
+
+MODES = (
+    ('tuples', lambda c: (execute(c), sum(1 for r in c.results(QUERY)))),
+    ('dicts (old)', lambda c: (execute(c),
+                               sum(1 for r in old_dicts(c, QUERY)))),
+    ('dicts', lambda c: (execute(c),
+                         sum(1 for r in c.results(QUERY,
+                                                  rows_as_dict=True)))),
+    ('ndjson', ndjson)
+)
+
+
+def measure(data, arraysize, latency, func):
+    """ Run query and fetch its results.
+
+    :return: duration (sec), result of ``func``
+    :rtype: tuple
+    """
+    conn = MemoryConnection(data[0], data[1], arraysize, latency)
+    start = time.time()
+    result = func(conn)
+    return time.time() - start, result
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-t', '--tasks', type=int, default=20000,
+                        help='number of tasks (default: %(default)s)')
+    parser.add_argument('-l', '--latency', type=float, default=0.001,
+                        help='round trip time (sec, default: %(default)s)')
+    parser.add_argument('-a', '--arraysize', default='10,100,1000,10000',
+                        help='comma-separated batch sizes'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    sizes = [int(a) for a in args.arraysize.split(',')]
+    workdir = tempfile.mkdtemp()
+    try:
+        db = os.path.join(workdir, 'prodsys.db')
+        generate_prodsys.generate(db, INITIAL_DATE, 1, args.tasks)
+        data = load(db)
+        print("Tasks: %d, round trip: %s s (rows/s)"
+              % (args.tasks, args.latency))
+        print("%-9s" % 'arraysize'
+              + ''.join(" %12s" % name for name, func in MODES))
+        for arraysize in sizes:
+            line = "%-9d" % arraysize
+            for name, func in MODES:
+                duration, result = measure(data, arraysize, args.latency,
+                                           func)
+                line += " %12.0f" % (args.tasks / duration)
+            print(line)
+            if result.count('\n') != args.tasks:
+                sys.stderr.write("(ERROR) NDJSON output: %d records"
+                                 " (expected: %d).\n"
+                                 % (result.count('\n'), args.tasks))
+                return 1
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
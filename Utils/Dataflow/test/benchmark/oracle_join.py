@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Memory benchmark for SQUASH mode of the Oracle connector (009).
+
+Join streams of 'tasks' and 'datasets' query results (synthetic records,
+generated on the fly as if fetched from the DB cursors, ordered by
+'taskid') with the previous implementation of `join_results()` (which
+reads all the tasks before the datasets) and with the current one
+(sort-merge join). Report peak memory allocated during the join
+(``tracemalloc``) and time; check that the joined records are the same.
+
+Usage:
+  oracle_join.py [-n TASKS] [-k DATASETS]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+from collections import defaultdict
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+stage_dir = os.path.join(dkb_dir, 'data4es', '009_oracleConnector')
+sys.path.append(stage_dir)
+
+try:
+    import Oracle2JSON
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import Oracle connector: %s\n" % err)
+    sys.exit(1)
+
+FIELDS = ('campaign', 'subcampaign', 'project', 'phys_group', 'status',
+          'step_name', 'user_name', 'ctag', 'output_formats', 'description',
+          'architecture', 'conditions_tag', 'geometry_version', 'trans_home',
+          'trans_path', 'trans_uses', 'cloud', 'site', 'vo', 'chain_data')
+
+
+def legacy_join_results(tasks, datasets):
+    """ Previous implementation of ``join_results()``. """
+    d = defaultdict(dict)
+    buffers = (tasks, datasets)
+    join_buffer = {}
+    req_n = len(buffers)
+    for buf in buffers:
+        for elem in buf:
+            tid = elem['taskid']
+            d[tid].update(elem)
+            n = join_buffer.get(tid, 0) + 1
+            if n == req_n:
+                yield d[tid]
+                del join_buffer[tid]
+                del d[tid]
+            else:
+                join_buffer[tid] = n
+
+    for tid in d:
+        yield d[tid]
+
+
+def tasks(n):
+    """ Generate 'tasks' query records. """
+    for i in range(n):
+        tid = 20000000 + i
+        rec = dict((f, '%s-%d-%s' % (f, tid, 'x' * 20)) for f in FIELDS)
+        rec.update({'taskid': tid, 'total_events': i * 1000,
+                    'taskname': 'mc16_13TeV.%d.Sherpa_221.recon.e5340' % tid,
+                    'task_timestamp': '01-03-2020 12:00:00'})
+        yield rec
+
+
+def datasets(n, k):
+    """ Generate 'datasets' query records (every task has ``k`` ones). """
+    for i in range(n):
+        tid = 20000000 + i
+        for j in range(k):
+            yield {'taskid': tid, 'type': 'output',
+                   'datasetname': 'mc16_13TeV.%d.Sherpa_221.merge.AOD_%03d'
+                                  '.e5340_s3126_r10201' % (tid, j)}
+
+
+def measure(join, n, k):
+    """ Run the join and consume its results.
+
+    :return: peak allocated memory (bytes), duration (seconds),
+             checksum of joined records
+    :rtype: tuple
+    """
+    tracemalloc.start()
+    start = time.time()
+    checksum = 0
+    for rec in join(tasks(n), Oracle2JSON.squash_records(datasets(n, k))):
+        checksum += hash((rec['taskid'], len(rec), len(rec['output'])))
+    duration = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, duration, checksum
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--tasks', type=int, default=50000,
+                        help='tasks in the interval (default: %(default)s)')
+    parser.add_argument('-k', '--datasets', type=int, default=5,
+                        help='datasets per task (default: %(default)s)')
+    args = parser.parse_args(args)
+    print("Tasks: %d, datasets per task: %d" % (args.tasks, args.datasets))
+    results = []
+    for name, join in (('previous', legacy_join_results),
+                       ('merge', Oracle2JSON.join_results)):
+        peak, duration, checksum = measure(join, args.tasks, args.datasets)
+        results.append(checksum)
+        print("%-9s %9.1f MB peak %8.2f s"
+              % (name, peak / 1024.0 / 1024, duration))
+    if results[0] != results[1]:
+        sys.stderr.write("(ERROR) Joined records differ.\n")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
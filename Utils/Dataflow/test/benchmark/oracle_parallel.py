@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Benchmark for parallel interval extraction of the Oracle connector (009).
+
+Run `Oracle2JSON` data extraction over a synthetic ProdSys database
+(`generate_prodsys.py`; SQLite backend with a fixed delay imitating a round
+trip to the Oracle server for every query) with one connection and with
+N parallel ones (`process.workers`); check that the output is the same and
+that the stored offset reaches the end of the range. Then imitate a failure
+in the middle of the range and check that the offset is not moved past the
+records written to the output, and that the resumed run writes the rest of
+the data.
+
+With `--target-rows` the interval size is adaptive (`STEP` is the initial
+value), so intervals of serial and parallel runs may differ: the output
+is compared regardless of the order (failure check is always done with
+fixed interval size).
+
+Usage:
+  oracle_parallel.py [-w WORKERS] [-d DAYS] [-s STEP] [-t TASKS] [-l DELAY]
+                     [-r TARGET_ROWS]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+stage_dir = os.path.join(dkb_dir, 'data4es', '009_oracleConnector')
+sys.path.append(stage_dir)
+
+try:
+    import Oracle2JSON
+    import generate_prodsys
+    from dbConnection import SQLiteConnection
+    from OffsetStorage import FileOffsetStorage
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import Oracle connector: %s\n" % err)
+    sys.exit(1)
+
+# Original output stream of the connector (kept to be restored)
+STDOUT = Oracle2JSON.OUT
+
+INITIAL_DATE = datetime(2020, 3, 1)
+
+QUERY_PARAMS = {'production_or_analysis_cond': '>='}
+
+
+class SlowConnection(SQLiteConnection):
+    """ SQLite connection with query latency and imitated failure. """
+
+    def __init__(self, dsn, delay=0, fail_at=None):
+        """ Initialize connection.
+
+        :param dsn: database file name
+        :type dsn: str
+        :param delay: time to wait before every query execution (sec)
+        :type delay: float
+        :param fail_at: start date of the interval to fail on
+        :type fail_at: datetime.datetime
+        """
+        super(SlowConnection, self).__init__(dsn)
+        self.delay = delay
+        self.fail_at = fail_at
+
+    def execute_saved(self, qname, **params):
+        """ Execute query by name with parameters. """
+        if self.fail_at and params['start_date'] == self.fail_at:
+            raise RuntimeError("Imitated failure")
+        time.sleep(self.delay)
+        return super(SlowConnection, self).execute_saved(qname, **params)
+
+
+def run(db, workdir, workers, config, delay, fail_at=None):
+    """ Run extraction from the stored (or initial) offset.
+
+    :return: duration, output lines, offset (or exception if failed)
+    :rtype: tuple
+    """
+    offset_file = os.path.join(workdir, 'offset')
+    storage = FileOffsetStorage(offset_file)
+    if storage.get() is None:
+        Oracle2JSON.commit_offset(storage, config['initial_date'])
+    out_file = os.path.join(workdir, 'out.ndjson')
+    stderr = sys.stderr
+    with open(out_file, 'w') as out, open(os.devnull, 'w') as devnull:
+        Oracle2JSON.OUT = out
+        sys.stderr = devnull
+        error = None
+        try:
+            conns = []
+            for i in range(workers):
+                conn = SlowConnection(db, delay, fail_at)
+                conn.establish()
+                conn.save_queries(config['queries'])
+                conns.append(conn)
+            start = time.time()
+            if workers > 1:
+                Oracle2JSON.process_parallel(conns, storage, config)
+            else:
+                Oracle2JSON.process(conns[0], storage, config)
+        except RuntimeError as err:
+            error = err
+        finally:
+            sys.stderr = stderr
+            Oracle2JSON.OUT = STDOUT
+    duration = time.time() - start
+    storage.storage.close()
+    with open(out_file) as f:
+        lines = f.readlines()
+    storage = FileOffsetStorage(offset_file)
+    offset = Oracle2JSON.get_offset(storage)
+    storage.storage.close()
+    return duration, lines, offset, error
+
+
+def check(condition, message):
+    """ Report failed check and exit. """
+    if not condition:
+        sys.stderr.write("(ERROR) Check failed: %s\n" % message)
+        sys.exit(1)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='parallel connections (default: %(default)s)')
+    parser.add_argument('-d', '--days', type=int, default=10,
+                        help='length of the time range'
+                             ' (default: %(default)s)')
+    parser.add_argument('-s', '--step', default='6h',
+                        help='interval size (default: %(default)s)')
+    parser.add_argument('-t', '--tasks', type=int, default=20000,
+                        help='number of tasks (default: %(default)s)')
+    parser.add_argument('-l', '--delay', type=float, default=0.05,
+                        help='query latency (sec, default: %(default)s)')
+    parser.add_argument('-r', '--target-rows', type=int, default=0,
+                        help='records per interval for adaptive interval'
+                             ' size (default: fixed size)')
+    args = parser.parse_args(args)
+    Oracle2JSON.init_offset_tz({'timestamp_tz': 'UTC'})
+    final_date = INITIAL_DATE + timedelta(days=args.days)
+    step = Oracle2JSON.interval_seconds(args.step)
+    config = {'step_seconds': step, 'mode': Oracle2JSON.SQUASH_POLICY,
+              'initial_date': INITIAL_DATE, 'final_date': final_date,
+              'queries': dict((q, {'file': Oracle2JSON.query_path(
+                  q, 'data4es-sqlite'), 'params': QUERY_PARAMS})
+                  for q in ('tasks', 'datasets')),
+              'target_rows': args.target_rows, 'target_seconds': 0,
+              'min_step': 60, 'max_step': args.days * 86400}
+    workdir = tempfile.mkdtemp()
+    try:
+        db = os.path.join(workdir, 'prodsys.db')
+        generate_prodsys.generate(db, INITIAL_DATE, args.days, args.tasks)
+        n_intervals = -(-args.days * 86400 // step)
+        print("Tasks: %d, intervals: %d, query latency: %s s"
+              % (args.tasks, n_intervals, args.delay))
+        print("%-8s %10s %12s" % ('workers', 'time', 'records/s'))
+        expected = None
+        for workers in sorted(set((1, args.workers))):
+            run_dir = os.path.join(workdir, 'run%d' % workers)
+            os.mkdir(run_dir)
+            duration, lines, offset, error = run(db, run_dir, workers,
+                                                 config, args.delay)
+            check(error is None, "unexpected failure: %s" % error)
+            check(offset == final_date, "offset is not at the end of range:"
+                                        " %s" % offset)
+            if expected is None:
+                expected = lines
+                check(len(lines) == args.tasks, "%d tasks extracted (of %d)"
+                                                % (len(lines), args.tasks))
+            elif args.target_rows:
+                check(sorted(lines) == sorted(expected),
+                      "output differs from serial one")
+            else:
+                check(lines == expected, "output differs from serial one")
+            print("%-8d %8.2f s %12.0f"
+                  % (workers, duration, len(lines) / duration))
+        # Failure in the middle of the range (with fixed interval size)
+        config['target_rows'] = 0
+        fail_at = INITIAL_DATE + timedelta(seconds=step * (n_intervals // 2))
+        run_dir = os.path.join(workdir, 'failure')
+        os.mkdir(run_dir)
+        duration, written, offset, error = run(db, run_dir, args.workers,
+                                               config, args.delay, fail_at)
+        check(error is not None, "imitated failure did not happen")
+        check(offset == fail_at, "offset after failure: %s (expected: %s)"
+                                 % (offset, fail_at))
+        check(not set(written) - set(expected),
+              "output before failure differs from serial one")
+        print("Failure at %s: %d records written, offset: %s"
+              % (fail_at, len(written), offset))
+        duration, rest, offset, error = run(db, run_dir, args.workers,
+                                            config, args.delay)
+        check(error is None and offset == final_date,
+              "resumed run did not reach the end of range")
+        check(sorted(written + rest) == sorted(expected),
+              "output after resume differs from serial one")
+        print("Resumed: %d records written, offset: %s"
+              % (len(rest), offset))
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Memory usage of the ProcessorStage output buffer.
+
+Run a stage with a "fan-out" `process()` (every input message produces
+many output messages, as e.g. splitting a task into its datasets) over
+batches of input messages and report peak memory allocated during the
+run (``tracemalloc``) and run time for different output buffer limits
+(``--output-buffer-size``). Limit 0 means unbounded buffer: the whole
+output of a batch is kept in memory till the end of the batch.
+
+Usage:
+  output_buffer.py [-n MESSAGES] [-f FANOUT] [-b BATCH_SIZE] [SIZE ...]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow.stage import ProcessorStage
+    from pyDKB.dataflow import messageType
+    from pyDKB.dataflow.communication.messages import JSONMessage
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def fanout_process(stage, message):
+    """ Produce ``stage.fanout`` output messages per input one. """
+    data = message.content()
+    for i in range(stage.fanout):
+        stage.output(JSONMessage({'taskid': data['taskid'],
+                                  'datasetname': 'mc16_13TeV.%06d.AOD'
+                                                 '.e1234_s5678_r9012' % i,
+                                  'payload': data['payload']}))
+    return True
+
+
+def measure(workdir, input_file, size, batch_size, fanout):
+    """ Run stage over the input file.
+
+    :return: peak allocated memory (bytes), duration (seconds),
+             number of output lines
+    :rtype: tuple
+    """
+    output_dir = os.path.join(workdir, 'out%d' % size)
+    stage = ProcessorStage()
+    stage.set_input_message_type(messageType.JSON)
+    stage.set_output_message_type(messageType.JSON)
+    stage.process = fanout_process
+    stage.fanout = fanout
+    stage.configure(['-o', output_dir, '--batch-size', str(batch_size),
+                     '--output-buffer-size', str(size), input_file])
+    tracemalloc.start()
+    start = time.time()
+    stage.run()
+    stage.stop()
+    duration = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    with open(os.path.join(output_dir, 'input.json')) as f:
+        n = sum(1 for line in f)
+    return peak, duration, n
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('sizes', metavar='SIZE', type=int, nargs='*',
+                        default=[0, 16 * 1024 * 1024, 1024 * 1024,
+                                 64 * 1024],
+                        help='output buffer size limit(s) to test'
+                             ' (bytes; default: 0 16M 1M 64K)')
+    parser.add_argument('-n', '--messages', type=int, default=20,
+                        help='number of input messages'
+                             ' (default: %(default)s)')
+    parser.add_argument('-f', '--fanout', type=int, default=20000,
+                        help='output messages per input one'
+                             ' (default: %(default)s)')
+    parser.add_argument('-b', '--batch-size', type=int, default=10,
+                        help='stage batch size (default: %(default)s)')
+    args = parser.parse_args(args)
+    workdir = tempfile.mkdtemp()
+    try:
+        input_file = os.path.join(workdir, 'input.json')
+        with open(input_file, 'w') as f:
+            for i in range(args.messages):
+                f.write('{"taskid": %d, "payload": "%s"}\n' % (i, 'x' * 100))
+        results = []
+        for size in args.sizes:
+            results.append((size, measure(workdir, input_file, size,
+                                          args.batch_size, args.fanout)))
+    finally:
+        shutil.rmtree(workdir)
+    print("Input messages: %d, fan-out: %d, batch size: %d"
+          % (args.messages, args.fanout, args.batch_size))
+    base = results[0][1][0]
+    for size, (peak, duration, n) in results:
+        print("buffer: %-10s %9.1f MB peak %7.2fx %8.2f s %9d lines"
+              % (size or 'unbounded', peak / 1024.0 / 1024, base / peak,
+                 duration, n))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
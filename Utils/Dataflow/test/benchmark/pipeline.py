@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Benchmark for the in-process pipeline of 'data4es' processing stages.
+
+Measure end-to-end throughput (messages per second) of the processing
+chain 091 | 16 | 17 | 40 | 93 | 95 (091 and 095 in "skip" mode, as they
+require access to external services) run as a shell pipeline of separate
+processes and as a single in-process pipeline (with all stages loaded or
+with some of them isolated); check that the output is the same.
+
+Usage:
+  pipeline.py [-r ROUNDS] [-i STAGE,...] [FILE ...]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+data4es_dir = os.path.join(dkb_dir, 'data4es')
+
+SAMPLES_DIR = os.path.join(data4es_dir, '009_oracleConnector', 'output')
+
+STAGES = [('91', '091_datasetsRucio/datasets_processing.py --skip'),
+          ('16', '016_task2es/task2es.py'),
+          ('17', '017_adjustMetadata/adjustMetadata.py'),
+          ('40', '040_progress/stage.py'),
+          ('93', '093_datasetsFormat/datasets_format.py'),
+          ('95', '095_datasetInfoAMI/amiDatasets.py --skip --config %s')]
+
+
+def stage_commands(config):
+    """ Return list of (ID, command) pairs for the processing stages. """
+    result = []
+    for sid, cmd in STAGES:
+        if '%s' in cmd:
+            cmd = cmd % config
+        result.append((sid, os.path.join(data4es_dir, cmd) + ' -m s'))
+    return result
+
+
+def shell_chain(stages):
+    """ Construct shell command for the chain of separate processes. """
+    filtered = ["%s %s | tr -d '\\000'" % (sys.executable, cmd)
+                for sid, cmd in stages]
+    return ' | '.join(filtered)
+
+
+def native_chain(stages, isolated=()):
+    """ Construct command for the in-process pipeline. """
+    cmd = [sys.executable, os.path.join(data4es_dir, 'run', 'pipeline.py'),
+           '-m', 's']
+    for sid, stage in stages:
+        if sid in isolated:
+            cmd += ['--isolated-stage', '%s %s' % (sys.executable, stage)]
+        else:
+            cmd += ['--stage', stage]
+    return ' '.join(["'%s'" % arg for arg in cmd]) + " | tr -d '\\000'"
+
+
+def measure(cmd, input_file, output_file):
+    """ Run command over the input file and return duration. """
+    start = time.time()
+    with open(input_file) as inp, open(output_file, 'w') as out, \
+            open(os.devnull, 'w') as err:
+        subprocess.check_call(cmd, shell=True, stdin=inp, stdout=out,
+                              stderr=err)
+    return time.time() - start
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('files', metavar='FILE', nargs='*',
+                        help='input NDJSON files (default: 009 samples)')
+    parser.add_argument('-r', '--rounds', type=int, default=10,
+                        help='number of times the input is repeated'
+                             ' (default: %(default)s)')
+    parser.add_argument('-i', '--isolate', default='95',
+                        help='comma-separated IDs of stages to isolate'
+                             ' in the last run (default: %(default)s)')
+    args = parser.parse_args(args)
+    files = args.files
+    if not files:
+        files = [os.path.join(SAMPLES_DIR, f)
+                 for f in sorted(os.listdir(SAMPLES_DIR))
+                 if f.startswith('sample')]
+    data = []
+    for fname in files:
+        with open(fname) as f:
+            data += [line for line in f if line.strip()]
+    workdir = tempfile.mkdtemp()
+    try:
+        config = os.path.join(workdir, '095.cfg')
+        with open(config, 'w') as f:
+            f.write('[ami]\nusercert=\nuserkey=\n')
+        input_file = os.path.join(workdir, 'input.ndjson')
+        with open(input_file, 'w') as f:
+            for i in range(args.rounds):
+                f.writelines(data)
+        stages = stage_commands(config)
+        isolated = args.isolate.split(',') if args.isolate else []
+        runs = [('shell', shell_chain(stages)),
+                ('native', native_chain(stages)),
+                ('isolated', native_chain(stages, isolated))]
+        results = []
+        outputs = []
+        for name, cmd in runs:
+            output_file = os.path.join(workdir, name + '.out')
+            results.append((name, measure(cmd, input_file, output_file)))
+            with open(output_file) as f:
+                outputs.append(f.read())
+    finally:
+        shutil.rmtree(workdir)
+    n = len(data) * args.rounds
+    print("Messages: %d, isolated stages: %s" % (n, ','.join(isolated)))
+    for (name, duration), output in zip(results, outputs):
+        print("%-9s %10.1f msg/s %8.2fx   output: %s"
+              % (name, n / duration, results[0][1] / duration,
+                 'same' if output == outputs[0] else 'DIFFERS'))
+    if not outputs[0] or any(o != outputs[0] for o in outputs):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
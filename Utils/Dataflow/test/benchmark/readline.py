@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for pyDKB.common.custom_readline.
+
+Read records separated by a custom separator (`\\x1e` by default) from
+a file and from a pipe and measure reading speed. For comparison, the
+previous implementation (string buffer with repeated search and slicing)
+is measured on a smaller number of records, as it takes quadratic time.
+Reading of the same records in length-prefixed frames ("--framing length")
+is measured as well.
+
+Usage:
+  readline.py [-n RECORDS] [-l LEGACY_RECORDS] [-s SEPARATOR]
+"""
+
+import os
+import sys
+import time
+import fcntl
+import select
+import argparse
+import tempfile
+import threading
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.common import custom_readline
+    from pyDKB.dataflow.communication.stream import framing
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def legacy_readline(f, newline):
+    """ Previous implementation of ``custom_readline`` (``next()`` only). """
+    poller = select.poll()
+    poller.register(f, select.POLLIN)
+    flags = fcntl.fcntl(f.fileno(), fcntl.F_GETFL)
+    fcntl.fcntl(f.fileno(), fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    buf = ""
+    while True:
+        if poller.poll(500):
+            chunk = f.read()
+            if not chunk:
+                if buf:
+                    yield buf
+                break
+            buf += chunk
+        while newline in buf:
+            pos = buf.index(newline) + len(newline)
+            yield buf[:pos]
+            buf = buf[pos:]
+
+
+def records(n, sep):
+    """ Return data with N records. """
+    return ''.join('{"taskid": %d}%s' % (i, sep) for i in range(n))
+
+
+def frames(n, sep=None):
+    """ Return data with N records in length-prefixed frames. """
+    return b''.join(framing.frame(framing.MESSAGE,
+                                  b'{"taskid": %d}' % i) for i in range(n))
+
+
+def frame_reader(f, sep=None):
+    """ Read frames (``custom_readline`` compatible signature). """
+    return framing.read_frames(f)
+
+
+def read_file(reader, data, sep):
+    """ Read records from a file; return number of records and duration. """
+    mode = 'w+b' if isinstance(data, bytes) else 'w+'
+    with tempfile.TemporaryFile(mode) as f:
+        f.write(data)
+        f.seek(0)
+        start = time.time()
+        n = sum(1 for r in reader(f, sep))
+        return n, time.time() - start
+
+
+def read_pipe(reader, data, sep):
+    """ Read records from a pipe; return number of records and duration. """
+    r, w = os.pipe()
+
+    def write():
+        with os.fdopen(w, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+
+    writer = threading.Thread(target=write)
+    with os.fdopen(r) as f:
+        start = time.time()
+        writer.start()
+        n = sum(1 for r in reader(f, sep))
+        duration = time.time() - start
+    writer.join()
+    return n, duration
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--records', type=int, default=1000000,
+                        help='number of records (default: %(default)s)')
+    parser.add_argument('-l', '--legacy-records', type=int, default=20000,
+                        help='number of records for the previous'
+                             ' implementation (default: %(default)s)')
+    parser.add_argument('-s', '--separator', default='\\x1e',
+                        help='record separator (default: %(default)s)')
+    args = parser.parse_args(args)
+    sep = args.separator.encode().decode('unicode_escape')
+    tests = [('custom_readline', custom_readline, records, args.records),
+             ('read_frames', frame_reader, frames, args.records)]
+    if args.legacy_records:
+        tests += [('custom_readline', custom_readline, records,
+                   args.legacy_records),
+                  ('legacy', legacy_readline, records, args.legacy_records)]
+    for name, reader, generate, n in tests:
+        data = generate(n, sep)
+        for source, read in (('file', read_file), ('pipe', read_pipe)):
+            count, duration = read(reader, data, sep)
+            if count != n:
+                sys.stderr.write("(ERROR) %s: %d records read (expected: %d)"
+                                 "\n" % (name, count, n))
+                return 1
+            print("%-16s %-5s %8d records %8.3f s %12.0f records/s"
+                  % (name, source, n, duration, n / duration))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
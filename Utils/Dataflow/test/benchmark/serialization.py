@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+Benchmark for message serialization: JSON vs. MessagePack.
+
+Measure decoding and encoding time per message and size of encoded
+messages for every message type used between stages (`--input-type`,
+`--output-type`), and throughput of a "hop" between two stages: messages
+written to the output stream, then read and decoded from the input stream
+(via a temporary file).
+
+Usage:
+  serialization.py [-r ROUNDS] [FILE ...]
+
+By default samples of the data loaded to ES (output of `data4es` stage 019)
+are used.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow import messageType
+    from pyDKB.dataflow.communication import Message
+    from pyDKB.dataflow.communication.stream import (InputStream,
+                                                     OutputStream)
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+DEFAULT_SAMPLES = os.path.join(dkb_dir, 'data4es', '019_esFormat',
+                               'output', 'sample20*.ndjson')
+
+TYPES = (messageType.JSON, messageType.MSGPACK)
+
+
+def load(files):
+    """ Read non-empty lines from given NDJSON files. """
+    lines = []
+    for fname in files:
+        with open(fname) as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    return lines
+
+
+def measure(func, items, rounds):
+    """ Return CPU time per item (in microseconds). """
+    start = time.process_time()
+    for i in range(rounds):
+        for item in items:
+            func(item)
+    return (time.process_time() - start) * 1e6 / (rounds * len(items))
+
+
+def hop(msg_type, contents, rounds, fname):
+    """ Write messages to a file and read them back.
+
+    :return: wall time per message (in microseconds)
+    :rtype: float
+    """
+    cls = Message(msg_type)
+    config = {'eom': '\n', 'eop': ''}
+    start = time.time()
+    for i in range(rounds):
+        with open(fname, 'w') as f:
+            out = OutputStream(f, config)
+            out.set_message_type(msg_type)
+            for content in contents:
+                out.write(cls(content, owned=True))
+            out.flush()
+            out.close()
+        with open(fname, 'r') as f:
+            inp = InputStream(f, config)
+            inp.set_message_type(msg_type)
+            for msg in inp:
+                msg.view()
+            inp.close()
+    return (time.time() - start) * 1e6 / (rounds * len(contents))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('files', metavar='FILE', nargs='*',
+                        help='NDJSON file(s) with input messages'
+                             ' (default: %s)' % DEFAULT_SAMPLES)
+    parser.add_argument('-r', '--rounds', type=int, default=10,
+                        help='number of passes over input data'
+                             ' (default: %(default)s)')
+    args = parser.parse_args(args)
+    files = args.files or sorted(glob.glob(DEFAULT_SAMPLES))
+    lines = load(files)
+    if not lines:
+        sys.stderr.write("(ERROR) No input messages found.\n")
+        return 1
+    contents = [json.loads(line) for line in lines]
+    print("Messages: %d, rounds: %d" % (len(lines), args.rounds))
+    print("%-8s %10s %12s %12s %12s %12s"
+          % ('type', 'avg. size', 'decode', 'encode', 'hop', 'hop rate'))
+    fd, fname = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        for msg_type in TYPES:
+            cls = Message(msg_type)
+            name = cls.typeName()
+            try:
+                cls.check()
+            except ImportError as err:
+                print("%-8s %10s (%s)" % (name, 'n/a', err))
+                continue
+            encoded = [cls(c).encode() for c in contents]
+            if [cls(e).content() for e in encoded] != contents:
+                sys.stderr.write("(ERROR) %s: decoded data differ.\n"
+                                 % name)
+                return 1
+            size = sum(len(e) for e in encoded) // len(encoded)
+            decode = measure(lambda e: cls(e, owned=True).view(),
+                             encoded, args.rounds)
+            encode = measure(lambda c: cls(c, owned=True).encode(),
+                             contents, args.rounds)
+            per_msg = hop(msg_type, contents, args.rounds, fname)
+            print("%-8s %8d B %9.1f us %9.1f us %9.1f us %8.0f msg/s"
+                  % (name, size, decode, encode, per_msg, 1e6 / per_msg))
+    finally:
+        os.remove(fname)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
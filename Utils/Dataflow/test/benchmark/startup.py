@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Startup time of pyDKB-based stages.
+
+Run every stage with ``--help`` and in ``--skip`` mode (a single input
+message in (s)tream mode) N times and report median and minimal wall
+clock time of a run. Every run is repeated in "eager" mode, with the
+modules pyDKB and the stages import on first use (``EAGER_MODULES``,
+plus clients of the external services, if installed) imported
+beforehand -- as it was done before the imports were made lazy.
+
+Usage:
+  startup.py [-n RUNS] [STAGE ...]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import importlib.util
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+
+STAGES = [os.path.join('test', 'pyDKB', 'json2JSON.py'),
+          os.path.join('data4es', '016_task2es', 'task2es.py'),
+          os.path.join('data4es', '025_chicagoES', 'stage.py'),
+          os.path.join('data4es', '091_datasetsRucio',
+                       'datasets_processing.py'),
+          os.path.join('data4es', '095_datasetInfoAMI', 'amiDatasets.py')]
+
+# Modules imported on first use (by `pyDKB.dataflow.pipeline` and
+# by stages)
+EAGER_MODULES = ['shlex', 'importlib.util',
+                 'elasticsearch', 'rucio.client', 'pyAMI.client',
+                 'pyAMI_atlas.api', 'invenio_client', 'splinter']
+
+MESSAGE = b'{"taskid": 1, "output": ["mc16_13TeV.123456.AOD.e1_s2"]}\n'
+
+# Run stage script as __main__, optionally importing modules before
+RUNNER = """
+import sys, os, runpy
+for m in %r:
+    try:
+        __import__(m)
+    except Exception:
+        pass
+sys.argv = sys.argv[1:]
+sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def available(modules):
+    """ Return modules (of the list) which can be imported. """
+    result = []
+    for m in modules:
+        try:
+            if importlib.util.find_spec(m):
+                result.append(m)
+        except ImportError:
+            pass
+    return result
+
+
+def stage_cmd(stage, args, preload):
+    """ Construct command to run the stage. """
+    return [sys.executable, '-c', RUNNER % (preload, ), stage] + args
+
+
+def measure(runs, cmds, stdin=b''):
+    """ Run every command N times (interleaved).
+
+    :return: median and minimal duration for every command
+    :rtype: list(tuple)
+    """
+    durations = [[] for cmd in cmds]
+    for i in range(runs):
+        for cmd, d in zip(cmds, durations):
+            start = time.time()
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                    stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL)
+            proc.communicate(stdin)
+            d.append(time.time() - start)
+    return [(sorted(d)[len(d) // 2], min(d)) for d in durations]
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('-n', '--runs', type=int, default=10,
+                        help='number of runs (default: %(default)s)')
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        default=STAGES,
+                        help='stage scripts (relative to the Dataflow'
+                             ' directory; default: %(default)s)')
+    args = parser.parse_args(args)
+    preload = available(EAGER_MODULES)
+    scenarios = [('--help', ['--help'], b''),
+                 ('--skip', ['-m', 's', '--skip'], MESSAGE)]
+    [(base, _)] = measure(args.runs, [[sys.executable, '-c', 'pass']])
+    print("Runs: %d, python startup: %.1f ms" % (args.runs, base * 1000))
+    print("Preloaded in eager mode: %s" % ' '.join(preload))
+    print("%-40s %-7s %10s %10s %10s %10s %8s"
+          % ('stage', 'args', 'eager', 'eager min', 'lazy', 'lazy min',
+             'speedup'))
+    for stage in args.stages:
+        path = os.path.join(dkb_dir, stage)
+        for name, stage_args, stdin in scenarios:
+            eager, lazy = measure(args.runs,
+                                  [stage_cmd(path, stage_args, preload),
+                                   stage_cmd(path, stage_args, [])], stdin)
+            print("%-40s %-7s %7.1f ms %7.1f ms %7.1f ms %7.1f ms %7.2fx"
+                  % ((stage[-40:], name)
+                     + tuple(t * 1000 for t in eager + lazy)
+                     + (eager[0] / lazy[0], )))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark for ProcessorStage parallel processing mode.
+
+Measure throughput (messages per second) of a stage with a fake slow
+`process()` (imitating a blocking call to a remote service) for different
+numbers of worker threads (`--workers`).
+
+Usage:
+  workers.py [-n MESSAGES] [-d DELAY] [-b BATCH_SIZE] [WORKERS ...]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+sys.path.append(dkb_dir)
+
+try:
+    from pyDKB.dataflow.stage import ProcessorStage
+    from pyDKB.dataflow import messageType
+    from pyDKB.dataflow.communication.messages import JSONMessage
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+def slow_process(stage, message):
+    """ Imitate blocking remote call and pass the message forward. """
+    data = message.content()
+    time.sleep(stage.delay)
+    data['_benchmark'] = True
+    stage.output(JSONMessage(data))
+    return True
+
+
+def measure(workdir, input_file, workers, batch_size, delay):
+    """ Run stage over the input file and return messages per second. """
+    output_dir = os.path.join(workdir, 'out%d' % workers)
+    stage = ProcessorStage()
+    stage.set_input_message_type(messageType.JSON)
+    stage.set_output_message_type(messageType.JSON)
+    stage.process = slow_process
+    stage.delay = delay
+    stage.configure(['-o', output_dir, '--workers', str(workers),
+                     '--batch-size', str(batch_size), input_file])
+    start = time.time()
+    stage.run()
+    stage.stop()
+    duration = time.time() - start
+    with open(os.path.join(output_dir, 'input.json')) as f:
+        n = sum(1 for line in f)
+    return n / duration
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('workers', metavar='WORKERS', type=int, nargs='*',
+                        default=[1, 2, 4, 8, 16],
+                        help='number(s) of workers to test'
+                             ' (default: 1 2 4 8 16)')
+    parser.add_argument('-n', '--messages', type=int, default=200,
+                        help='number of messages (default: %(default)s)')
+    parser.add_argument('-d', '--delay', type=float, default=0.01,
+                        help='processing time of a single message'
+                             ' (seconds, default: %(default)s)')
+    parser.add_argument('-b', '--batch-size', type=int, default=1,
+                        help='stage batch size (default: %(default)s)')
+    args = parser.parse_args(args)
+    workdir = tempfile.mkdtemp()
+    try:
+        input_file = os.path.join(workdir, 'input.json')
+        with open(input_file, 'w') as f:
+            for i in range(args.messages):
+                f.write('{"taskid": %d}\n' % i)
+        results = []
+        for workers in args.workers:
+            results.append((workers, measure(workdir, input_file, workers,
+                                             args.batch_size, args.delay)))
+    finally:
+        shutil.rmtree(workdir)
+    print("Messages: %d, delay: %s s, batch size: %d"
+          % (args.messages, args.delay, args.batch_size))
+    for workers, result in results:
+        print("workers: %-3d %10.1f msg/s %8.2fx"
+              % (workers, result, result / results[0][1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+Stage 0XX: some json data transformation (asynchronous)
+"""
+
+import sys
+import os
+import asyncio
+
+try:
+    base_dir = os.path.dirname(__file__)
+    dkb_dir = os.path.join(base_dir, os.pardir, os.pardir)
+    sys.path.append(dkb_dir)
+    import pyDKB
+    from pyDKB.dataflow import messageType
+except Exception as err:
+    sys.stderr.write("(ERROR) Failed to import pyDKB library: %s\n" % err)
+    sys.exit(1)
+
+
+async def process(stage, msg):
+    """
+    Input message: JSON
+    Output message: JSON
+
+    Processing of every next message takes less time than of the previous
+    one, so messages are processed in reverse order (if run concurrently).
+    Messages with key 'fail' are failed to be processed.
+    """
+    stage.delay = max(stage.delay - 0.05, 0)
+    await asyncio.sleep(stage.delay)
+    cls = pyDKB.dataflow.communication.Message(messageType.JSON)
+    content = msg.content()
+    stage.output(cls(content))
+    if 'fail' in content:
+        return False
+    stage.log("Message processed: %s" % content)
+    return True
+
+
+def main(args):
+    """ Main program loop. """
+    stage = pyDKB.dataflow.stage.AsyncProcessorStage()
+    stage.set_input_message_type(messageType.JSON)
+    stage.set_output_message_type(messageType.JSON)
+
+    stage.process = process
+    stage.delay = 0.5
+
+    stage.configure(args)
+    exit_code = stage.run()
+
+    if exit_code == 0:
+        stage.stop()
+
+    exit(exit_code)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])